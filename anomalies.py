@@ -0,0 +1,244 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from config import REPORT_STORE
+from report_store import ingested_file_count, load_columns
+
+logger = logging.getLogger(__name__)
+
+# A fill is flagged when its liters exceed this multiple of the vehicle's median fill
+LITERS_FACTOR = 1.5
+# Price-per-liter outliers: robust z-score (median/MAD per product) above this value
+PRICE_Z_THRESHOLD = 3.5
+# MAD floor as a fraction of the median price, so near-constant prices don't flag cent-level noise
+PRICE_MAD_FLOOR = 0.01
+# A vehicle's week is a spike when it has more fills than this multiple of its median week (and at least MIN_SPIKE_FILLS)
+FREQUENCY_FACTOR = 2.0
+MIN_SPIKE_FILLS = 4
+# Per-vehicle statistics need at least this many fills (or weeks) of history
+MIN_HISTORY = 4
+# Days covered by a weekly email, ending on the report's end date
+PERIOD_DAYS = 7
+# Longest list of findings put into one email
+MAX_REPORTED_FINDINGS = 50
+
+CHECKS = ("duplicate", "liters", "price", "frequency")
+
+
+def _codes(values):
+    """
+    Returns dense integer codes for a column of labels, in order of first appearance, and the labels.
+    """
+    lookup = {}
+    codes = np.array([lookup.setdefault(value, len(lookup)) for value in values], dtype=np.int64)
+    return codes, list(lookup)
+
+
+def _dates(values):
+    """
+    Converts ISO dates to datetime64[D]; missing or unparseable dates become NaT.
+    """
+    try:
+        return np.array(values, dtype="datetime64[D]")
+    except ValueError:
+        return np.array([_date(value) for value in values], dtype="datetime64[D]")
+
+
+def _date(value):
+    try:
+        return np.datetime64(value, "D")
+    except (TypeError, ValueError):
+        return np.datetime64("NaT")
+
+
+def _group_ids(*keys):
+    """
+    Numbers the distinct combinations of integer key columns by folding them pairwise into one
+    int64 key (much faster than np.unique(axis=0)). Returns (dense group id per row, size of each group).
+    """
+    ids = np.zeros(len(keys[0]), dtype=np.int64)
+    for key in keys:
+        if not len(key):
+            break
+        key = key - key.min()
+        _, ids = np.unique(ids * (int(key.max()) + 1) + key, return_inverse=True)
+    return ids, np.bincount(ids)
+
+
+def _segment_median(ids, values):
+    """
+    Median of `values` for every group id (dense, from _codes or _group_ids), broadcast back to each row.
+    NaN values are ignored. Returns (median per row, number of values in the row's group).
+    """
+    group_count = int(ids.max()) + 1 if len(ids) else 0
+    valid = ~np.isnan(values)
+    valid_ids = ids[valid]
+    sizes = np.bincount(valid_ids, minlength=group_count)
+    starts = np.cumsum(sizes) - sizes
+
+    order = np.lexsort((values[valid], valid_ids))
+    sorted_values = values[valid][order]
+    medians = np.full(group_count, np.nan)
+    present = sizes > 0
+    low = (starts + (sizes - 1) // 2)[present]
+    high = (starts + sizes // 2)[present]
+    medians[present] = (sorted_values[low] + sorted_values[high]) / 2
+    return medians[ids], sizes[ids]
+
+
+def detect_anomalies(columns):
+    """
+    Flags anomalous fills across every group and month in one vectorized pass.
+    `columns` is a dict of column lists as returned by report_store.load_columns.
+    Returns a dict of boolean row masks, one per check in CHECKS:
+      - duplicate: same vehicle, product, date, liters and amount more than once
+      - liters: liters above LITERS_FACTOR x the vehicle's median fill
+      - price: price per liter is a robust-z outlier for its product
+      - frequency: the vehicle's fills that week are a spike against its median week
+    """
+    vehicles, _ = _codes(columns["vehicle"])
+    products, _ = _codes(columns["product"])
+    liters = np.array([np.nan if value is None else value for value in columns["liters"]], dtype=float)
+    amounts = np.array([np.nan if value is None else value for value in columns["gross_amount"]], dtype=float)
+    days = _dates(columns["fuel_date"])
+    day_numbers = days.astype(np.int64)
+    has_date = ~np.isnat(days)
+
+    # Duplicate fills
+    fill_ids, fill_counts = _group_ids(
+        vehicles,
+        products,
+        np.where(has_date, day_numbers, -1),
+        np.round(np.nan_to_num(liters, nan=-1) * 100).astype(np.int64),
+        np.round(np.nan_to_num(amounts, nan=-1) * 100).astype(np.int64),
+    )
+    duplicate = fill_counts[fill_ids] > 1
+
+    # Liters above the vehicle's usual fill
+    median_liters, fills = _segment_median(vehicles, liters)
+    with np.errstate(invalid="ignore"):
+        too_many_liters = (fills >= MIN_HISTORY) & (liters > LITERS_FACTOR * median_liters)
+
+    # Price-per-liter outliers per product (median / MAD)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price = np.where(liters > 0, amounts / liters, np.nan)
+    median_price, priced = _segment_median(products, price)
+    deviation = np.abs(price - median_price)
+    mad, _ = _segment_median(products, deviation)
+    scale = 1.4826 * np.fmax(mad, PRICE_MAD_FLOOR * median_price)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price_outlier = (priced >= MIN_HISTORY) & (deviation / scale > PRICE_Z_THRESHOLD)
+
+    # Fill frequency spikes: fills per vehicle per week against the vehicle's median week
+    weeks = np.where(has_date, (day_numbers + 3) // 7, -1)  # weeks start on Monday (1970-01-01 was a Thursday)
+    week_ids, week_counts = _group_ids(vehicles, weeks)
+    # One entry per (vehicle, week): its vehicle and number of fills
+    week_vehicles = np.zeros(len(week_counts), dtype=np.int64)
+    week_vehicles[week_ids] = vehicles
+    dated_weeks = np.zeros(len(week_counts), dtype=bool)
+    dated_weeks[week_ids] = has_date
+    median_week, active_weeks = _segment_median(week_vehicles, np.where(dated_weeks, week_counts, np.nan))
+    with np.errstate(invalid="ignore"):
+        spike_weeks = (dated_weeks & (active_weeks >= MIN_HISTORY) & (week_counts >= MIN_SPIKE_FILLS)
+                       & (week_counts > FREQUENCY_FACTOR * median_week))
+    frequency = spike_weeks[week_ids]
+
+    return {
+        "duplicate": duplicate,
+        "liters": too_many_liters,
+        "price": price_outlier,
+        "frequency": frequency,
+    }
+
+
+def _describe(check, row):
+    vehicle = f"vehicle {row['vehicle']}, {row['fuel_date']}"
+    if check == "duplicate":
+        return f"Duplicate fill: {vehicle}, {row['liters']} L of {row['product']}"
+    if check == "liters":
+        return f"Unusually large fill: {vehicle}, {row['liters']} L"
+    if check == "price":
+        return f"Unusual price per liter: {vehicle}, {row['gross_amount']} for {row['liters']} L of {row['product']}"
+    return f"Unusually frequent fills: {vehicle}"
+
+
+def group_findings(columns, flags, logistic_group, start_date=None, end_date=None):
+    """
+    Returns human-readable findings for one logistic group's rows, optionally limited to
+    an inclusive ISO date range. Duplicate rows are reported once.
+    """
+    in_group = np.asarray(columns["logistic_group"], dtype=object) == logistic_group
+    if start_date or end_date:
+        days = _dates(columns["fuel_date"])
+        with np.errstate(invalid="ignore"):
+            if start_date:
+                in_group &= days >= np.datetime64(start_date)
+            if end_date:
+                in_group &= days <= np.datetime64(end_date)
+
+    findings = []
+    seen = set()
+    for check in CHECKS:
+        for index in np.flatnonzero(flags[check] & in_group):
+            row = {name: values[index] for name, values in columns.items()}
+            line = _describe(check, row)
+            if line not in seen:
+                seen.add(line)
+                findings.append(line)
+    return findings
+
+
+class RunAnomalies:
+    """
+    Per-run memo of the batch analysis for the report period ending on `end_date` (D/M/YYYY):
+    the store is loaded and analysed once, and again only if reports were ingested since;
+    each group's findings are sliced from the shared flags. Safe to share between threads.
+    """
+
+    def __init__(self, end_date, store_path=REPORT_STORE):
+        self.end_date = end_date
+        self.store_path = store_path
+        period_end = datetime.strptime(end_date, "%d/%m/%Y").date()
+        self.period = ((period_end - timedelta(days=PERIOD_DAYS - 1)).isoformat(), period_end.isoformat())
+        self._analysis = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _current(self):
+        with self._lock:
+            version = ingested_file_count(self.store_path)
+            if version != self._version:
+                columns = load_columns(self.store_path)
+                flags = detect_anomalies(columns) if columns["vehicle"] else None
+                self._analysis = columns, flags
+                self._version = version
+            return self._analysis
+
+    def findings(self, logistic_group):
+        """
+        Returns the findings for a group's report period; [] when the store is disabled or empty.
+        Long lists are cut at MAX_REPORTED_FINDINGS.
+        """
+        if not self.store_path:
+            return []
+        columns, flags = self._current()
+        if flags is None:
+            return []
+        findings = group_findings(columns, flags, logistic_group, *self.period)
+        if len(findings) > MAX_REPORTED_FINDINGS:
+            hidden = len(findings) - MAX_REPORTED_FINDINGS
+            findings = findings[:MAX_REPORTED_FINDINGS] + [f"... and {hidden} more"]
+        logger.info(f"{len(findings)} anomaly finding(s) for '{logistic_group}' ({self.end_date}).")
+        return findings
+
+
+def findings_for_report(logistic_group, end_date, store_path=REPORT_STORE):
+    """
+    Runs the batch analysis over the whole report store and returns the findings for a group's
+    weekly report period ending on `end_date` (D/M/YYYY). Returns [] when the store is disabled.
+    For several groups of one run, share a RunAnomalies instead.
+    """
+    return RunAnomalies(end_date, store_path).findings(logistic_group)
@@ -9,48 +9,91 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
-from config import CHROME_DRIVER_PATH, DOWNLOAD_DIR, BUSINESS_PARTNER_NUMBER, USER_ID, PASSWORD
+from config import (
+    CHROME_DRIVER_PATH,
+    DOWNLOAD_DIR,
+    BROWSER_PROFILE,
+    CHROME_PROFILE_DIR,
+    CAPTURE_DOWNLOADS,
+    BUSINESS_PARTNER_NUMBER,
+    USER_ID,
+    PASSWORD,
+    SESSION_FILE
+)
 from constants import (
-    LOADING_SCREEN_SELECTOR,
-    SELECTOR_BUSINESS_PARTNER_INPUT,
-    SELECTOR_ID_INPUT,
-    SELECTOR_PASSWORD_INPUT,
-    SELECTOR_LOGIN_BUTTON
+    BLOCKED_URL_PATTERNS,
+    LOADING_SCREEN_SELECTOR
 )
+from capture import enable_capture, prepare_capture
+from retry import DEFAULT_RETRY_POLICY, DeadlineExceeded
+from session import restore_session, save_session
+from tracing import span, current_span, traced
 
 logger = logging.getLogger(__name__)
 
+LOADING_SCREEN_TIMEOUT = 60
+
+# Resolves with true once the loading shade is missing or no longer `display: flex`,
+# or with false after the timeout. Arguments: selector, timeout in milliseconds, callback.
+WAIT_FOR_LOADING_SCRIPT = """
+const [selector, timeoutMs, done] = arguments;
+const isLoading = () => {
+    const shade = document.querySelector(selector);
+    return !!shade && shade.style.display === 'flex';
+};
+if (!isLoading()) {
+    done(true);
+    return;
+}
+let timer = null;
+const observer = new MutationObserver(() => {
+    if (!isLoading()) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(true);
+    }
+});
+observer.observe(document.documentElement, {
+    attributes: true, attributeFilter: ['style'], childList: true, subtree: true
+});
+timer = setTimeout(() => {
+    observer.disconnect();
+    done(false);
+}, timeoutMs);
+"""
 
-def wait_for_loading_to_disappear(driver):
+
+@traced("wait_for_loading")
+def wait_for_loading_to_disappear(driver, timeout=LOADING_SCREEN_TIMEOUT):
     """
     Waits until the loading screen disappears from the page.
+    The wait runs inside the page (MutationObserver) and resolves as soon as the shade stops being
+    displayed, so it costs a single WebDriver round trip. Returns the number of seconds waited.
     """
+    start = time.perf_counter()
     try:
-        while True:
-            loading_elements = driver.find_elements(By.CSS_SELECTOR, LOADING_SCREEN_SELECTOR)
-            if loading_elements:
-                loading_screen = loading_elements[0]
-                style_attr = loading_screen.get_attribute('style')
-                if style_attr == 'display: flex;':
-                    logger.debug("Loading screen detected, waiting...")
-                    time.sleep(0.5)
-                else:
-                    logger.debug("Loading screen disappeared.")
-                    break
-            else:
-                logger.debug("Loading screen not detected.")
-                break
+        cleared = driver.execute_async_script(
+            WAIT_FOR_LOADING_SCRIPT, LOADING_SCREEN_SELECTOR, int(timeout * 1000)
+        )
     except WebDriverException:
         logger.exception("Exception while checking loading screen.")
         raise
 
+    elapsed = time.perf_counter() - start
+    if cleared is False:
+        logger.error(f"Loading screen still displayed after {timeout} seconds.")
+        raise TimeoutException(f"Loading screen did not disappear within {timeout} seconds.")
+
+    logger.debug(f"Loading screen wait took {elapsed:.3f}s.")
+    return elapsed
 
-def click_element(driver, selector, selector_type='css'):
+
+def click_element(driver, selector, selector_type='css', policy=None):
     """
     Waits until the specified element is clickable, and then clicks on it.
+    Retries follow `policy` (DEFAULT_RETRY_POLICY by default).
     """
-    max_attempts = 5
-    attempts = 0
+    policy = policy or DEFAULT_RETRY_POLICY
 
     if selector_type == 'css':
         by = By.CSS_SELECTOR
@@ -59,57 +102,113 @@ def click_element(driver, selector, selector_type='css'):
     else:
         raise ValueError(f"Invalid selector_type: {selector_type}")
 
-    while attempts < max_attempts:
+    def attempt(timeout):
+        element = WebDriverWait(driver, timeout, poll_frequency=policy.poll_interval).until(
+            EC.element_to_be_clickable((by, selector))
+        )
+        element.click()
+
+    with span("click_element", selector=selector) as step:
         try:
-            element = WebDriverWait(driver, 50).until(EC.element_to_be_clickable((by, selector)))
-            element.click()
+            policy.execute(attempt, selector, on_retry=lambda: step.incr("retries"))
             logger.debug(f"Clicked element: {selector}")
-            return
-        except (TimeoutException, WebDriverException) as e:
-            attempts += 1
-            logger.warning(f"Unable to click element '{selector}', "
-                           f"attempt {attempts}/{max_attempts}: {e}")
-            time.sleep(3)
+        except DeadlineExceeded:
+            logger.error(f"Run deadline exceeded while clicking: {selector}")
+            raise
+        except TimeoutException as e:
+            logger.error(f"Failed to click element: {selector} ({e})")
+            raise TimeoutException(f"Cannot click element: {selector}") from e
 
-    logger.error(f"Failed to click element after {max_attempts} attempts: {selector}")
-    raise TimeoutException(f"Cannot click element: {selector}")
 
-
-def fill_form_field(driver, css_selector, text):
+def fill_form_field(driver, css_selector, text, policy=None):
     """
     Fills in a form field with the specified text.
+    Waiting for the field follows `policy` (DEFAULT_RETRY_POLICY by default).
+    """
+    policy = policy or DEFAULT_RETRY_POLICY
+
+    def attempt(timeout):
+        wait_for_loading_to_disappear(driver, timeout)
+        return WebDriverWait(driver, timeout, poll_frequency=policy.poll_interval).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, css_selector))
+        )
+
+    with span("fill_form_field", selector=css_selector) as step:
+        try:
+            form_field = policy.execute(attempt, css_selector, on_retry=lambda: step.incr("retries"))
+            form_field.send_keys(text)
+            logger.debug(f"Filled form field '{css_selector}' with text='{text}'.")
+        except (TimeoutException, WebDriverException):
+            logger.exception(f"Failed to fill form field '{css_selector}' with text='{text}'.")
+            raise
+
+
+def apply_fast_profile(chrome_options, profile_name=None):
+    """
+    Adds the "fast" profile options: headless, eager page load, no images,
+    and a persistent user data directory (one per `profile_name`, so parallel sessions don't collide).
+    """
+    profile_dir = os.path.join(os.getcwd(), CHROME_PROFILE_DIR, profile_name or 'default')
+    os.makedirs(profile_dir, exist_ok=True)
+
+    chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument(f'--user-data-dir={profile_dir}')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument('--disable-extensions')
+    chrome_options.add_argument('--no-first-run')
+    chrome_options.page_load_strategy = 'eager'
+
+
+def block_heavy_resources(driver, download_dir):
+    """
+    Blocks fonts and analytics requests through CDP and makes sure headless Chrome still downloads.
     """
     try:
-        wait_for_loading_to_disappear(driver)
-        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, css_selector)))
-        WebDriverWait(driver, 50).until(EC.element_to_be_clickable((By.CSS_SELECTOR, css_selector)))
-        form_field = driver.find_element(By.CSS_SELECTOR, css_selector)
-        form_field.send_keys(text)
-        logger.debug(f"Filled form field '{css_selector}' with text='{text}'.")
-    except (TimeoutException, WebDriverException):
-        logger.exception(f"Failed to fill form field '{css_selector}' with text='{text}'.")
-        raise
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+        driver.execute_cdp_cmd('Browser.setDownloadBehavior', {
+            'behavior': 'allow',
+            'downloadPath': download_dir
+        })
+    except WebDriverException:
+        logger.warning("Failed to apply resource blocking, continuing without it.")
 
 
-def initialize_webdriver_and_navigate(url):
+@traced()
+def initialize_webdriver_and_navigate(url, download_dir=None, profile_name=None):
     """
     Initializes the webdriver and navigates to the specified URL.
+    Downloads go to `download_dir` (DOWNLOAD_DIR by default).
+    With BROWSER_PROFILE = "fast", `profile_name` selects the persistent profile directory.
     """
     try:
         driver_path = CHROME_DRIVER_PATH
         chrome_options = Options()
+        fast_profile = BROWSER_PROFILE == 'fast'
 
-        download_dir = os.path.join(os.getcwd(), DOWNLOAD_DIR)
+        download_dir = os.path.join(os.getcwd(), download_dir or DOWNLOAD_DIR)
         os.makedirs(download_dir, exist_ok=True)
 
-        chrome_options.add_experimental_option('prefs', {
+        prefs = {
             "download.default_directory": download_dir,
             "download.prompt_for_download": False,
             "download.directory_upgrade": True,
             "plugins.always_open_pdf_externally": True
-        })
+        }
+        if fast_profile:
+            prefs["profile.managed_default_content_settings.images"] = 2
+            apply_fast_profile(chrome_options, profile_name)
+        chrome_options.add_experimental_option('prefs', prefs)
+        if CAPTURE_DOWNLOADS:
+            enable_capture(chrome_options)
 
         driver = webdriver.Chrome(service=Service(executable_path=driver_path), options=chrome_options)
+        if fast_profile:
+            block_heavy_resources(driver, download_dir)
+        if CAPTURE_DOWNLOADS:
+            prepare_capture(driver)
+        # Allow in-page waits to time out on their own before WebDriver gives up on the script
+        driver.set_script_timeout(LOADING_SCREEN_TIMEOUT + 10)
         driver.get(url)
         logger.info(f"Navigated to {url}")
         return driver
@@ -119,16 +218,41 @@ def initialize_webdriver_and_navigate(url):
         raise
 
 
-def sign_in(driver):
+@traced()
+def sign_in(driver, credentials=None):
     """
-    Signs in to the website using credentials from config.
+    Signs in to the website with `credentials`, a (business partner number, user ID, password) tuple
+    (the credentials from config by default).
     """
+    # pages.py builds on the helpers in this module
+    from pages import LoginPage
+
+    business_partner_number, user_id, password = credentials or (BUSINESS_PARTNER_NUMBER, USER_ID, PASSWORD)
     try:
-        fill_form_field(driver, SELECTOR_BUSINESS_PARTNER_INPUT, BUSINESS_PARTNER_NUMBER)
-        fill_form_field(driver, SELECTOR_ID_INPUT, USER_ID)
-        fill_form_field(driver, SELECTOR_PASSWORD_INPUT, PASSWORD)
-        click_element(driver, SELECTOR_LOGIN_BUTTON)
+        LoginPage.for_driver(driver).sign_in(business_partner_number, user_id, password)
         logger.info("Sign-in process completed.")
     except Exception:
         logger.exception("Failed to sign in.")
         raise
+
+
+@traced()
+def ensure_signed_in(driver, credentials=None, session_file=None):
+    """
+    Reuses the saved session when `session_file` (SESSION_FILE by default) is configured and still valid;
+    otherwise signs in with `credentials` (see sign_in) and saves the new session for the next run.
+    """
+    session_file = session_file or SESSION_FILE
+    if not session_file:
+        sign_in(driver, credentials)
+        return
+
+    if restore_session(driver, session_file):
+        logger.info("Reused saved session, skipping sign-in.")
+        current_span().set("session_reused", True)
+        return
+
+    logger.info("Saved session missing or expired, signing in.")
+    current_span().set("session_reused", False)
+    sign_in(driver, credentials)
+    save_session(driver, session_file)
@@ -0,0 +1,113 @@
+import argparse
+import logging
+import os
+import shutil
+from datetime import date, timedelta
+
+from config import BACKFILL_DIR, LOGISTIC_GROUPS, PAZOMAT_LOGIN_URL, WORKER_POOL_SIZE
+from report_cache import set_force_refresh
+from reports import get_group_report
+from tracing import span, finish_run
+from workers import run_job_pool
+
+logger = logging.getLogger(__name__)
+
+FRIDAY = 4
+
+
+def format_end_date(day):
+    """
+    Formats a date the way the report form expects it (D/M/YYYY, see reports.get_previous_friday).
+    """
+    return f"{day.day}/{day.month}/{day.year}"
+
+
+def weekly_end_dates(start, end):
+    """
+    Returns the report period end dates (Fridays) between `start` and `end`, inclusive, oldest first.
+    """
+    friday = start + timedelta(days=(FRIDAY - start.weekday()) % 7)
+    end_dates = []
+    while friday <= end:
+        end_dates.append(format_end_date(friday))
+        friday += timedelta(weeks=1)
+    return end_dates
+
+
+def archive_path(logistic_group, end_date, backfill_dir=BACKFILL_DIR):
+    return os.path.join(backfill_dir, f"{logistic_group} {end_date.replace('/', '-')}.xlsx")
+
+
+def plan_backfill(logistic_groups, start, end, backfill_dir=BACKFILL_DIR, force=False):
+    """
+    Builds the (logistic group, end date) job matrix for the weeks between `start` and `end`.
+    Returns (jobs still to run, {job: archived report path} for the pairs already on disk).
+    Jobs are ordered week by week, so a worker can keep the report form's date between groups.
+    """
+    jobs = []
+    archived = {}
+    for end_date in weekly_end_dates(start, end):
+        for logistic_group in logistic_groups:
+            path = archive_path(logistic_group, end_date, backfill_dir)
+            if os.path.exists(path) and not force:
+                archived[(logistic_group, end_date)] = path
+            else:
+                jobs.append((logistic_group, end_date))
+    return jobs, archived
+
+
+def archive_report(report_file_path, logistic_group, end_date, backfill_dir=BACKFILL_DIR):
+    """
+    Copies a retrieved report into the backfill archive (atomically). Returns the archived path.
+    """
+    path = archive_path(logistic_group, end_date, backfill_dir)
+    os.makedirs(backfill_dir, exist_ok=True)
+    shutil.copyfile(report_file_path, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def run_backfill(logistic_groups, start, end, pool_size=WORKER_POOL_SIZE, backfill_dir=BACKFILL_DIR,
+                 force=False, url=PAZOMAT_LOGIN_URL):
+    """
+    Retrieves the weekly reports of `logistic_groups` for every week between `start` and `end`
+    on a pool of `pool_size` WebDriver sessions, and archives them in `backfill_dir`.
+    Pairs already archived are skipped (all of them are redone with `force`).
+    Returns (results, failures) keyed by (logistic group, end date); results include the skipped pairs.
+    """
+    jobs, archived = plan_backfill(logistic_groups, start, end, backfill_dir, force)
+    logger.info(f"Backfill {start} - {end}: {len(jobs)} reports to retrieve, {len(archived)} already archived.")
+    if not jobs:
+        return archived, {}
+
+    def retrieve(driver, job, download_dir):
+        logistic_group, end_date = job
+        report_file_path = get_group_report(driver, logistic_group, download_dir=download_dir, end_date=end_date)
+        return archive_report(report_file_path, logistic_group, end_date, backfill_dir)
+
+    set_force_refresh(force)
+    try:
+        with span("backfill", jobs=len(jobs), pool_size=pool_size):
+            results, failures = run_job_pool(jobs, retrieve, pool_size, url)
+    finally:
+        finish_run()
+
+    for (logistic_group, end_date), error in failures.items():
+        logger.error(f"  {logistic_group} ({end_date}): failed ({error})")
+    logger.info(f"Backfill finished: {len(results)} retrieved, {len(failures)} failed.")
+    return {**archived, **results}, failures
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Retrieve the weekly reports of past periods.")
+    parser.add_argument("--from", dest="start", required=True, type=date.fromisoformat, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", required=True, type=date.fromisoformat, help="last day (YYYY-MM-DD)")
+    parser.add_argument("--groups", nargs="+", default=list(LOGISTIC_GROUPS), help="logistic groups (default: all)")
+    parser.add_argument("--pool-size", type=int, default=max(1, WORKER_POOL_SIZE))
+    parser.add_argument("--dir", default=BACKFILL_DIR, help="archive directory")
+    parser.add_argument("--force", action="store_true", help="retrieve pairs that are already archived again")
+    args = parser.parse_args()
+
+    _, backfill_failures = run_backfill(args.groups, args.start, args.end, args.pool_size, args.dir, args.force)
+    raise SystemExit(1 if backfill_failures else 0)
@@ -0,0 +1,220 @@
+"""
+End-to-end benchmark: runs main.main() against the local stand-in site and SMTP sink,
+records per-step and total timings, and appends them (with the current git commit) to a JSON-lines file.
+
+Requires Chrome and chromedriver (CHROME_DRIVER_PATH) on the benchmark host.
+
+    python bench/run_benchmark.py --runs 3 --shade-ms 300 --export-ms 800
+"""
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin_site import start_standin_site
+from smtp_sink import start_smtp_sink
+
+DEFAULT_RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.jsonl")
+
+# (module, attribute) pairs timed as benchmark steps; "Class.method" names are patched on the class
+TIMED_STEPS = [
+    ("automation", "initialize_webdriver_and_navigate"),
+    ("automation", "ensure_signed_in"),
+    ("automation", "sign_in"),
+    ("automation", "wait_for_loading_to_disappear"),
+    ("pages", "BasePage.click"),
+    ("pages", "BasePage.fill"),
+    ("reports", "select_options"),
+    ("reports", "get_latest_report"),
+    ("reports", "get_information_reports"),
+    ("mailer", "MailerSession._deliver"),
+]
+PROJECT_MODULES = ["automation", "pages", "reports", "mailer", "workers", "session", "main"]
+
+
+class StepTimer:
+    """
+    Collects call counts and durations per step name (thread-safe).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.steps = defaultdict(lambda: {"count": 0, "total_s": 0.0, "max_s": 0.0})
+
+    def wrap(self, name, function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    step = self.steps[name]
+                    step["count"] += 1
+                    step["total_s"] += elapsed
+                    step["max_s"] = max(step["max_s"], elapsed)
+        return timed
+
+    def snapshot(self):
+        with self.lock:
+            return {name: {key: round(value, 4) if isinstance(value, float) else value
+                           for key, value in step.items()}
+                    for name, step in self.steps.items()}
+
+
+def instrument(timer):
+    """
+    Replaces every TIMED_STEPS function with a timed wrapper, in its own module and in every
+    project module that imported it by name.
+    """
+    modules = {name: sys.modules[name] for name in PROJECT_MODULES if name in sys.modules}
+    for module_name, attribute in TIMED_STEPS:
+        module = modules[module_name]
+        if "." in attribute:
+            class_name, method_name = attribute.split(".")
+            cls = getattr(module, class_name)
+            setattr(cls, method_name, timer.wrap(attribute, getattr(cls, method_name)))
+            continue
+
+        original = getattr(module, attribute)
+        timed = timer.wrap(attribute, original)
+        for other in modules.values():
+            if getattr(other, attribute, None) is original:
+                setattr(other, attribute, timed)
+
+
+def load_project(site, sink, download_dir):
+    """
+    Points config at the stand-in site, SMTP sink and `download_dir`, then imports and returns main.
+    config reads the environment once, on first import, so no project module may be imported before this;
+    raises RuntimeError rather than run against the production portal or mail server.
+    """
+    if "config" in sys.modules:
+        raise RuntimeError("config was imported before the benchmark environment was set.")
+    os.environ["PAZOMAT_LOGIN_URL"] = f"{site.base_url}/Login"
+    os.environ["SMTP_SERVER"] = sink.address
+    os.environ["DOWNLOAD_DIR"] = download_dir
+
+    import config
+    import main as fuel_main
+
+    if config.PAZOMAT_LOGIN_URL != os.environ["PAZOMAT_LOGIN_URL"] or config.SMTP_SERVER != sink.address:
+        raise RuntimeError("config does not point at the stand-in site and SMTP sink.")
+    site.logistic_groups = list(config.LOGISTIC_GROUPS)
+    return fuel_main
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def previous_result(results_file, settings):
+    """
+    Returns the most recent recorded result with the same benchmark settings, or None.
+    """
+    if not os.path.exists(results_file):
+        return None
+    latest = None
+    with open(results_file, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("settings") == settings:
+                latest = record
+    return latest
+
+
+def print_report(record, baseline):
+    print(f"\nBenchmark @ {record['commit']}{' (dirty)' if record['dirty'] else ''}: "
+          f"total {record['total_s']:.2f}s over {record['runs']} run(s), {record['emails_sent']} emails")
+    if baseline:
+        delta = record["total_s"] - baseline["total_s"]
+        print(f"  vs {baseline['commit']}: {baseline['total_s']:.2f}s ({delta:+.2f}s)")
+    lookups = record.get("element_lookups")
+    if lookups:
+        print(f"  element lookups: {lookups['lookups']} searched, {lookups['cache_hits']} from cache, "
+              f"{lookups['stale']} stale")
+
+    print(f"\n  {'step':<36}{'count':>7}{'total s':>10}{'max s':>9}{'prev total':>12}")
+    for name, step in sorted(record["steps"].items(), key=lambda item: -item[1]["total_s"]):
+        previous = baseline["steps"].get(name, {}).get("total_s") if baseline else None
+        previous_text = f"{previous:.3f}" if previous is not None else "-"
+        print(f"  {name:<36}{step['count']:>7}{step['total_s']:>10.3f}{step['max_s']:>9.3f}{previous_text:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark main.main() against the local stand-in site.")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--shade-ms", type=int, default=300)
+    parser.add_argument("--export-ms", type=int, default=800)
+    parser.add_argument("--results", default=DEFAULT_RESULTS_FILE, help="JSON-lines file to append results to")
+    parser.add_argument("--label", default="", help="free-text note stored with the result")
+    args = parser.parse_args()
+
+    site = start_standin_site(shade_ms=args.shade_ms, export_ms=args.export_ms)
+    sink = start_smtp_sink()
+    fuel_main = load_project(site, sink, tempfile.mkdtemp(prefix="fuelcheck-bench-"))
+
+    timer = StepTimer()
+    instrument(timer)
+
+    totals = []
+    for run in range(args.runs):
+        start = time.perf_counter()
+        fuel_main.main()
+        totals.append(time.perf_counter() - start)
+        print(f"Run {run + 1}/{args.runs}: {totals[-1]:.2f}s")
+
+    settings = {
+        "shade_ms": args.shade_ms,
+        "export_ms": args.export_ms,
+        "groups": len(fuel_main.LOGISTIC_GROUPS),
+        "pool_size": fuel_main.WORKER_POOL_SIZE,
+    }
+    commit, dirty = git_revision()
+    record = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "label": args.label,
+        "settings": settings,
+        "runs": args.runs,
+        "total_s": round(sum(totals) / len(totals), 3),
+        "run_totals_s": [round(total, 3) for total in totals],
+        "emails_sent": len(sink.message_sizes),
+        "steps": timer.snapshot(),
+        # Counted per run; these are the last run's
+        "element_lookups": fuel_main.lookup_counts(),
+    }
+
+    baseline = previous_result(args.results, settings)
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print_report(record, baseline)
+
+    site.shutdown()
+    sink.shutdown()
+
+
+if __name__ == "__main__":
+    main()
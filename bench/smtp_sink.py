@@ -0,0 +1,75 @@
+"""
+Minimal local SMTP server that accepts every message, for benchmark runs and the mailer tests.
+"""
+import socketserver
+import threading
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """
+    Minimal SMTP dialogue: accepts every message and records its size on the server (and its data, with
+    `keep_messages`). If `drop_after_messages` is set, the connection is closed after that many messages.
+    """
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        messages_on_connection = 0
+        self.reply("220 sink ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 sink")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                size = 0
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b".\r\n", b""):
+                        break
+                    size += len(data_line)
+                    if server.keep_messages:
+                        data.append(data_line)
+                with server.lock:
+                    server.message_sizes.append(size)
+                    if server.keep_messages:
+                        server.messages.append(b"".join(data))
+                messages_on_connection += 1
+                self.reply("250 Queued")
+                if server.drop_after_messages and messages_on_connection >= server.drop_after_messages:
+                    server.drop_after_messages = None
+                    return
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+def start_smtp_sink(port=0, keep_messages=False):
+    """
+    Starts the sink on a background thread. `server.address` is the "host:port" string for SMTP_SERVER.
+    With `keep_messages`, the raw data of every message is kept in `server.messages`.
+    """
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", port), SinkHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.message_sizes = []
+    server.messages = []
+    server.keep_messages = keep_messages
+    server.drop_after_messages = None
+    host, port = server.server_address
+    server.address = f"{host}:{port}"
+    threading.Thread(target=server.serve_forever, name="smtp-sink", daemon=True).start()
+    return server
@@ -0,0 +1,397 @@
+"""
+Local stand-in for the Pazomat portal, used by the end-to-end benchmark.
+
+It mimics only what the automation touches: the login form, the reports menu, the `mat-select` dropdowns,
+the loading shade, the date-picker overlay and the Excel export. Every element is built from the
+selectors in constants.py, so the automation runs against it unchanged. Delays are configurable.
+
+Run standalone:  python bench/standin_site.py --port 8765 --shade-ms 300 --export-ms 800
+"""
+import argparse
+import html
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import constants
+
+SESSION_COOKIE = "standin_session=ok"
+
+REPORT_COLUMNS = [
+    'מספר רכב', 'מוצר', 'כמות ליטר', 'סכום ברוטו ש"ח', 'תאריך', 'שעה', 'תחנה', 'מספר כרטיס',
+    'קבוצה לוגיסטית', 'מחיר ליטר', 'הנחה', 'סכום נטו', 'מד אוץ', 'נהג', 'מרכז עלות', 'סוג כרטיס'
+]
+DEFAULT_CHECKED = {'מספר רכב', 'תחנה', 'מספר כרטיס', 'הנחה'}
+
+
+def aria_label(selector):
+    """
+    Extracts the aria-label value from a constants.py CSS selector.
+    """
+    return re.search(r'aria-label="([^"]+)"', selector).group(1)
+
+
+def css_class(selector):
+    """
+    Extracts the class attribute value from a constants.py CSS selector.
+    """
+    return re.search(r'class="([^"]+)"', selector).group(1)
+
+
+def build_xlsx(columns, rows):
+    """
+    Builds a minimal xlsx workbook (inline strings, single sheet) without third-party libraries.
+    """
+    def cell(value):
+        if isinstance(value, (int, float)):
+            return f'<c t="n"><v>{value}</v></c>'
+        return f'<c t="inlineStr"><is><t>{html.escape(str(value))}</t></is></c>'
+
+    sheet_rows = "".join(
+        f'<row r="{index}">{"".join(cell(value) for value in row)}</row>'
+        for index, row in enumerate([columns] + rows, start=1)
+    )
+    files = {
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'
+        ),
+        "_rels/.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ),
+        "xl/workbook.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Report" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            'Target="worksheets/sheet1.xml"/></Relationships>'
+        ),
+        "xl/worksheets/sheet1.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f'<sheetData>{sheet_rows}</sheetData></worksheet>'
+        ),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def sample_rows(logistic_group, end_date, columns, count=40):
+    """
+    Deterministic fake fuelling rows for the selected columns.
+    """
+    day, month, year = (int(part) for part in end_date.split("/"))
+    rows = []
+    for i in range(count):
+        liters = 20 + (i * 7) % 60
+        values = {
+            'מספר רכב': f"{10 + i % 9}-{300 + i % 5}-{40 + len(logistic_group)}",
+            'מוצר': 'סולר' if i % 3 else 'בנזין 95',
+            'כמות ליטר': liters,
+            'סכום ברוטו ש"ח': round(liters * 7.1, 2),
+            'תאריך': f"{max(1, day - i % 7)}/{month}/{year}",
+            'קבוצה לוגיסטית': logistic_group,
+        }
+        rows.append([values.get(column, f"{column} {i}") for column in columns])
+    return rows
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html dir="rtl"><head><meta charset="utf-8"><title>Pazomat stand-in</title>
+<style>
+  mat-select, mat-option {{ display: block; padding: 6px; border: 1px solid #999; margin: 4px; cursor: pointer; }}
+  .{shade_class} {{ position: fixed; inset: 0; background: rgba(0,0,0,.2); align-items: center; justify-content: center; }}
+  .options {{ border: 1px solid #333; margin: 4px; }}
+  #{overlay_id} {{ position: fixed; top: 60px; left: 60px; width: 240px; height: 200px; background: #eee; z-index: 20; }}
+  .cdk-overlay-backdrop {{ position: fixed; inset: 0; z-index: 10; }}
+  .hidden {{ display: none; }}
+</style></head>
+<body>
+<div class="{shade_class}" style="display: flex;">Loading...</div>
+{menu}
+{content}
+<script>
+const SHADE_MS = {shade_ms};
+function shade(ms, then) {{
+  const el = document.querySelector('.{shade_class}');
+  el.style.display = 'flex';
+  setTimeout(() => {{ el.style.display = 'none'; if (then) then(); }}, ms);
+}}
+function go(url) {{ shade(SHADE_MS, () => {{ window.location.href = url; }}); }}
+function openSelect(select, options, onPick) {{
+  document.querySelectorAll('.options').forEach(el => el.remove());
+  const list = document.createElement('div');
+  list.className = 'options';
+  options.forEach(text => {{
+    const option = document.createElement('mat-option');
+    const span = document.createElement('span');
+    span.textContent = text;
+    option.appendChild(span);
+    option.addEventListener('click', (event) => {{
+      event.stopPropagation();
+      select.textContent = text;
+      select.dataset.value = text;
+      list.remove();
+      onPick(text);
+    }});
+    list.appendChild(option);
+  }});
+  select.after(list);
+}}
+shade(SHADE_MS);
+{script}
+</script>
+</body></html>
+"""
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """
+    Serves the stand-in pages. Server attributes: shade_ms, export_ms, logistic_groups (offered in the group
+    select), requests (list of paths).
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _page(self, content, script="", menu=True):
+        menu_html = (
+            f'<div aria-label="{aria_label(constants.SELECTOR_REPORTS_MENU)}" '
+            f'onclick="go(\'/Reports\')" style="cursor: pointer">דוחות מידע</div>'
+            f'<button class="{css_class(constants.SELECTOR_BACK_BUTTON)}" onclick="history.back()">חזרה</button>'
+            if menu else ""
+        )
+        page = PAGE_TEMPLATE.format(
+            shade_class=constants.LOADING_SCREEN_SELECTOR.split(".")[-1],
+            overlay_id=constants.DATE_PICKER_OVERLAY_ID,
+            shade_ms=self.server.shade_ms,
+            menu=menu_html,
+            content=content,
+            script=script,
+        )
+        self._send(200, page.encode("utf-8"))
+
+    def _signed_in(self):
+        return SESSION_COOKIE in (self.headers.get("Cookie") or "")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.server.requests.append(url.path)
+
+        if url.path in ("/", "/Login"):
+            return self._login_page()
+        if url.path == "/signin":
+            return self._send(302, headers={"Location": "/Home", "Set-Cookie": f"{SESSION_COOKIE}; Path=/"})
+        if not self._signed_in():
+            return self._send(302, headers={"Location": "/Login"})
+        if url.path == "/Home":
+            return self._page("<h1>ברוכים הבאים</h1>")
+        if url.path == "/Reports":
+            return self._reports_page()
+        if url.path == "/Reports/View":
+            return self._view_page(query)
+        if url.path == "/Reports/Export":
+            return self._export_page(query)
+        if url.path == "/download":
+            return self._download(query)
+        return self._send(404, b"not found")
+
+    def _login_page(self):
+        fields = "".join(
+            f'<input aria-label="{aria_label(selector)}" type="{kind}"><br>'
+            for selector, kind in [
+                (constants.SELECTOR_BUSINESS_PARTNER_INPUT, "text"),
+                (constants.SELECTOR_ID_INPUT, "text"),
+                (constants.SELECTOR_PASSWORD_INPUT, "password"),
+            ]
+        )
+        content = (f'{fields}<button aria-label="{aria_label(constants.SELECTOR_LOGIN_BUTTON)}" '
+                   f'onclick="go(\'/signin\')">כניסה</button>')
+        self._page(content, menu=False)
+
+    def _reports_page(self):
+        backdrop_class = css_class(constants.DATE_PICKER_OVERLAY_BACKDROP)
+        content = f"""
+<mat-select aria-label="{aria_label(constants.SELECTOR_REPORT_DROPDOWN)}">בחר דוח</mat-select>
+<div id="report-form" class="hidden">
+  <input aria-label="{aria_label(constants.SELECTOR_DATE_INPUT)}" type="text">
+  <mat-select aria-label="{aria_label(constants.SELECTOR_LOGISTIC_GROUP_SELECT)}">קבוצה</mat-select>
+  <div aria-label="{aria_label(constants.SELECTOR_SHOW_REPORT_BUTTON)}" style="cursor: pointer">הצג דוח</div>
+</div>
+<div id="{constants.DATE_PICKER_OVERLAY_ID}" class="hidden">לוח שנה</div>
+<div id="backdrop" class="hidden"></div>
+"""
+        script = f"""
+const reportTypes = {json.dumps(['דוח ריכוז תדלוקים', constants.REPORT_TYPE_TEXT, 'דוח חריגות'])};
+const groups = {json.dumps(list(self.server.logistic_groups))};
+const reportSelect = document.querySelector('mat-select[aria-label="{aria_label(constants.SELECTOR_REPORT_DROPDOWN)}"]');
+const groupSelect = document.querySelector('mat-select[aria-label="{aria_label(constants.SELECTOR_LOGISTIC_GROUP_SELECT)}"]');
+const dateInput = document.querySelector('input[aria-label="{aria_label(constants.SELECTOR_DATE_INPUT)}"]');
+const overlay = document.getElementById('{constants.DATE_PICKER_OVERLAY_ID}');
+const backdrop = document.getElementById('backdrop');
+reportSelect.addEventListener('click', () => openSelect(reportSelect, reportTypes, (text) => {{
+  sessionStorage.setItem('reportType', text);
+  shade(SHADE_MS, () => document.getElementById('report-form').classList.remove('hidden'));
+}}));
+groupSelect.addEventListener('click', () => openSelect(groupSelect, groups, (text) => {{
+  sessionStorage.setItem('group', text);
+}}));
+dateInput.addEventListener('input', () => sessionStorage.setItem('date', dateInput.value));
+// Like the Angular app, the form keeps its state on back/forward navigation but not on reload
+const navigation = performance.getEntriesByType('navigation')[0];
+if (navigation && navigation.type === 'back_forward' && sessionStorage.getItem('reportType')) {{
+  reportSelect.textContent = sessionStorage.getItem('reportType');
+  dateInput.value = sessionStorage.getItem('date') || '';
+  if (sessionStorage.getItem('group')) {{
+    groupSelect.textContent = groupSelect.dataset.value = sessionStorage.getItem('group');
+  }}
+  document.getElementById('report-form').classList.remove('hidden');
+}} else {{
+  sessionStorage.clear();
+}}
+dateInput.addEventListener('click', () => {{
+  overlay.classList.remove('hidden');
+  overlay.style.display = '';
+  backdrop.className = '{backdrop_class}';
+}});
+backdrop.addEventListener('click', () => {{
+  overlay.classList.add('hidden');
+  backdrop.className = 'hidden';
+}});
+document.querySelector('div[aria-label="{aria_label(constants.SELECTOR_SHOW_REPORT_BUTTON)}"]').addEventListener('click', () => {{
+  const params = new URLSearchParams({{date: dateInput.value, group: groupSelect.dataset.value || ''}});
+  go('/Reports/View?' + params.toString());
+}});
+"""
+        self._page(content, script)
+
+    def _view_page(self, query):
+        rows = "".join(f"<tr><td>{html.escape(str(value))}</td></tr>"
+                       for value, *_ in sample_rows(query.get("group", ""), query.get("date", "1/1/2000"),
+                                                    ['מספר רכב'], count=10))
+        content = f"""
+<h2>{html.escape(query.get("group", ""))} - {html.escape(query.get("date", ""))}</h2>
+<table>{rows}</table>
+<button aria-label="{aria_label(constants.SELECTOR_EXPORT_EXCEL_BUTTON)}">ייצוא לאקסל</button>
+"""
+        script = f"""
+document.querySelector('button[aria-label="{aria_label(constants.SELECTOR_EXPORT_EXCEL_BUTTON)}"]').addEventListener('click', () => {{
+  go('/Reports/Export' + window.location.search);
+}});
+"""
+        self._page(content, script)
+
+    def _export_page(self, query):
+        checkboxes = "".join(
+            f'<label><div class="checkbox-wrapper" style="display: inline-block">'
+            f'<input type="checkbox" aria-checked="{"true" if column in DEFAULT_CHECKED else "false"}"'
+            f'{" checked" if column in DEFAULT_CHECKED else ""}></div><span>{html.escape(column)}</span></label><br>'
+            for column in REPORT_COLUMNS
+        )
+        content = f"""
+<div id="columns">{checkboxes}</div>
+<button aria-label="{aria_label(constants.SELECTOR_GENERATE_REPORT_BUTTON)}">הפקת דוח</button>
+"""
+        script = f"""
+document.querySelectorAll('.checkbox-wrapper').forEach(wrapper => {{
+  wrapper.addEventListener('click', (event) => {{
+    const box = wrapper.querySelector('input');
+    if (event.target !== box) box.checked = !box.checked;
+    box.setAttribute('aria-checked', box.checked ? 'true' : 'false');
+  }});
+}});
+document.querySelector('button[aria-label="{aria_label(constants.SELECTOR_GENERATE_REPORT_BUTTON)}"]').addEventListener('click', () => {{
+  const columns = [...document.querySelectorAll('#columns label')]
+    .filter(label => label.querySelector('input').checked)
+    .map(label => label.querySelector('span').textContent);
+  const params = new URLSearchParams(window.location.search);
+  params.set('columns', JSON.stringify(columns));
+  window.location.href = '/download?' + params.toString();
+}});
+"""
+        self._page(content, script)
+
+    def _download(self, query):
+        time.sleep(self.server.export_ms / 1000)
+        logistic_group = query.get("group", "")
+        end_date = query.get("date") or "1/1/2000"
+        columns = json.loads(query.get("columns", "[]")) or ['מספר רכב']
+        data = build_xlsx(columns, sample_rows(logistic_group, end_date, columns))
+        file_name = f"report-{int(time.time() * 1000)}.xlsx"
+        self._send(200, data, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                   {"Content-Disposition": f'attachment; filename="{file_name}"'})
+
+
+def start_standin_site(port=0, shade_ms=300, export_ms=800, logistic_groups=()):
+    """
+    Starts the stand-in site on a background thread. Returns the server; its base URL is `server.base_url`.
+    The site does not import config: callers pass the groups to offer, and may update
+    `server.logistic_groups` once config has been loaded for the stand-in.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandinHandler)
+    server.daemon_threads = True
+    server.shade_ms = shade_ms
+    server.export_ms = export_ms
+    server.logistic_groups = list(logistic_groups)
+    server.requests = []
+    host, port = server.server_address
+    server.base_url = f"http://{host}:{port}"
+    threading.Thread(target=server.serve_forever, name="standin-site", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the local Pazomat stand-in site.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--shade-ms", type=int, default=300, help="loading shade duration per step")
+    parser.add_argument("--export-ms", type=int, default=800, help="delay before the xlsx download starts")
+    args = parser.parse_args()
+
+    from config import LOGISTIC_GROUPS
+
+    site = start_standin_site(args.port, args.shade_ms, args.export_ms, LOGISTIC_GROUPS)
+    print(f"Stand-in site running at {site.base_url}/Login (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        site.shutdown()
@@ -0,0 +1,128 @@
+import base64
+import json
+import logging
+import re
+import time
+
+from selenium.common import TimeoutException, WebDriverException
+
+from http_export import XLSX_SIGNATURE
+
+logger = logging.getLogger(__name__)
+
+XLSX_MIME_TYPES = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.ms-excel",
+    "application/octet-stream",
+)
+# Keep large responses in Chrome's network buffer long enough to read them
+MAX_RESOURCE_BUFFER_SIZE = 64 * 1024 * 1024
+MAX_TOTAL_BUFFER_SIZE = 256 * 1024 * 1024
+POLL_INTERVAL = 0.2
+
+
+class CaptureError(Exception):
+    """
+    Raised when the exported report cannot be read from the browser's network traffic.
+    """
+
+
+def enable_capture(chrome_options):
+    """
+    Turns on Chrome's performance log, which carries the DevTools network events read by ReportCapture.
+    """
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def prepare_capture(driver):
+    """
+    Enables the DevTools network domain with buffers large enough to hold an exported report.
+    """
+    try:
+        driver.execute_cdp_cmd("Network.enable", {
+            "maxResourceBufferSize": MAX_RESOURCE_BUFFER_SIZE,
+            "maxTotalBufferSize": MAX_TOTAL_BUFFER_SIZE
+        })
+    except WebDriverException:
+        logger.warning("Failed to enable network capture, reports will be read from the download folder.")
+
+
+def is_report_response(response):
+    """
+    Returns True if a DevTools Network.Response looks like an xlsx export.
+    """
+    headers = {name.lower(): value for name, value in (response.get("headers") or {}).items()}
+    disposition = headers.get("content-disposition", "")
+    if re.search(r"filename\*?=[^;]*\.xlsx", disposition, re.IGNORECASE):
+        return True
+    mime_type = (response.get("mimeType") or "").lower()
+    return mime_type in XLSX_MIME_TYPES and (mime_type != "application/octet-stream" or "attachment" in disposition)
+
+
+class ReportCapture:
+    """
+    Reads an exported xlsx straight from the driver's network traffic: the performance log shows the
+    export response and when it finished loading, and the body is then fetched over CDP
+    (Network.getResponseBody). Each driver has its own log, so concurrent runs never see each
+    other's reports. Enter the context before triggering the export.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._candidates = {}
+
+    def __enter__(self):
+        # Drop the events of everything that happened before the export
+        self._read_events()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def _read_events(self):
+        try:
+            entries = self.driver.get_log("performance")
+        except WebDriverException as e:
+            raise CaptureError(f"Performance log is not available: {e}") from e
+
+        events = []
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            events.append((message.get("method"), message.get("params") or {}))
+        return events
+
+    def _response_body(self, request_id):
+        try:
+            body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except WebDriverException as e:
+            raise CaptureError(f"Response body is not available: {e}") from e
+
+        data = base64.b64decode(body["body"]) if body.get("base64Encoded") else body["body"].encode("latin-1")
+        if not data.startswith(XLSX_SIGNATURE):
+            raise CaptureError("Captured response is not an xlsx file.")
+        return data
+
+    def wait_for_report(self, timeout=120):
+        """
+        Returns the bytes of the first xlsx response that finishes loading within `timeout` seconds.
+        Raises TimeoutException if none does, or CaptureError if it cannot be read over CDP
+        (e.g. Chrome turned it into a download and did not keep the body).
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for method, params in self._read_events():
+                request_id = params.get("requestId")
+                if method == "Network.responseReceived" and is_report_response(params.get("response", {})):
+                    self._candidates[request_id] = params["response"].get("url")
+                elif method == "Network.loadingFinished" and request_id in self._candidates:
+                    data = self._response_body(request_id)
+                    logger.debug(f"Captured {len(data)} bytes from {self._candidates[request_id]}")
+                    return data
+                elif method == "Network.loadingFailed" and request_id in self._candidates:
+                    raise CaptureError(f"Export response failed to load: {params.get('errorText')}")
+            time.sleep(POLL_INTERVAL)
+
+        raise TimeoutException(f"No report response captured within {timeout} seconds.")
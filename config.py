@@ -11,16 +11,91 @@ load_dotenv()
 # 1. Chrome WebDriver Settings
 CHROME_DRIVER_PATH = os.getenv("CHROME_DRIVER_PATH", r"C:\Path\To\ChromeDriver\chromedriver.exe")
 DOWNLOAD_DIR = os.getenv("DOWNLOAD_DIR", "report list")
+# Downloaded reports are cached under DOWNLOAD_DIR/cache for this many days (0 = no cache)
+REPORT_CACHE_TTL_DAYS = float(os.getenv("REPORT_CACHE_TTL_DAYS", "7"))
+# SQLite file that accumulates the rows of every downloaded report (empty = no store)
+REPORT_STORE = os.getenv("REPORT_STORE", os.path.join(DOWNLOAD_DIR, "fuel_reports.sqlite"))
+
+# JSON-lines journal of generated and emailed reports, used by `main.py --resume` (empty = no journal)
+RUN_JOURNAL = os.getenv("RUN_JOURNAL", os.path.join(DOWNLOAD_DIR, "run_journal.jsonl"))
+
+# Archive of historical weekly reports written by backfill.py, one file per logistic group and week
+BACKFILL_DIR = os.getenv("BACKFILL_DIR", os.path.join(DOWNLOAD_DIR, "backfill"))
+
+# Browser profile: "default" (headed Chrome) or "fast" (headless, eager page load,
+# no images/fonts/analytics, persistent profile directory under CHROME_PROFILE_DIR)
+BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", "default")
+CHROME_PROFILE_DIR = os.getenv("CHROME_PROFILE_DIR", "chrome profile")
+
+# Capture the exported xlsx from the browser's network traffic (Chrome DevTools) instead of
+# finding Chrome's download in DOWNLOAD_DIR; the download folder is only used as a fallback.
+CAPTURE_DOWNLOADS = os.getenv("CAPTURE_DOWNLOADS", "false").lower() in ("1", "true", "yes")
+
+PAZOMAT_LOGIN_URL = os.getenv("PAZOMAT_LOGIN_URL", "https://service.pazomat.co.il/Login")
+
+# Optional backend export endpoint; when set, reports are fetched over HTTP and the browser UI is
+# only used as a fallback. EXPORT_API_TOKEN_KEY names a localStorage entry holding a bearer token.
+EXPORT_API_URL = os.getenv("EXPORT_API_URL", "")
+EXPORT_API_TOKEN_KEY = os.getenv("EXPORT_API_TOKEN_KEY", "")
+
+# Retry policy for clicks and form fields (seconds). RETRY_SELECTOR_BUDGET caps the total time spent
+# on one selector; RUN_DEADLINE caps the whole run (0 = no deadline).
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_ATTEMPT_TIMEOUT = float(os.getenv("RETRY_ATTEMPT_TIMEOUT", "20"))
+RETRY_SELECTOR_BUDGET = float(os.getenv("RETRY_SELECTOR_BUDGET", "60"))
+RETRY_POLL_INTERVAL = float(os.getenv("RETRY_POLL_INTERVAL", "0.1"))
+RUN_DEADLINE = float(os.getenv("RUN_DEADLINE", "0"))
+
+# Directory for per-run JSON trace files (empty = tracing disabled)
+TRACE_DIR = os.getenv("TRACE_DIR", "")
+
+# Number of parallel WebDriver sessions used to retrieve reports (1 = sequential)
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "1"))
+
+# YAML or CSV file with the accounts, logistic groups and recipients to process (see job_queue.py).
+# When set, it replaces the credentials and LOGISTIC_GROUPS below. Reports are retrieved with
+# WORKER_POOL_SIZE sessions, at most ACCOUNT_MAX_SESSIONS per account (unless the file says otherwise),
+# and at most JOB_RATE_PER_MINUTE report exports per minute across all sessions (0 = no limit).
+JOB_CONFIG = os.getenv("JOB_CONFIG", "")
+ACCOUNT_MAX_SESSIONS = int(os.getenv("ACCOUNT_MAX_SESSIONS", "2"))
+JOB_RATE_PER_MINUTE = float(os.getenv("JOB_RATE_PER_MINUTE", "30"))
+
+# daemon.py: when to run (e.g. "fri 08:00", "mon,thu 06:30", "daily 07:00"), the local control port,
+# seconds between driver health checks, and the JS heap size (MB) that triggers a browser restart (0 = none)
+DAEMON_SCHEDULE = os.getenv("DAEMON_SCHEDULE", "fri 08:00")
+DAEMON_PORT = int(os.getenv("DAEMON_PORT", "8788"))
+DAEMON_HEALTH_INTERVAL = float(os.getenv("DAEMON_HEALTH_INTERVAL", "300"))
+DAEMON_MAX_HEAP_MB = float(os.getenv("DAEMON_MAX_HEAP_MB", "512"))
 
 # 2. Credentials for pazomat.co.il
 BUSINESS_PARTNER_NUMBER = os.getenv("BUSINESS_PARTNER_NUMBER", "YOUR_BUSINESS_PARTNER_NO")
 USER_ID = os.getenv("ID", "YOUR_ID")
 
 PASSWORD = os.getenv("PASSWORD", "YOUR_PASSWORD")
+
+# Optional file for persisting the signed-in session between runs (empty = always sign in)
+SESSION_FILE = os.getenv("SESSION_FILE", "")
+
 # 3. SMTP/Email Settings
 SMTP_SERVER = os.getenv("SMTP_SERVER", "192.168.20.30")
 SENDER_EMAIL = os.getenv("SENDER_EMAIL", "pycharm@budget.co.il")
 
+# Send one email per distinct recipient set, with all of its groups' reports attached
+# (instead of one email per logistic group), optionally packed into a single zip file
+BATCH_BY_RECIPIENT = os.getenv("BATCH_BY_RECIPIENT", "true").lower() in ("1", "true", "yes")
+ZIP_ATTACHMENTS = os.getenv("ZIP_ATTACHMENTS", "false").lower() in ("1", "true", "yes")
+
+# Columns selected in the exported report (';'-separated when set from the environment)
+REPORT_COLUMNS = [
+    column.strip()
+    for column in os.getenv("REPORT_COLUMNS", 'מספר רכב;מוצר;כמות ליטר;סכום ברוטו ש"ח;תאריך').split(";")
+    if column.strip()
+]
+
+# Text of the logistic group option covering every group. When set, one all-groups report is generated
+# and split locally into per-group files instead of running the UI flow once per group (empty = per group).
+ALL_GROUPS_OPTION = os.getenv("ALL_GROUPS_OPTION", "")
+
 LOGISTIC_GROUPS = {
     'אילת': 'eilat@budget.co.il;anabely@budget.co.il',
     'ירושלים': 'jerusalem@budget.co.il',
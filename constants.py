@@ -17,14 +17,22 @@ SELECTOR_GENERATE_REPORT_BUTTON = 'button[aria-label="הפקת דוח"]'
 # Other Buttons/Elements
 SELECTOR_BACK_BUTTON = 'button[class="btn-back mat-button mat-button-base"]'
 
+# Report column holding each row's logistic group (added to all-groups reports so they can be split locally)
+GROUP_COLUMN_LABEL = 'קבוצה לוגיסטית'
+
 # Xpath
 XPATH_OPTION_TEMPLATE = "//mat-option/span[contains(text(), '{option_text}')]"
 
-# Example for label checkboxes (used in `select_options`):
+# Report column checkboxes (used in `select_options`); each label is the <span> inside the checkbox's <label>
 CHECKBOX_SELECTOR = "input[type='checkbox']"
-CHECKBOX_LABEL_XPATH = "./ancestor::label/span"
 
 # Misc
 LOADING_SCREEN_SELECTOR = 'div.example-loading-shade'
 DATE_PICKER_OVERLAY_ID = 'cdk-overlay-1'
 DATE_PICKER_OVERLAY_BACKDROP = 'div[class="cdk-overlay-backdrop mat-overlay-transparent-backdrop cdk-overlay-backdrop-showing"]'
+
+# Requests blocked by the "fast" browser profile
+BLOCKED_URL_PATTERNS = [
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*hotjar.com*'
+]
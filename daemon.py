@@ -0,0 +1,310 @@
+import argparse
+import json
+import logging
+import queue
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta
+
+from automation import initialize_webdriver_and_navigate, ensure_signed_in
+from config import (
+    DAEMON_SCHEDULE,
+    DAEMON_PORT,
+    DAEMON_HEALTH_INTERVAL,
+    DAEMON_MAX_HEAP_MB,
+    PAZOMAT_LOGIN_URL
+)
+from session import is_signed_in
+import main as report_run
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+SESSION_CHECK_TIMEOUT = 10
+JS_HEAP_SCRIPT = "return window.performance && performance.memory ? performance.memory.usedJSHeapSize : null;"
+
+
+def parse_schedule(schedule):
+    """
+    Parses a schedule such as "fri 08:00", "mon,thu 06:30" or "daily 07:00".
+    Returns (set of weekday numbers, hour, minute).
+    """
+    try:
+        days_text, time_text = schedule.strip().lower().split()
+        hour, minute = (int(part) for part in time_text.split(":"))
+        if days_text == "daily":
+            days = set(range(7))
+        else:
+            days = {WEEKDAYS.index(day.strip()[:3]) for day in days_text.split(",")}
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError
+    except ValueError:
+        raise ValueError(f"Invalid schedule '{schedule}', expected e.g. 'fri 08:00' or 'daily 07:00'.")
+    return days, hour, minute
+
+
+def next_run_time(schedule, now):
+    """
+    Returns the first scheduled time strictly after `now`.
+    """
+    days, hour, minute = parse_schedule(schedule)
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    for offset in range(8):
+        run_at = candidate + timedelta(days=offset)
+        if run_at > now and run_at.weekday() in days:
+            return run_at
+    raise AssertionError("unreachable: every schedule has a weekday")
+
+
+class WarmDriver:
+    """
+    Keeps one signed-in WebDriver alive between report runs and replaces it when it is unhealthy:
+    the session died, the sign-in expired and cannot be renewed, or the page's JS heap grew past
+    `max_heap_mb` (0 = no limit).
+    """
+
+    def __init__(self, url=PAZOMAT_LOGIN_URL, max_heap_mb=DAEMON_MAX_HEAP_MB):
+        self.url = url
+        self.max_heap_mb = max_heap_mb
+        self.driver = None
+        self.started_at = None
+        self.recycles = 0
+        self.last_health = {}
+
+    def start(self):
+        self.driver = initialize_webdriver_and_navigate(self.url)
+        self.started_at = time.time()
+        ensure_signed_in(self.driver)
+        logger.info("Warm driver started and signed in.")
+
+    def quit(self):
+        if self.driver is None:
+            return
+        try:
+            self.driver.quit()
+        except Exception:
+            logger.warning("Failed to close WebDriver gracefully.")
+        self.driver = None
+
+    def recycle(self, reason):
+        logger.warning(f"Recycling the driver: {reason}")
+        self.quit()
+        self.recycles += 1
+        self.start()
+
+    def check_health(self):
+        """
+        Returns a health dict ('alive', 'signed_in', 'heap_mb', 'reason'); 'reason' is set when
+        the driver has to be recycled. An expired sign-in is renewed in place when possible.
+        """
+        health = {"alive": False, "signed_in": False, "heap_mb": None, "reason": None}
+        if self.driver is None:
+            health["reason"] = "no driver"
+            return health
+
+        try:
+            heap = self.driver.execute_script(JS_HEAP_SCRIPT)
+            health["alive"] = True
+        except Exception as e:
+            health["reason"] = f"session is dead ({type(e).__name__})"
+            return health
+
+        if heap is not None:
+            health["heap_mb"] = round(heap / (1024 * 1024), 1)
+            if self.max_heap_mb and health["heap_mb"] > self.max_heap_mb:
+                health["reason"] = f"JS heap at {health['heap_mb']} MB (limit {self.max_heap_mb} MB)"
+                return health
+
+        try:
+            self.driver.refresh()
+            health["signed_in"] = is_signed_in(self.driver, SESSION_CHECK_TIMEOUT)
+            if not health["signed_in"]:
+                logger.info("Sign-in expired, signing in again.")
+                self.driver.get(self.url)
+                ensure_signed_in(self.driver)
+                health["signed_in"] = is_signed_in(self.driver, SESSION_CHECK_TIMEOUT)
+        except Exception as e:
+            health["reason"] = f"health check failed ({type(e).__name__})"
+            return health
+
+        if not health["signed_in"]:
+            health["reason"] = "cannot sign in again"
+        return health
+
+    def get(self):
+        """
+        Returns a healthy, signed-in driver, starting or recycling it as needed.
+        """
+        health = self.check_health()
+        if health["reason"]:
+            if self.driver is None:
+                self.start()
+            else:
+                self.recycle(health["reason"])
+            health = self.check_health()
+        self.last_health = dict(health, checked_at=time.time())
+        return self.driver
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    """
+    One command per connection: a line of text in, a line of JSON out.
+    """
+
+    def handle(self):
+        command = self.rfile.readline().decode("utf-8").strip()
+        try:
+            reply = self.server.report_daemon.handle_command(command)
+        except Exception as e:
+            logger.exception(f"Control command '{command}' failed")
+            reply = {"ok": False, "error": str(e)}
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+class ReportDaemon:
+    """
+    Runs the report job on a schedule (DAEMON_SCHEDULE) and on demand, on one warm WebDriver.
+    Control commands over a local TCP socket (127.0.0.1:DAEMON_PORT):
+      run [--force]   queue a report run
+      status          schedule, health and last run
+      recycle         restart the browser
+      stop            finish the current job and exit
+    Jobs and driver checks all run on the thread that called `serve_forever`.
+    """
+
+    def __init__(self, schedule=DAEMON_SCHEDULE, port=DAEMON_PORT, health_interval=DAEMON_HEALTH_INTERVAL,
+                 warm_driver=None, run_report=report_run.main):
+        parse_schedule(schedule)
+        self.schedule = schedule
+        self.port = port
+        self.health_interval = health_interval
+        self.warm_driver = warm_driver or WarmDriver()
+        self.run_report = run_report
+        self.next_run = None
+        self.last_run = None
+        self._commands = queue.Queue()
+        self._server = None
+        self._stopping = False
+
+    def start_control_server(self):
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", self.port), _ControlHandler)
+        server.daemon_threads = True
+        server.report_daemon = self
+        self.port = server.server_address[1]
+        self._server = server
+        threading.Thread(target=server.serve_forever, name="daemon-control", daemon=True).start()
+        logger.info(f"Daemon listening for commands on 127.0.0.1:{self.port}")
+
+    def handle_command(self, command):
+        """
+        Answers a control command. Commands that touch the browser are queued for the main loop.
+        """
+        parts = command.split()
+        name = parts[0].lower() if parts else ""
+        if name == "status":
+            return {
+                "ok": True,
+                "schedule": self.schedule,
+                "next_run": self.next_run.isoformat() if self.next_run else None,
+                "last_run": self.last_run,
+                "health": self.warm_driver.last_health,
+                "recycles": self.warm_driver.recycles,
+                "queued": self._commands.qsize(),
+            }
+        if name == "run":
+            self._commands.put(("run", "--force" in parts))
+        elif name in ("recycle", "stop"):
+            self._commands.put((name, None))
+        else:
+            return {"ok": False, "error": f"unknown command '{command}'"}
+        return {"ok": True, "queued": name}
+
+    def run_job(self, force=False):
+        """
+        Runs one report job on the warm driver and records its outcome: the run is ok only when
+        every logistic group was emailed.
+        """
+        started = time.time()
+        self.last_run = {"started_at": started, "force": force, "ok": False}
+        try:
+            driver = self.warm_driver.get()
+            failed = self.run_report(force=force, driver=driver) or {}
+            self.last_run["ok"] = not failed
+            self.last_run["errors"] = len(failed)
+            if failed:
+                self.last_run["failed"] = {group: str(error) for group, error in failed.items()}
+        except Exception as e:
+            logger.exception("Report job failed.")
+            self.last_run["error"] = str(e)
+        self.last_run["duration"] = round(time.time() - started, 1)
+
+    def _check_health(self):
+        try:
+            self.warm_driver.get()
+        except Exception:
+            logger.exception("Driver health check failed, will retry.")
+            self.warm_driver.last_health = {"reason": "failed to start", "checked_at": time.time()}
+
+    def stop(self):
+        self._commands.put(("stop", None))
+
+    def serve_forever(self):
+        self.start_control_server()
+        self._check_health()
+        last_health_check = time.monotonic()
+        self.next_run = next_run_time(self.schedule, datetime.now())
+        logger.info(f"Next scheduled run: {self.next_run:%a %d/%m/%Y %H:%M}")
+        try:
+            while not self._stopping:
+                until_run = (self.next_run - datetime.now()).total_seconds()
+                until_health = self.health_interval - (time.monotonic() - last_health_check)
+                try:
+                    command, argument = self._commands.get(timeout=max(0.0, min(until_run, until_health)))
+                except queue.Empty:
+                    command, argument = None, None
+
+                if command == "stop":
+                    logger.info("Stop requested.")
+                    self._stopping = True
+                elif command == "run":
+                    self.run_job(force=argument)
+                elif command == "recycle":
+                    try:
+                        self.warm_driver.recycle("requested over the control socket")
+                    except Exception:
+                        logger.exception("Failed to restart the driver.")
+                elif datetime.now() >= self.next_run:
+                    logger.info("Starting scheduled report run.")
+                    self.run_job()
+                    self.next_run = next_run_time(self.schedule, datetime.now())
+                    logger.info(f"Next scheduled run: {self.next_run:%a %d/%m/%Y %H:%M}")
+                elif time.monotonic() - last_health_check >= self.health_interval:
+                    self._check_health()
+                    last_health_check = time.monotonic()
+        finally:
+            self._server.shutdown()
+            self._server.server_close()
+            self.warm_driver.quit()
+            logger.info("Daemon stopped.")
+
+
+def send_command(command, port=DAEMON_PORT, timeout=10):
+    """
+    Sends a control command to a running daemon and returns its JSON reply.
+    """
+    with socket.create_connection(("127.0.0.1", port), timeout=timeout) as connection:
+        connection.sendall(command.encode("utf-8") + b"\n")
+        with connection.makefile("rb") as reply:
+            return json.loads(reply.readline())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the report job as a daemon, or control a running one.")
+    parser.add_argument("command", nargs="*", help="run [--force] | status | recycle | stop (none = start the daemon)")
+    args, extra = parser.parse_known_args()
+    if args.command:
+        print(json.dumps(send_command(" ".join(args.command + extra)), indent=2))
+    else:
+        ReportDaemon().serve_forever()
@@ -0,0 +1,194 @@
+import hashlib
+import logging
+import os
+import threading
+import zipfile
+
+from mailer import split_recipients
+
+logger = logging.getLogger(__name__)
+
+
+def plan_deliveries(group_recipients, by_recipient=True):
+    """
+    Inverts {logistic_group: ';'-separated recipients} into one delivery per distinct set of groups:
+    every recipient who covers exactly the same groups shares a message with all of their reports.
+    Without `by_recipient`, there is simply one delivery per group.
+    Returns a list of {'groups': [...], 'recipients': [...]} in the order the groups are configured.
+    """
+    if not by_recipient:
+        return [
+            {"groups": [logistic_group], "recipients": split_recipients(recipient_emails)}
+            for logistic_group, recipient_emails in group_recipients.items()
+        ]
+
+    group_order = {logistic_group: index for index, logistic_group in enumerate(group_recipients)}
+    groups_by_recipient = {}
+    for logistic_group, recipient_emails in group_recipients.items():
+        for recipient in split_recipients(recipient_emails):
+            key = recipient.lower()
+            entry = groups_by_recipient.setdefault(key, {"recipient": recipient, "groups": set()})
+            entry["groups"].add(logistic_group)
+
+    deliveries = {}
+    for entry in groups_by_recipient.values():
+        groups = tuple(sorted(entry["groups"], key=group_order.get))
+        deliveries.setdefault(groups, []).append(entry["recipient"])
+
+    return [
+        {"groups": list(groups), "recipients": recipients}
+        for groups, recipients in sorted(deliveries.items(), key=lambda item: [group_order[g] for g in item[0]])
+    ]
+
+
+def delivery_key(groups):
+    return " + ".join(groups)
+
+
+def zip_name(key):
+    """
+    File name of a delivery's zip archive: a hash of its key, since the joined group names can exceed
+    the file system's name length limit.
+    """
+    return f"reports-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}.zip"
+
+
+def zip_reports(report_paths, zip_path):
+    """
+    Packs report files into one zip archive (written atomically). Returns the archive path.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(zip_path)), exist_ok=True)
+    with zipfile.ZipFile(f"{zip_path}.tmp", "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in report_paths:
+            archive.write(path, arcname=os.path.basename(path))
+    os.replace(f"{zip_path}.tmp", zip_path)
+    return zip_path
+
+
+class DeliveryPlan:
+    """
+    Tracks which deliveries can be sent as reports become ready.
+    `report_ready` returns the deliveries whose reports are now all available; `flush` returns the rest
+    (with whatever reports they have) once retrieval is over.
+    """
+
+    def __init__(self, group_recipients, by_recipient=True):
+        self.deliveries = plan_deliveries(group_recipients, by_recipient)
+        self._reports = {}
+        self._sent = set()
+
+    def report_ready(self, logistic_group, report_file_path):
+        self._reports[logistic_group] = report_file_path
+        ready = []
+        for index, delivery in enumerate(self.deliveries):
+            if index in self._sent or logistic_group not in delivery["groups"]:
+                continue
+            if all(group in self._reports for group in delivery["groups"]):
+                self._sent.add(index)
+                ready.append(self._with_reports(delivery))
+        return ready
+
+    def flush(self):
+        """
+        Returns the deliveries not sent yet that have at least one report, and marks them sent.
+        """
+        remaining = []
+        for index, delivery in enumerate(self.deliveries):
+            if index in self._sent:
+                continue
+            self._sent.add(index)
+            delivery = self._with_reports(delivery)
+            if delivery["reports"]:
+                missing = [group for group in delivery["groups"] if group not in delivery["reports"]]
+                logger.warning(f"Sending {delivery_key(delivery['groups'])} without the reports of: {missing}")
+                remaining.append(delivery)
+        return remaining
+
+    def _with_reports(self, delivery):
+        reports = {group: self._reports[group] for group in delivery["groups"] if group in self._reports}
+        return {**delivery, "reports": reports}
+
+
+class ReportDispatcher:
+    """
+    Sends the reports of a run through a BackgroundSender following a DeliveryPlan: each message goes out
+    as soon as all of its groups' reports are ready. `build_body(logistic_group)` returns a group's
+    part of the email body; it is called on the sender thread. With `zip_dir`, messages with several
+    reports attach them as one zip file.
+    `report_ready` may be called from several worker threads.
+    """
+
+    def __init__(self, sender, group_recipients, build_body, subject, by_recipient=True, zip_dir=None):
+        self.sender = sender
+        self.plan = DeliveryPlan(group_recipients, by_recipient)
+        self.build_body = build_body
+        self.subject = subject
+        self.zip_dir = zip_dir
+        self._submitted = {}
+        self._lock = threading.Lock()
+
+    def report_ready(self, logistic_group, report_file_path):
+        with self._lock:
+            ready = self.plan.report_ready(logistic_group, report_file_path)
+        for delivery in ready:
+            self._submit(delivery)
+
+    def plan_groups(self):
+        """
+        Returns the logistic groups this dispatcher delivers, in configured order.
+        """
+        groups = []
+        for delivery in self.plan.deliveries:
+            groups += [logistic_group for logistic_group in delivery["groups"] if logistic_group not in groups]
+        return groups
+
+    def groups_for(self, key):
+        """
+        Returns the logistic groups whose reports went into the message submitted under `key`.
+        """
+        return list(self._submitted.get(key, []))
+
+    def finish(self):
+        """
+        Sends the deliveries still missing some reports, waits for every email and returns
+        {logistic_group: status} (see MailerSession.send_all); a group in several messages is
+        'sent' only if all of them were.
+        """
+        with self._lock:
+            remaining = self.plan.flush()
+        for delivery in remaining:
+            self._submit(delivery)
+
+        group_statuses = {}
+        for key, status in self.sender.stop().items():
+            for logistic_group in self._submitted.get(key, []):
+                previous = group_statuses.get(logistic_group)
+                if previous is None:
+                    group_statuses[logistic_group] = dict(status)
+                    continue
+                previous["recipients"] = previous["recipients"] + status["recipients"]
+                previous["sent"] = previous["sent"] and status["sent"]
+                previous["error"] = previous["error"] or status["error"]
+        return group_statuses
+
+    def _submit(self, delivery):
+        groups = list(delivery["reports"])
+        key = delivery_key(delivery["groups"])
+        report_paths = [delivery["reports"][logistic_group] for logistic_group in groups]
+
+        attachment = report_paths[0] if len(report_paths) == 1 else report_paths
+        if self.zip_dir and len(report_paths) > 1:
+            try:
+                attachment = zip_reports(report_paths, os.path.join(self.zip_dir, zip_name(key)))
+            except OSError:
+                logger.exception(f"Failed to zip the reports of {key}, attaching them separately.")
+
+        self._submitted[key] = groups
+        self.sender.submit(
+            key,
+            subject=self.subject,
+            # Built on the sender thread, so the anomaly analysis never holds up the browser
+            body=lambda: "\n\n".join(self.build_body(logistic_group) for logistic_group in groups),
+            attachment_path=attachment,
+            recipient_emails=";".join(delivery["recipients"])
+        )
@@ -0,0 +1,153 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+from selenium.common import TimeoutException
+
+from config import DOWNLOAD_DIR
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_DOWNLOAD_SUFFIXES = ('.crdownload', '.tmp', '.part')
+
+# inotify constants (see <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+INOTIFY_EVENT_HEADER = struct.Struct('iIII')
+
+
+def is_completed_download(file_name, extension='.xlsx'):
+    """
+    Returns True if `file_name` is a finished download with the given extension
+    (Chrome's `.crdownload` partials and Office lock files are ignored).
+    """
+    lower_name = file_name.lower()
+    if lower_name.endswith(PARTIAL_DOWNLOAD_SUFFIXES) or lower_name.startswith('~$'):
+        return False
+    return lower_name.endswith(extension)
+
+
+class InotifyBackend:
+    """
+    Reports files that were finished writing (or renamed into place) in a directory, using Linux inotify.
+    """
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        watch = libc.inotify_add_watch(self._fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if watch < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def poll(self, timeout):
+        """
+        Blocks up to `timeout` seconds and returns the names of files completed in the meantime.
+        """
+        readable, _, _ = select.select([self._fd], [], [], max(timeout, 0))
+        if not readable:
+            return []
+
+        buffer = os.read(self._fd, 64 * 1024)
+        names = []
+        offset = 0
+        while offset < len(buffer):
+            _, _, _, name_length = INOTIFY_EVENT_HEADER.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT_HEADER.size
+            name = buffer[offset:offset + name_length].rstrip(b'\0')
+            offset += name_length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingBackend:
+    """
+    Portable fallback: compares directory entries against the set seen when watching started.
+    """
+
+    def __init__(self, directory, interval=0.05):
+        self._directory = directory
+        self._interval = interval
+        self._seen = set(os.listdir(directory))
+
+    def poll(self, timeout):
+        """
+        Waits up to `timeout` seconds and returns names that appeared since the last call.
+        """
+        time.sleep(max(min(self._interval, timeout), 0))
+        current = set(os.listdir(self._directory))
+        new_names = current - self._seen
+        self._seen = current
+        return sorted(new_names)
+
+    def close(self):
+        pass
+
+
+class DownloadWatcher:
+    """
+    Watches a download directory for a newly completed file.
+    Start it (as a context manager) *before* triggering the download, so no event is missed.
+    """
+
+    def __init__(self, download_dir=None, extension='.xlsx'):
+        self.directory = os.path.join(os.getcwd(), download_dir or DOWNLOAD_DIR)
+        self.extension = extension
+        self._backend = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if sys.platform.startswith('linux'):
+            try:
+                self._backend = InotifyBackend(self.directory)
+                logger.debug(f"Watching {self.directory} with inotify.")
+                return
+            except (OSError, AttributeError):
+                logger.warning("inotify is unavailable, falling back to directory polling.")
+        self._backend = PollingBackend(self.directory)
+        logger.debug(f"Watching {self.directory} with directory polling.")
+
+    def close(self):
+        if self._backend:
+            self._backend.close()
+            self._backend = None
+
+    def wait_for_file(self, timeout=120):
+        """
+        Returns (file_path, file_name) of the first completed download after the watcher started.
+        Raises TimeoutException if none arrives within `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error("Download took too long, raising exception.")
+                raise TimeoutException("Download took too long.")
+
+            for file_name in self._backend.poll(remaining):
+                if is_completed_download(file_name, self.extension):
+                    file_path = os.path.join(self.directory, file_name)
+                    logger.debug(f"Found new {self.extension} download: {file_path}")
+                    return file_path, file_name
@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import weakref
+
+import urllib3
+
+from config import DOWNLOAD_DIR, EXPORT_API_URL, EXPORT_API_TOKEN_KEY
+from constants import REPORT_TYPE_TEXT
+
+logger = logging.getLogger(__name__)
+
+EXPORT_TIMEOUT = urllib3.Timeout(connect=10, read=120)
+XLSX_SIGNATURE = b"PK"  # xlsx files are zip archives
+
+READ_TOKEN_SCRIPT = "return window.localStorage.getItem(arguments[0]);"
+
+_engines = weakref.WeakKeyDictionary()
+
+
+class ExportError(Exception):
+    """
+    Raised when the backend export endpoint does not return an xlsx report.
+    """
+
+
+class SessionExpired(ExportError):
+    """
+    Raised when the export endpoint rejects the session: HTTP 401/403 or a redirect to the login page.
+    """
+
+
+def _auth_headers(cookies, token=None):
+    headers = {"Content-Type": "application/json", "Accept": "application/octet-stream"}
+    if cookies:
+        headers["Cookie"] = "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in cookies)
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def _read_token(driver):
+    if not EXPORT_API_TOKEN_KEY:
+        return None
+    return driver.execute_script(READ_TOKEN_SCRIPT, EXPORT_API_TOKEN_KEY)
+
+
+class HttpExportEngine:
+    """
+    Fetches report xlsx files straight from the portal's export endpoint, reusing the
+    signed-in browser's cookies over a pooled HTTP connection. When the engine was created from a
+    driver and the portal rotated its session, the driver's current cookies are copied again once.
+    """
+
+    def __init__(self, cookies, export_url=EXPORT_API_URL, token=None, pool_size=4, driver=None):
+        self.export_url = export_url
+        self.headers = _auth_headers(cookies, token)
+        # Weak, so the engine (cached per driver in _engines) does not keep its driver alive
+        self._driver = weakref.ref(driver) if driver is not None else None
+        self._pool = urllib3.PoolManager(maxsize=pool_size, timeout=EXPORT_TIMEOUT,
+                                         retries=urllib3.Retry(total=2, backoff_factor=0.5))
+
+    @classmethod
+    def from_driver(cls, driver, export_url=EXPORT_API_URL):
+        """
+        Creates an engine authenticated with the cookies (and bearer token, if configured) of a signed-in driver.
+        """
+        return cls(driver.get_cookies(), export_url=export_url, token=_read_token(driver), driver=driver)
+
+    def refresh_credentials(self):
+        """
+        Copies the cookies (and token) of the engine's driver again. Returns False if there is no driver.
+        """
+        driver = self._driver() if self._driver else None
+        if driver is None:
+            return False
+        self.headers = _auth_headers(driver.get_cookies(), _read_token(driver))
+        return True
+
+    def fetch_report(self, logistic_group, end_date, columns=None):
+        """
+        Returns the xlsx bytes of the fuel detail report for a logistic group and period end date.
+        """
+        payload = {
+            "reportType": REPORT_TYPE_TEXT,
+            "endDate": end_date,
+            "logisticGroup": logistic_group,
+        }
+        if columns:
+            payload["columns"] = list(columns)
+        body = json.dumps(payload).encode("utf-8")
+
+        try:
+            return self._post(body, logistic_group)
+        except SessionExpired as e:
+            if not self.refresh_credentials():
+                raise
+            logger.info(f"{e} Retrying with the browser's current cookies.")
+            return self._post(body, logistic_group)
+
+    def _post(self, body, logistic_group):
+        # Redirects are not followed: a redirect to the login page means the session has expired
+        response = self._pool.request("POST", self.export_url, body=body, headers=self.headers, redirect=False)
+        if response.status in (401, 403):
+            raise SessionExpired(f"Export endpoint returned HTTP {response.status} for '{logistic_group}'.")
+        if response.get_redirect_location() and "login" in response.get_redirect_location().lower():
+            raise SessionExpired(f"Export endpoint redirected to the login page for '{logistic_group}'.")
+        if response.status != 200:
+            raise ExportError(f"Export endpoint returned HTTP {response.status} for '{logistic_group}'.")
+        if not response.data.startswith(XLSX_SIGNATURE):
+            raise ExportError(f"Export endpoint did not return an xlsx file for '{logistic_group}'.")
+
+        logger.debug(f"Fetched {len(response.data)} bytes for '{logistic_group}' over HTTP.")
+        return response.data
+
+    def save_report(self, logistic_group, end_date, download_dir=None, columns=None):
+        """
+        Fetches a report and writes it to the download directory. Returns the file path.
+        """
+        data = self.fetch_report(logistic_group, end_date, columns)
+        file_path = write_report(data, logistic_group, end_date, download_dir)
+        logger.info(f"Exported report for '{logistic_group}' over HTTP, saved to: {file_path}")
+        return file_path
+
+    def close(self):
+        self._pool.clear()
+
+
+def write_report(data, logistic_group, end_date, download_dir=None):
+    """
+    Writes report bytes fetched outside of Chrome's downloads to the download directory,
+    named after the logistic group and period end date. Returns the file path.
+    """
+    directory = os.path.join(os.getcwd(), download_dir or DOWNLOAD_DIR)
+    os.makedirs(directory, exist_ok=True)
+    file_name = f"{logistic_group} {end_date.replace('/', '-')}.xlsx"
+    file_path = os.path.join(directory, file_name)
+    with open(f"{file_path}.tmp", "wb") as f:
+        f.write(data)
+    os.replace(f"{file_path}.tmp", file_path)
+    return file_path
+
+
+def engine_for_driver(driver):
+    """
+    Returns the HTTP export engine bound to a driver's session, creating it on first use.
+    """
+    engine = _engines.get(driver)
+    if engine is None:
+        engine = HttpExportEngine.from_driver(driver)
+        _engines[driver] = engine
+    return engine
@@ -0,0 +1,358 @@
+import csv
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import yaml
+from selenium.common import WebDriverException
+
+from automation import initialize_webdriver_and_navigate, ensure_signed_in
+from config import (
+    ACCOUNT_MAX_SESSIONS,
+    DOWNLOAD_DIR,
+    JOB_RATE_PER_MINUTE,
+    PAZOMAT_LOGIN_URL,
+    SESSION_FILE,
+    WORKER_POOL_SIZE
+)
+from reports import get_group_report
+from retry import with_run_deadline
+
+logger = logging.getLogger(__name__)
+
+
+class Account:
+    """
+    A pazomat.co.il sign-in (business partner number, user ID, password) and how many WebDriver
+    sessions may use it at the same time.
+    """
+
+    def __init__(self, name, business_partner_number, user_id, password, max_sessions=ACCOUNT_MAX_SESSIONS):
+        self.name = name
+        self.business_partner_number = business_partner_number
+        self.user_id = user_id
+        self.password = password
+        self.max_sessions = max(1, int(max_sessions))
+
+    @property
+    def credentials(self):
+        return self.business_partner_number, self.user_id, self.password
+
+    def session_file(self):
+        """
+        Returns this account's saved session file (SESSION_FILE with the account name added), or "" if disabled.
+        """
+        if not SESSION_FILE:
+            return ""
+        root, extension = os.path.splitext(SESSION_FILE)
+        return f"{root}-{self.name}{extension}"
+
+
+class JobConfig:
+    """
+    Accounts, their logistic groups and each group's recipients, as loaded by load_job_config.
+    `group_recipients` has the same shape as config.LOGISTIC_GROUPS; `group_accounts` maps each group
+    to the name of the account that retrieves it.
+    A logistic group name may appear under one account only: the report cache, run journal, report store
+    and dispatcher are all keyed by the bare group name.
+    """
+
+    def __init__(self):
+        self.accounts = {}
+        self.group_accounts = {}
+        self.group_recipients = {}
+
+    def add(self, entry, logistic_group, recipients, source=""):
+        """
+        Adds a logistic group under the account described by `entry` (see _account_entry). Raises ValueError
+        if the group already belongs to an account, or if `entry` repeats an account with other sign-in details.
+        """
+        prefix = f"{source}: " if source else ""
+        account = self.accounts.get(entry["name"])
+        if account is None:
+            account = Account(**entry)
+            self.accounts[account.name] = account
+        elif vars(Account(**entry)) != vars(account):
+            raise ValueError(f"{prefix}account '{account.name}' is configured again with different "
+                             f"sign-in details or max_sessions.")
+
+        if logistic_group in self.group_accounts:
+            owner = self.group_accounts[logistic_group]
+            where = "again" if owner == account.name else f"under account '{owner}' too"
+            raise ValueError(f"{prefix}logistic group '{logistic_group}' of account '{account.name}' is configured "
+                             f"more than once ({where}); each group name must be unique across accounts.")
+        self.group_accounts[logistic_group] = account.name
+        self.group_recipients[logistic_group] = recipients
+
+    def jobs(self, logistic_groups=None):
+        """
+        Returns the (account name, logistic group) jobs, in configured order, optionally limited to some groups.
+        """
+        return [(self.group_accounts[logistic_group], logistic_group)
+                for logistic_group in (self.group_recipients if logistic_groups is None else logistic_groups)]
+
+
+def _account_entry(fields, source):
+    """
+    Builds Account arguments from a YAML mapping or CSV row. The password is given either directly
+    ('password') or as the name of an environment variable holding it ('password_env').
+    """
+    missing = [name for name in ("business_partner_number", "user_id") if not fields.get(name)]
+    if missing:
+        raise ValueError(f"{source}: missing {', '.join(missing)}")
+
+    password = fields.get("password")
+    if not password and fields.get("password_env"):
+        password = os.getenv(fields["password_env"])
+    if not password:
+        raise ValueError(f"{source}: no password (set 'password' or 'password_env')")
+
+    return {
+        "name": str(fields.get("name") or fields.get("account") or fields["business_partner_number"]),
+        "business_partner_number": str(fields["business_partner_number"]),
+        "user_id": str(fields["user_id"]),
+        "password": str(password),
+        "max_sessions": fields.get("max_sessions") or ACCOUNT_MAX_SESSIONS,
+    }
+
+
+def _load_yaml(path, job_config):
+    """
+    accounts:
+      - name: budget
+        business_partner_number: "12345"
+        user_id: "0123456789"
+        password_env: BUDGET_PASSWORD
+        max_sessions: 2
+        groups:
+          אילת: eilat@budget.co.il;anabely@budget.co.il
+    """
+    with open(path, encoding="utf-8") as f:
+        document = yaml.safe_load(f) or {}
+    for index, fields in enumerate(document.get("accounts") or []):
+        source = f"{path}: account {index + 1}"
+        entry = _account_entry(fields, source)
+        for logistic_group, recipients in (fields.get("groups") or {}).items():
+            job_config.add(entry, str(logistic_group), recipients or "", source)
+
+
+def _load_csv(path, job_config):
+    """
+    One row per logistic group; rows of the same account repeat its sign-in columns:
+    account,business_partner_number,user_id,password_env,max_sessions,logistic_group,recipients
+    ('account', 'password', 'password_env' and 'max_sessions' are optional columns).
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            row = {name.strip(): (value or "").strip() for name, value in row.items() if name}
+            if not row.get("logistic_group"):
+                raise ValueError(f"{path}:{line_number}: missing logistic_group")
+            source = f"{path}:{line_number}"
+            entry = _account_entry(row, source)
+            job_config.add(entry, row["logistic_group"], row.get("recipients", ""), source)
+
+
+def load_job_config(path):
+    """
+    Loads accounts, logistic groups and recipients from a YAML (.yaml/.yml) or CSV (.csv) file.
+    Raises ValueError for an unsupported or invalid file.
+    """
+    job_config = JobConfig()
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".yaml", ".yml"):
+        _load_yaml(path, job_config)
+    elif extension == ".csv":
+        _load_csv(path, job_config)
+    else:
+        raise ValueError(f"Unsupported job config '{path}': expected a .yaml, .yml or .csv file.")
+
+    if not job_config.group_recipients:
+        raise ValueError(f"Job config '{path}' has no logistic groups.")
+    logger.info(f"Loaded {len(job_config.group_recipients)} logistic groups "
+                f"for {len(job_config.accounts)} accounts from {path}")
+    return job_config
+
+
+class TokenBucket:
+    """
+    Global rate limit: `acquire` blocks until a token is available. Tokens refill at `rate_per_minute`
+    (0 or less = no limit), and at most `burst` (at least 1) can be saved up. Safe to share between threads.
+    """
+
+    def __init__(self, rate_per_minute=JOB_RATE_PER_MINUTE, burst=1):
+        self.rate = rate_per_minute / 60
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class JobQueue:
+    """
+    Hands (account name, logistic group) jobs to worker threads, with at most `max_sessions` workers
+    on an account at a time. A worker keeps its account (and signed-in driver) while that account
+    has jobs left, then moves to the account with the fewest workers among those with free slots.
+    """
+
+    def __init__(self, jobs, accounts):
+        self.accounts = accounts
+        self._pending = {}
+        for account_name, logistic_group in jobs:
+            self._pending.setdefault(account_name, deque()).append(logistic_group)
+        self._active = {account_name: 0 for account_name in self._pending}
+        self._condition = threading.Condition()
+
+    def take(self, current=None):
+        """
+        Returns the next (account name, logistic group) for a worker signed in to `current` (None = no
+        account yet), waiting while every account with jobs left is at its session limit.
+        Returns None once there are no jobs left.
+        """
+        with self._condition:
+            while True:
+                if current is not None:
+                    if self._pending[current]:
+                        return current, self._pending[current].popleft()
+                    self._active[current] -= 1
+                    self._condition.notify_all()
+                    current = None
+
+                if not any(self._pending.values()):
+                    return None
+                available = [account_name for account_name, groups in self._pending.items()
+                             if groups and self._active[account_name] < self.accounts[account_name].max_sessions]
+                if available:
+                    account_name = min(available, key=self._active.get)
+                    self._active[account_name] += 1
+                    return account_name, self._pending[account_name].popleft()
+                self._condition.wait()
+
+    def drop(self, account_name):
+        """
+        Removes and returns the account's remaining logistic groups (e.g. when it cannot sign in).
+        """
+        with self._condition:
+            dropped = list(self._pending[account_name])
+            self._pending[account_name].clear()
+            return dropped
+
+
+def _quit(driver, worker_index):
+    if driver is None:
+        return
+    try:
+        driver.quit()
+    except Exception:
+        logger.warning(f"Queue worker {worker_index} failed to close WebDriver gracefully.")
+
+
+def _queue_worker(worker_index, job_queue, rate_limiter, url, results, failures, lock, on_result):
+    """
+    Runs a single queue worker: signs in to the account of the job it takes (with a driver and profile
+    of its own), and keeps that driver for the account's next jobs. Each report export first waits
+    for the shared rate limiter. After a WebDriver error the driver is replaced and signed in again.
+    """
+    download_dir = os.path.join(DOWNLOAD_DIR, f"worker-{worker_index}")
+    account_name = None
+    driver = None
+    try:
+        while True:
+            job = job_queue.take(account_name)
+            if job is None:
+                break
+            job_account, logistic_group = job
+
+            if job_account != account_name or driver is None:
+                _quit(driver, worker_index)
+                driver = None
+                account_name = job_account
+                account = job_queue.accounts[account_name]
+                try:
+                    driver = initialize_webdriver_and_navigate(
+                        url, download_dir=download_dir, profile_name=f"worker-{worker_index}-{account_name}"
+                    )
+                    ensure_signed_in(driver, account.credentials, account.session_file())
+                except Exception as e:
+                    logger.exception(f"Queue worker {worker_index} failed to sign in to account '{account_name}'.")
+                    _quit(driver, worker_index)
+                    driver = None
+                    with lock:
+                        for dropped_group in [logistic_group] + job_queue.drop(account_name):
+                            failures[dropped_group] = e
+                    continue
+
+            rate_limiter.acquire()
+            try:
+                report_file_path = get_group_report(driver, logistic_group, download_dir=download_dir)
+            except Exception as e:
+                logger.error(f"Queue worker {worker_index} failed on logistic group '{logistic_group}': {e}")
+                with lock:
+                    failures[logistic_group] = e
+                if isinstance(e, WebDriverException):
+                    # A dead session would fail every remaining job: sign in on a new driver for the next one
+                    logger.warning(f"Queue worker {worker_index} is replacing its WebDriver after: {type(e).__name__}")
+                    _quit(driver, worker_index)
+                    driver = None
+                continue
+
+            with lock:
+                results[logistic_group] = report_file_path
+            if on_result:
+                try:
+                    on_result(logistic_group, report_file_path)
+                except Exception:
+                    logger.exception(f"Queue worker {worker_index}: result callback failed for '{logistic_group}'.")
+    finally:
+        _quit(driver, worker_index)
+
+
+def run_job_queue(job_config, logistic_groups=None, pool_size=WORKER_POOL_SIZE, rate_per_minute=JOB_RATE_PER_MINUTE,
+                  url=PAZOMAT_LOGIN_URL, on_result=None):
+    """
+    Retrieves the reports of `logistic_groups` (all configured groups by default) across the accounts of
+    `job_config`, with `pool_size` WebDriver sessions, at most each account's `max_sessions` of them
+    signed in to one account, and at most `rate_per_minute` report exports per minute overall.
+    Returns (results, failures) keyed by logistic group, like workers.run_report_pool.
+    """
+    jobs = job_config.jobs(logistic_groups)
+    job_queue = JobQueue(jobs, job_config.accounts)
+    rate_limiter = TokenBucket(rate_per_minute)
+    results = {}
+    failures = {}
+    lock = threading.Lock()
+
+    pool_size = max(1, min(pool_size, len(jobs)))
+    logger.info(f"Retrieving {len(jobs)} reports for {len({account for account, _ in jobs})} accounts "
+                f"with {pool_size} parallel workers.")
+
+    threads = [
+        threading.Thread(
+            target=with_run_deadline(_queue_worker),
+            args=(index, job_queue, rate_limiter, url, results, failures, lock, on_result),
+            name=f"queue-worker-{index}",
+        )
+        for index in range(pool_size)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    logger.info(f"Job queue finished: {len(results)} succeeded, {len(failures)} failed.")
+    return results, failures
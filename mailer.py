@@ -1,22 +1,38 @@
+import base64
+import contextlib
+import itertools
+import mimetypes
 import os
 import logging
+import queue
+import re
 import smtplib
-from email import encoders
+import threading
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from email.policy import compat32
 
 from config import SMTP_SERVER, SENDER_EMAIL
+from tracing import span, current_span
 
 logger = logging.getLogger(__name__)
 
-def send_email(subject, body, attachment_path, recipient_emails):
+# Attachments larger than this are base64-encoded in chunks straight onto the SMTP DATA stream
+STREAMING_THRESHOLD = 1024 * 1024
+BASE64_LINE_BYTES = 57  # 57 raw bytes -> one 76-character base64 line
+STREAMING_CHUNK_SIZE = BASE64_LINE_BYTES * 1024
+ATTACHMENT_PLACEHOLDER = "@@ATTACHMENT-PAYLOAD@@"
+SMTP_WIRE_POLICY = compat32.clone(linesep="\r\n")
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def build_multipart_envelope(subject, body, filenames, receiver_emails, sender_email=SENDER_EMAIL):
     """
-    Sends an email with the specified subject, body, and attachment.
+    Renders the MIME message around several attachment payloads.
+    Returns len(filenames) + 1 byte segments with CRLF line endings; the base64-encoded attachments go between them.
     """
-    sender_email = SENDER_EMAIL
-    receiver_emails = [r.strip() for r in recipient_emails.split(";") if r.strip()]
-
     message = MIMEMultipart()
     message["From"] = sender_email
     message["To"] = ', '.join(receiver_emails)
@@ -24,24 +40,307 @@ def send_email(subject, body, attachment_path, recipient_emails):
 
     message.attach(MIMEText(body, "plain"))
 
-    try:
-        with open(attachment_path, "rb") as attachment:
-            part = MIMEBase('application', 'vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            part.set_payload(attachment.read())
-        encoders.encode_base64(part)
-
-        filename = os.path.basename(attachment_path)
+    for index, filename in enumerate(filenames):
+        content_type = XLSX_CONTENT_TYPE if filename.endswith('.xlsx') else (
+            mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        )
+        part = MIMEBase(*content_type.split('/', 1))
+        part.set_payload(f"{ATTACHMENT_PLACEHOLDER}{index}")
+        part["Content-Transfer-Encoding"] = "base64"
         part.add_header("Content-Disposition", f"attachment; filename= {filename}")
         message.attach(part)
-        text = message.as_string()
-    except (FileNotFoundError, OSError):
-        logger.exception(f"Failed to attach file: {attachment_path}")
-        return
-
-    try:
-        server = smtplib.SMTP(SMTP_SERVER)
-        server.sendmail(sender_email, receiver_emails, text)
-        server.quit()
-        logger.info(f"Email sent successfully to {receiver_emails} with attachment {attachment_path}")
-    except Exception:
-        logger.exception(f"Failed to send email to {receiver_emails}")
+
+    rendered = message.as_bytes(policy=SMTP_WIRE_POLICY)
+    segments = []
+    for index in range(len(filenames)):
+        segment, rendered = rendered.split(f"{ATTACHMENT_PLACEHOLDER}{index}".encode(), 1)
+        segments.append(segment)
+        rendered = rendered.removeprefix(b"\r\n")
+    segments.append(rendered)
+    return segments
+
+
+def encode_attachment_chunks(attachment, first_chunk=b""):
+    """
+    Yields the base64-encoded contents of a binary file object in 76-character CRLF lines,
+    reading STREAMING_CHUNK_SIZE bytes at a time. `first_chunk` is data already read from the file.
+    """
+    pending = first_chunk
+    while True:
+        data = attachment.read(STREAMING_CHUNK_SIZE)
+        if data:
+            pending += data
+        usable = len(pending) - len(pending) % BASE64_LINE_BYTES if data else len(pending)
+        if usable:
+            yield base64.encodebytes(pending[:usable]).replace(b"\n", b"\r\n")
+            pending = pending[usable:]
+        if not data:
+            return
+
+
+def send_streaming(server, sender_email, receiver_emails, chunks):
+    """
+    Sends a message to an open SMTP connection, writing `chunks` onto the DATA stream as they are produced.
+    Mirrors smtplib.SMTP.sendmail without holding the whole message in memory.
+    """
+    server.ehlo_or_helo_if_needed()
+    code, response = server.mail(sender_email)
+    if code != 250:
+        server.rset()
+        raise smtplib.SMTPSenderRefused(code, response, sender_email)
+
+    refused = {}
+    for receiver in receiver_emails:
+        code, response = server.rcpt(receiver)
+        if code not in (250, 251):
+            refused[receiver] = (code, response)
+    if len(refused) == len(receiver_emails):
+        server.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    code, response = server.docmd("data")
+    if code != 354:
+        raise smtplib.SMTPDataError(code, response)
+
+    ends_with_crlf = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        # Dot-stuffing, as smtplib does for whole messages; a chunk may start mid-line
+        chunk = re.sub(rb'(?<=\n)\.', b'..', chunk)
+        if ends_with_crlf and chunk.startswith(b'.'):
+            chunk = b'.' + chunk
+        server.send(chunk)
+        ends_with_crlf = chunk.endswith(b"\r\n")
+
+    server.send(b".\r\n" if ends_with_crlf else b"\r\n.\r\n")
+    code, response = server.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, response)
+    return refused
+
+
+def split_recipients(recipient_emails):
+    """
+    Splits a ';'-separated recipient string into a list of addresses.
+    """
+    return [r.strip() for r in recipient_emails.split(";") if r.strip()]
+
+
+class MailerSession:
+    """
+    Sends queued emails over a single SMTP connection, reconnecting once if the server drops it.
+    Use as a context manager so the connection is closed at the end.
+    """
+
+    def __init__(self, smtp_server=SMTP_SERVER, sender_email=SENDER_EMAIL, streaming_threshold=STREAMING_THRESHOLD):
+        self.smtp_server = smtp_server
+        self.sender_email = sender_email
+        self.streaming_threshold = streaming_threshold
+        self._queue = []
+        self._server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, subject, body, attachment_path, recipient_emails):
+        """
+        Queues an email; nothing is sent until `send_all` is called.
+        `attachment_path` is a file path or a list of paths (one message with several attachments).
+        """
+        self._queue.append({
+            "subject": subject,
+            "body": body,
+            "attachment_path": attachment_path,
+            "recipients": split_recipients(recipient_emails),
+        })
+
+    def send_all(self):
+        """
+        Sends every queued email and empties the queue.
+        Returns a list of per-message status dicts with 'recipients', 'attachment_path', 'sent' and 'error'.
+        """
+        statuses = []
+        queued, self._queue = self._queue, []
+        for item in queued:
+            with span("send_email", recipients=item["recipients"]):
+                error = self._deliver(item)
+            statuses.append({
+                "recipients": item["recipients"],
+                "attachment_path": item["attachment_path"],
+                "sent": error is None,
+                "error": error,
+            })
+        return statuses
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            logger.warning("Failed to close SMTP connection gracefully.")
+        self._server = None
+
+    def _connect(self):
+        if self._server is None:
+            self._server = smtplib.SMTP(self.smtp_server)
+            logger.debug(f"Opened SMTP connection to {self.smtp_server}")
+        return self._server
+
+    def _deliver(self, item):
+        """
+        Sends a single queued email. Returns None on success, or a short error description.
+        Messages whose attachments together exceed the streaming threshold are streamed.
+        """
+        attachment_path = item["attachment_path"]
+        attachment_paths = [attachment_path] if isinstance(attachment_path, str) else list(attachment_path)
+        receiver_emails = item["recipients"]
+
+        with contextlib.ExitStack() as stack:
+            attachments = []
+            for path in attachment_paths:
+                try:
+                    attachments.append(stack.enter_context(open(path, "rb")))
+                except (FileNotFoundError, OSError) as e:
+                    logger.exception(f"Failed to attach file: {path}")
+                    return f"attachment error: {e}"
+
+            segments = build_multipart_envelope(
+                item["subject"], item["body"], [os.path.basename(path) for path in attachment_paths],
+                receiver_emails, self.sender_email
+            )
+
+            # Read up to the threshold across all attachments to decide whether to stream
+            heads = []
+            budget = self.streaming_threshold
+            for attachment in attachments:
+                head = attachment.read(budget + 1) if budget >= 0 else b""
+                budget -= len(head)
+                heads.append(head)
+
+            if budget >= 0:
+                text = segments[0] + b"".join(
+                    b"".join(encode_attachment_chunks(attachment, head)) + segment
+                    for attachment, head, segment in zip(attachments, heads, segments[1:])
+                )
+
+                def send(server):
+                    server.sendmail(self.sender_email, receiver_emails, text)
+            else:
+                logger.debug(f"Streaming large attachments {attachment_paths}")
+
+                def send(server):
+                    chunks = [[segments[0]]]
+                    for attachment, segment in zip(attachments, segments[1:]):
+                        attachment.seek(0)
+                        chunks += [encode_attachment_chunks(attachment), [segment]]
+                    send_streaming(server, self.sender_email, receiver_emails, itertools.chain.from_iterable(chunks))
+
+            return self._send_with_reconnect(send, receiver_emails, attachment_path)
+
+    def _send_with_reconnect(self, send, receiver_emails, attachment_path):
+        """
+        Calls `send(server)` on the shared connection, reconnecting once if the server dropped it.
+        Returns None on success, or a short error description.
+        """
+        try:
+            try:
+                send(self._connect())
+            except smtplib.SMTPServerDisconnected:
+                logger.warning("SMTP server dropped the connection, reconnecting once.")
+                self._server = None
+                current_span().incr("retries")
+                send(self._connect())
+            logger.info(f"Email sent successfully to {receiver_emails} with attachment {attachment_path}")
+            return None
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+            # The server rejected this message, but the connection is still usable
+            logger.exception(f"Failed to send email to {receiver_emails}")
+            return f"smtp error: {e}"
+        except Exception as e:
+            logger.exception(f"Failed to send email to {receiver_emails}")
+            self.close()
+            return f"smtp error: {e}"
+
+
+def send_email(subject, body, attachment_path, recipient_emails):
+    """
+    Sends an email with the specified subject, body, and attachment.
+    """
+    with MailerSession() as session:
+        session.add(subject, body, attachment_path, recipient_emails)
+        session.send_all()
+
+
+class BackgroundSender:
+    """
+    Delivers report emails from a queue on a background thread, so the browser can move on
+    to the next report while SMTP is busy. All messages share one MailerSession connection.
+    If given, `on_status(key, status)` is called on the sender thread after each message.
+    """
+
+    _STOP = object()
+
+    def __init__(self, mailer_session=None, on_status=None):
+        self._mailer_session = mailer_session or MailerSession()
+        self._on_status = on_status
+        self._queue = queue.Queue()
+        self._statuses = {}
+        self._thread = threading.Thread(target=self._run, name="report-sender", daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, key, subject, body, attachment_path, recipient_emails):
+        """
+        Queues an email for delivery; `key` (e.g. the logistic group) identifies it in the summary.
+        `body` may be a callable, called on the sender thread just before sending.
+        """
+        self._queue.put((key, subject, body, attachment_path, recipient_emails))
+
+    def stop(self):
+        """
+        Waits for every queued email to be delivered, closes the connection,
+        and returns a dict mapping each key to its status dict (see MailerSession.send_all).
+        """
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        return dict(self._statuses)
+
+    def _run(self):
+        with self._mailer_session as session:
+            while True:
+                item = self._queue.get()
+                if item is self._STOP:
+                    return
+                key, subject, body, attachment_path, recipient_emails = item
+                try:
+                    if callable(body):
+                        body = body()
+                    session.add(subject, body, attachment_path, recipient_emails)
+                    self._statuses[key] = session.send_all()[0]
+                except Exception as e:
+                    logger.exception(f"Unexpected error delivering email for '{key}'")
+                    self._statuses[key] = {
+                        "recipients": split_recipients(recipient_emails),
+                        "attachment_path": attachment_path,
+                        "sent": False,
+                        "error": str(e),
+                    }
+                if self._on_status:
+                    try:
+                        self._on_status(key, self._statuses[key])
+                    except Exception:
+                        logger.exception(f"Status callback failed for '{key}'")
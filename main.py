@@ -1,12 +1,32 @@
+import argparse
 import logging
+import os
 from selenium.common import WebDriverException
 
 # Local modules
-from automation import initialize_webdriver_and_navigate, sign_in
-from reports import get_information_reports
-from mailer import send_email
+from automation import initialize_webdriver_and_navigate, ensure_signed_in
+from reports import get_reports_for_groups, get_split_reports, split_cached_reports, get_previous_friday
+from mailer import BackgroundSender
+from delivery import ReportDispatcher
+from workers import run_report_pool
+from job_queue import load_job_config, run_job_queue
+from report_cache import evict_expired, set_force_refresh
+from anomalies import RunAnomalies
+from run_journal import RunJournal, GENERATED, REPORT_FAILED, EMAILED, EMAIL_FAILED
+from retry import start_run_deadline
+from tracing import span, finish_run
+from pages import lookup_counts, reset_lookup_counts
 
-from config import LOGISTIC_GROUPS
+from config import (
+    ALL_GROUPS_OPTION,
+    BATCH_BY_RECIPIENT,
+    DOWNLOAD_DIR,
+    JOB_CONFIG,
+    LOGISTIC_GROUPS,
+    PAZOMAT_LOGIN_URL,
+    WORKER_POOL_SIZE,
+    ZIP_ATTACHMENTS
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,37 +34,223 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def main():
+
+def build_report_body(logistic_group, anomalies=None):
+    """
+    Returns the weekly email body for a logistic group, listing the anomaly findings for the report period
+    from the run's shared analysis `anomalies` (see anomalies.RunAnomalies).
+    The email still goes out without findings if the analysis fails.
+    """
+    body = f"Attached is the weekly fuel detail report for logistic group: {logistic_group}"
+    try:
+        anomalies = anomalies or RunAnomalies(get_previous_friday())
+        findings = anomalies.findings(logistic_group)
+    except Exception:
+        logger.exception(f"Anomaly analysis failed for logistic group '{logistic_group}'.")
+        return body
+
+    if findings:
+        body += "\n\nPossible anomalies this week:\n" + "\n".join(f"- {finding}" for finding in findings)
+    return body
+
+
+def create_dispatcher(sender, group_recipients=None, anomalies=None):
+    """
+    Returns the ReportDispatcher that emails the run's reports on the background sender: one email per
+    distinct recipient set (BATCH_BY_RECIPIENT) or per group, zipped when ZIP_ATTACHMENTS is set.
+    """
+    return ReportDispatcher(
+        sender,
+        LOGISTIC_GROUPS if group_recipients is None else group_recipients,
+        lambda logistic_group: build_report_body(logistic_group, anomalies),
+        subject="Weekly Pazomat Report",
+        by_recipient=BATCH_BY_RECIPIENT,
+        zip_dir=os.path.join(os.getcwd(), DOWNLOAD_DIR, "outbox") if ZIP_ATTACHMENTS else None
+    )
+
+
+def plan_run(journal, resume=False, group_recipients=None):
+    """
+    Sets up a run for `group_recipients` (LOGISTIC_GROUPS by default): the background sender and dispatcher,
+    recording every report and email in `journal`. Cached reports are dispatched straight away; with `resume`,
+    so are reports the journal already has, and only groups and recipients still owed a report are processed.
+    Returns (sender, dispatcher, on_result callback for newly generated reports, groups to generate).
+    """
+    configured = LOGISTIC_GROUPS if group_recipients is None else group_recipients
+    group_recipients = journal.remaining_recipients(configured) if resume else dict(configured)
+    if resume:
+        done = [logistic_group for logistic_group in configured if logistic_group not in group_recipients]
+        logger.info(f"Resuming run for {journal.period}; already emailed: {done or 'none'}")
+
+    def record_delivery(key, status):
+        for logistic_group in dispatcher.groups_for(key):
+            if status["sent"]:
+                journal.record(logistic_group, EMAILED, recipients=status["recipients"])
+            else:
+                journal.record(logistic_group, EMAIL_FAILED, error=status["error"])
+
+    sender = BackgroundSender(on_status=record_delivery)
+    dispatcher = create_dispatcher(sender, group_recipients, RunAnomalies(journal.period))
+
+    def on_result(logistic_group, report_file_path):
+        journal.record(logistic_group, GENERATED, path=report_file_path)
+        dispatcher.report_ready(logistic_group, report_file_path)
+
+    ready = journal.generated_reports() if resume else {}
+    ready = {logistic_group: path for logistic_group, path in ready.items() if logistic_group in group_recipients}
+    cached, pending = split_cached_reports([g for g in group_recipients if g not in ready])
+    sender.start()
+    for logistic_group, report_file_path in ready.items():
+        dispatcher.report_ready(logistic_group, report_file_path)
+    for logistic_group, report_file_path in cached.items():
+        on_result(logistic_group, report_file_path)
+    return sender, dispatcher, on_result, pending
+
+
+def record_failures(journal, failures):
+    for logistic_group, error in failures.items():
+        journal.record(logistic_group, REPORT_FAILED, error=str(error))
+
+
+def log_run_summary(delivery_statuses, failures=None, logistic_groups=None):
+    """
+    Logs one line per logistic group: emailed, email failed, report failed, or not processed.
+    Returns {logistic group: error} for every group that was not emailed.
+    """
+    failures = failures or {}
+    failed = {}
+    logger.info("Run summary:")
+    for logistic_group in LOGISTIC_GROUPS if logistic_groups is None else logistic_groups:
+        if logistic_group in delivery_statuses:
+            status = delivery_statuses[logistic_group]
+            if status["sent"]:
+                logger.info(f"  {logistic_group}: emailed to {', '.join(status['recipients'])}")
+            else:
+                logger.error(f"  {logistic_group}: report generated, email failed ({status['error']})")
+                failed[logistic_group] = f"email failed: {status['error']}"
+        elif logistic_group in failures:
+            logger.error(f"  {logistic_group}: report failed ({failures[logistic_group]})")
+            failed[logistic_group] = f"report failed: {failures[logistic_group]}"
+        else:
+            logger.warning(f"  {logistic_group}: not processed")
+            failed[logistic_group] = "not processed"
+    return failed
+
+
+def main_parallel(journal, resume=False):
     """
-    The main entry point. Initializes the webdriver, signs in, retrieves reports for each logistic group,
-    and sends an email for each report.
+    Retrieves the reports for all logistic groups with a pool of WebDriver sessions.
+    Each email is sent in the background as soon as the workers have finished its reports.
+    Returns the groups that were not emailed (see log_run_summary).
     """
-    driver = None
+    logger.info("Script started in parallel mode.")
+    failures = {}
+    sender, dispatcher, on_result, pending = plan_run(journal, resume)
+    try:
+        if pending:
+            _, failures = run_report_pool(pending, WORKER_POOL_SIZE, on_result=on_result)
+            record_failures(journal, failures)
+    finally:
+        failed = log_run_summary(dispatcher.finish(), failures, dispatcher.plan_groups())
+    return failed
+
+
+def main_job_queue(journal, job_config, resume=False):
+    """
+    Retrieves the reports of every account and logistic group in the job config (JOB_CONFIG) through
+    the rate-limited job queue (see job_queue.py), emailing each report as soon as its delivery is complete.
+    Returns the groups that were not emailed (see log_run_summary).
+    """
+    logger.info("Script started in job queue mode.")
+    failures = {}
+    sender, dispatcher, on_result, pending = plan_run(journal, resume, job_config.group_recipients)
+    try:
+        if pending:
+            _, failures = run_job_queue(job_config, pending, WORKER_POOL_SIZE, on_result=on_result)
+            record_failures(journal, failures)
+    finally:
+        failed = log_run_summary(dispatcher.finish(), failures, dispatcher.plan_groups())
+    return failed
+
+
+def main_sequential(journal, resume=False, driver=None):
+    """
+    Initializes the webdriver (unless a signed-in `driver` is passed in, which is then left open),
+    signs in, retrieves reports for each logistic group on the same
+    report page (see reports.get_reports_for_groups), and emails the reports (see delivery.py).
+    With ALL_GROUPS_OPTION set, a single all-groups report is split locally instead (reports.get_split_reports).
+    Emails are delivered on a background thread while the browser moves on to the next group.
+    A failed group is recorded in the journal and does not stop the others.
+    Returns the groups that were not emailed (see log_run_summary).
+    """
+    own_driver = driver is None
+    failures = {}
+    sender, dispatcher, on_result, pending = plan_run(journal, resume)
     try:
         logger.info("Script started.")
-        driver = initialize_webdriver_and_navigate('https://service.pazomat.co.il/Login')
-        sign_in(driver)
-
-        for logistic_group, email in LOGISTIC_GROUPS.items():
-            report_file_path = get_information_reports(driver, logistic_group)
-            send_email(
-                subject="Weekly Pazomat Report",
-                body=f"Attached is the weekly fuel detail report for logistic group: {logistic_group}",
-                attachment_path=report_file_path,
-                recipient_emails=email
-            )
-
-    except WebDriverException:
+        if not pending:
+            logger.info("No report left to generate, skipping the browser.")
+        else:
+            if own_driver:
+                driver = initialize_webdriver_and_navigate(PAZOMAT_LOGIN_URL)
+                ensure_signed_in(driver)
+
+            retrieve_reports = get_split_reports if ALL_GROUPS_OPTION else get_reports_for_groups
+            _, failures = retrieve_reports(driver, pending, on_result=on_result)
+
+    except WebDriverException as e:
         logger.exception("A Selenium WebDriver error occurred.")
-    except Exception:
+        failures = {logistic_group: e for logistic_group in pending}
+    except Exception as e:
         logger.exception("Unexpected error occurred in main.")
+        failures = {logistic_group: e for logistic_group in pending}
     finally:
-        if driver:
+        if own_driver and driver:
             try:
                 driver.quit()
                 logger.info("WebDriver closed.")
             except Exception:
                 logger.warning("Failed to close WebDriver gracefully.")
+        statuses = dispatcher.finish()
+        record_failures(journal, {g: e for g, e in failures.items() if g not in statuses})
+        failed = log_run_summary(statuses, failures, dispatcher.plan_groups())
+    return failed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate and email the weekly Pazomat fuel reports.")
+    parser.add_argument("--force", action="store_true", help="ignore cached reports and regenerate all of them")
+    parser.add_argument("--resume", action="store_true",
+                        help="only process the groups and recipients this week's run journal shows as pending")
+    return parser.parse_args(argv)
+
+
+def main(force=False, driver=None, resume=False):
+    """
+    The main entry point. Runs the job queue (JOB_CONFIG), parallel or sequential flow for this period's
+    reports and writes the run's trace. `force` ignores cached reports, `resume` skips groups already
+    emailed, and a signed-in `driver` (daemon.py) runs the sequential flow on that driver.
+    Returns {logistic group: error} for the groups that were not emailed.
+    """
+    job_config = load_job_config(JOB_CONFIG) if JOB_CONFIG else None
+    journal = RunJournal(get_previous_friday())
+    set_force_refresh(force)
+    evict_expired()
+    reset_lookup_counts()
+    try:
+        with start_run_deadline(), span("run", pool_size=WORKER_POOL_SIZE):
+            if job_config:
+                return main_job_queue(journal, job_config, resume)
+            elif WORKER_POOL_SIZE > 1 and not ALL_GROUPS_OPTION and driver is None:
+                return main_parallel(journal, resume)
+            else:
+                return main_sequential(journal, resume, driver)
+    finally:
+        counts = lookup_counts()
+        logger.info(f"Element lookups: {counts['lookups']} searched, {counts['cache_hits']} from cache "
+                    f"({counts['stale']} stale).")
+        finish_run()
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(force=args.force, resume=args.resume)
@@ -0,0 +1,214 @@
+import logging
+import threading
+import weakref
+
+from selenium.common import StaleElementReferenceException, TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from automation import wait_for_loading_to_disappear
+from retry import DEFAULT_RETRY_POLICY, DeadlineExceeded
+from tracing import span, current_span
+from constants import (
+    SELECTOR_BUSINESS_PARTNER_INPUT,
+    SELECTOR_ID_INPUT,
+    SELECTOR_PASSWORD_INPUT,
+    SELECTOR_LOGIN_BUTTON,
+    SELECTOR_REPORTS_MENU,
+    SELECTOR_REPORT_DROPDOWN,
+    XPATH_OPTION_TEMPLATE,
+    REPORT_TYPE_TEXT,
+    SELECTOR_DATE_INPUT,
+    DATE_PICKER_OVERLAY_BACKDROP,
+    DATE_PICKER_OVERLAY_ID,
+    SELECTOR_LOGISTIC_GROUP_SELECT,
+    SELECTOR_SHOW_REPORT_BUTTON,
+    SELECTOR_EXPORT_EXCEL_BUTTON,
+    SELECTOR_GENERATE_REPORT_BUTTON
+)
+
+logger = logging.getLogger(__name__)
+
+_counts_lock = threading.Lock()
+_counts = {"lookups": 0, "cache_hits": 0, "stale": 0}
+
+
+def _count(name):
+    with _counts_lock:
+        _counts[name] += 1
+
+
+def lookup_counts():
+    """
+    Returns the element lookup counters since the last reset: 'lookups' (WebDriver element searches),
+    'cache_hits' (cached elements used without a search) and 'stale' (cached elements that had to be found again).
+    """
+    with _counts_lock:
+        return dict(_counts)
+
+
+def reset_lookup_counts():
+    with _counts_lock:
+        for name in _counts:
+            _counts[name] = 0
+
+
+class BasePage:
+    """
+    Base page object: clicks and fills elements by selector, caching the located WebElements.
+    A cached element is used as-is and only looked up again when it has gone stale (or the action
+    failed), so repeated actions on the same page skip the element search round trips.
+    Retries follow `policy` (DEFAULT_RETRY_POLICY by default).
+    """
+
+    _pages = weakref.WeakKeyDictionary()
+
+    def __init__(self, driver, policy=None):
+        self.driver = driver
+        self.policy = policy or DEFAULT_RETRY_POLICY
+        self._elements = {}
+
+    @classmethod
+    def for_driver(cls, driver):
+        """
+        Returns the page object of this class bound to `driver`, so its cache lives as long as the driver.
+        """
+        pages = cls._pages.setdefault(driver, {})
+        if cls not in pages:
+            pages[cls] = cls(driver)
+        return pages[cls]
+
+    def forget(self, selector=None):
+        """
+        Drops one cached element (or all of them).
+        """
+        if selector is None:
+            self._elements.clear()
+        else:
+            self._elements.pop(selector, None)
+
+    def _locate(self, selector, by, timeout):
+        _count("lookups")
+        current_span().incr("lookups")
+        element = WebDriverWait(self.driver, timeout, poll_frequency=self.policy.poll_interval).until(
+            EC.element_to_be_clickable((by, selector))
+        )
+        self._elements[selector] = element
+        return element
+
+    def _with_element(self, selector, by, timeout, action):
+        """
+        Runs `action(element)` on the cached element, re-resolving it once if it went stale.
+        Any other failure drops the cached element, so the next attempt waits for it from scratch.
+        """
+        element = self._elements.get(selector)
+        try:
+            if element is None:
+                return action(self._locate(selector, by, timeout))
+            _count("cache_hits")
+            try:
+                return action(element)
+            except StaleElementReferenceException:
+                _count("stale")
+                current_span().incr("stale")
+                logger.debug(f"Cached element went stale, locating it again: {selector}")
+                return action(self._locate(selector, by, timeout))
+        except Exception:
+            self.forget(selector)
+            raise
+
+    def click(self, selector, by=By.CSS_SELECTOR):
+        """
+        Clicks an element once it is clickable.
+        """
+        with span("click_element", selector=selector) as step:
+            try:
+                self.policy.execute(
+                    lambda timeout: self._with_element(selector, by, timeout, lambda element: element.click()),
+                    selector,
+                    on_retry=lambda: step.incr("retries")
+                )
+                logger.debug(f"Clicked element: {selector}")
+            except DeadlineExceeded:
+                logger.error(f"Run deadline exceeded while clicking: {selector}")
+                raise
+            except TimeoutException as e:
+                logger.error(f"Failed to click element: {selector} ({e})")
+                raise TimeoutException(f"Cannot click element: {selector}") from e
+
+    def fill(self, selector, text, by=By.CSS_SELECTOR):
+        """
+        Types `text` into a form field once the loading screen is gone.
+        """
+        def attempt(timeout):
+            wait_for_loading_to_disappear(self.driver, timeout)
+            self._with_element(selector, by, timeout, lambda element: element.send_keys(text))
+
+        with span("fill_form_field", selector=selector) as step:
+            try:
+                self.policy.execute(attempt, selector, on_retry=lambda: step.incr("retries"))
+                logger.debug(f"Filled form field '{selector}' with text='{text}'.")
+            except (TimeoutException, WebDriverException):
+                logger.exception(f"Failed to fill form field '{selector}' with text='{text}'.")
+                raise
+
+    def choose_option(self, option_text):
+        """
+        Clicks the mat-option with the given text in an open dropdown.
+        Options are recreated every time a dropdown opens, so they are never kept in the cache.
+        """
+        selector = XPATH_OPTION_TEMPLATE.format(option_text=option_text)
+        self.click(selector, By.XPATH)
+        self.forget(selector)
+
+
+class LoginPage(BasePage):
+
+    def sign_in(self, business_partner_number, user_id, password):
+        self.fill(SELECTOR_BUSINESS_PARTNER_INPUT, business_partner_number)
+        self.fill(SELECTOR_ID_INPUT, user_id)
+        self.fill(SELECTOR_PASSWORD_INPUT, password)
+        self.click(SELECTOR_LOGIN_BUTTON)
+
+
+class ReportsPage(BasePage):
+
+    def open_report_form(self, report_type=REPORT_TYPE_TEXT):
+        """
+        Opens the reports menu and selects the report type.
+        """
+        self.click(SELECTOR_REPORTS_MENU)
+        self.click(SELECTOR_REPORT_DROPDOWN)
+        self.choose_option(report_type)
+
+    def set_end_date(self, end_date):
+        """
+        Enters the period end date and closes the date picker.
+        """
+        self.click(SELECTOR_DATE_INPUT)
+        self.fill(SELECTOR_DATE_INPUT, end_date)
+
+        def hide_overlay(timeout):
+            self.driver.execute_script(f"document.getElementById('{DATE_PICKER_OVERLAY_ID}').style.display = 'none';")
+
+        with span("date_picker_overlay") as step:
+            self.policy.execute(hide_overlay, DATE_PICKER_OVERLAY_ID, on_retry=lambda: step.incr("retries"))
+
+        # The backdrop is removed once clicked, so it is not kept in the cache either
+        self.click(DATE_PICKER_OVERLAY_BACKDROP)
+        self.forget(DATE_PICKER_OVERLAY_BACKDROP)
+
+    def select_logistic_group(self, logistic_group):
+        self.click(SELECTOR_LOGISTIC_GROUP_SELECT)
+        self.choose_option(logistic_group)
+
+    def open_export(self):
+        """
+        Shows the report and opens the Excel export page (with the column checkboxes).
+        """
+        self.click(SELECTOR_SHOW_REPORT_BUTTON)
+        self.click(SELECTOR_EXPORT_EXCEL_BUTTON)
+
+    def generate_report(self):
+        self.click(SELECTOR_GENERATE_REPORT_BUTTON)
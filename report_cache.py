@@ -0,0 +1,139 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+from config import DOWNLOAD_DIR, REPORT_CACHE_TTL_DAYS
+
+logger = logging.getLogger(__name__)
+
+CACHE_SUBDIR = "cache"
+
+_force_refresh = False
+
+
+def set_force_refresh(force):
+    """
+    When True, cached reports are ignored (but fresh downloads are still stored). Set by `main.py --force`.
+    """
+    global _force_refresh
+    _force_refresh = force
+
+
+def is_enabled():
+    return REPORT_CACHE_TTL_DAYS > 0
+
+
+def cache_dir():
+    return os.path.join(os.getcwd(), DOWNLOAD_DIR, CACHE_SUBDIR)
+
+
+def cache_key(logistic_group, end_date, columns):
+    """
+    Returns the cache key of a report: a hash of the logistic group, period end date and column set.
+    """
+    identity = json.dumps([logistic_group, end_date, sorted(columns)], ensure_ascii=False)
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:32]
+
+
+def _metadata_path(key):
+    return os.path.join(cache_dir(), f"{key}.json")
+
+
+def _read_metadata(key):
+    try:
+        with open(_metadata_path(key), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_fresh(metadata, now=None):
+    age = (now or time.time()) - metadata["created_at"]
+    return age <= REPORT_CACHE_TTL_DAYS * 24 * 3600
+
+
+def get_cached_report(logistic_group, end_date, columns):
+    """
+    Returns the path of a fresh cached report, or None on a miss (or when bypassed/disabled).
+    """
+    if not is_enabled():
+        return None
+    if _force_refresh:
+        logger.info(f"Report cache bypassed for '{logistic_group}' ({end_date}).")
+        return None
+
+    metadata = _read_metadata(cache_key(logistic_group, end_date, columns))
+    if metadata and _is_fresh(metadata):
+        report_path = os.path.join(cache_dir(), metadata["file"])
+        if os.path.exists(report_path):
+            logger.info(f"Report cache hit for '{logistic_group}' ({end_date}): {report_path}")
+            return report_path
+
+    logger.info(f"Report cache miss for '{logistic_group}' ({end_date}).")
+    return None
+
+
+def store_report(logistic_group, end_date, columns, report_path):
+    """
+    Copies a downloaded report into the cache. Returns the cached path (or the original path if caching fails).
+    """
+    if not is_enabled():
+        return report_path
+
+    key = cache_key(logistic_group, end_date, columns)
+    directory = cache_dir()
+    file_name = f"{logistic_group} {end_date.replace('/', '-')} {key[:8]}.xlsx"
+    cached_path = os.path.join(directory, file_name)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        shutil.copyfile(report_path, f"{cached_path}.tmp")
+        os.replace(f"{cached_path}.tmp", cached_path)
+
+        metadata = {
+            "logistic_group": logistic_group,
+            "end_date": end_date,
+            "columns": list(columns),
+            "file": file_name,
+            "created_at": time.time(),
+        }
+        with open(f"{_metadata_path(key)}.tmp", "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        os.replace(f"{_metadata_path(key)}.tmp", _metadata_path(key))
+    except OSError:
+        logger.exception(f"Failed to cache report {report_path}")
+        return report_path
+
+    logger.debug(f"Cached report for '{logistic_group}' ({end_date}) as {cached_path}")
+    return cached_path
+
+
+def evict_expired():
+    """
+    Deletes cache entries older than REPORT_CACHE_TTL_DAYS. Returns the number of entries removed.
+    """
+    directory = cache_dir()
+    if not is_enabled() or not os.path.isdir(directory):
+        return 0
+
+    now = time.time()
+    removed = 0
+    for entry in os.listdir(directory):
+        if not entry.endswith(".json"):
+            continue
+        key = entry[:-len(".json")]
+        metadata = _read_metadata(key)
+        if metadata and _is_fresh(metadata, now):
+            continue
+        for path in ([os.path.join(directory, metadata["file"])] if metadata else []) + [_metadata_path(key)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        removed += 1
+
+    if removed:
+        logger.info(f"Evicted {removed} expired report(s) from the cache.")
+    return removed
@@ -0,0 +1,86 @@
+import logging
+import os
+
+from openpyxl import Workbook, load_workbook
+
+from constants import GROUP_COLUMN_LABEL
+
+logger = logging.getLogger(__name__)
+
+# A report's header row is the first row with this column label; rows above it are the report title etc.
+HEADER_MARKER = 'מספר רכב'
+
+
+def header_labels(values):
+    """
+    Returns the stripped column labels of a worksheet row if it is the report's header row, else None.
+    Shared with report_store.py so both read reports the same way.
+    """
+    labels = [str(value).strip() if value is not None else '' for value in values]
+    return labels if HEADER_MARKER in labels else None
+
+
+def split_report(report_path, logistic_groups, output_dir, file_suffix="", keep_group_column=False):
+    """
+    Splits an all-groups report into one xlsx file per logistic group, by its logistic group column.
+    Rows above the header (report title etc.) are copied to every file. Groups without rows get a file
+    with the header only; rows of other groups are dropped.
+    Returns {logistic_group: file path}.
+    """
+    source = load_workbook(report_path, read_only=True, data_only=True)
+    try:
+        preamble = []
+        header = None
+        group_index = None
+        rows_by_group = {logistic_group: [] for logistic_group in logistic_groups}
+        other_rows = 0
+        for values in source.active.iter_rows(values_only=True):
+            if header is None:
+                labels = header_labels(values)
+                if labels:
+                    if GROUP_COLUMN_LABEL not in labels:
+                        raise ValueError(f"Report {report_path} has no '{GROUP_COLUMN_LABEL}' column to split by.")
+                    header = values
+                    group_index = labels.index(GROUP_COLUMN_LABEL)
+                else:
+                    preamble.append(values)
+                continue
+            if not any(value is not None for value in values):
+                continue
+
+            group = str(values[group_index]).strip() if group_index < len(values) and values[group_index] else ''
+            if group in rows_by_group:
+                rows_by_group[group].append(values)
+            else:
+                other_rows += 1
+    finally:
+        source.close()
+
+    if header is None:
+        raise ValueError(f"No header row found in report {report_path}.")
+    if other_rows:
+        logger.debug(f"Dropped {other_rows} rows of other logistic groups from {report_path}")
+
+    def without_group(values):
+        if keep_group_column:
+            return list(values)
+        return [value for index, value in enumerate(values) if index != group_index]
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for logistic_group, rows in rows_by_group.items():
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        for values in preamble:
+            sheet.append(list(values))
+        sheet.append(without_group(header))
+        for values in rows:
+            sheet.append(without_group(values))
+
+        path = os.path.join(output_dir, f"{logistic_group}{file_suffix}.xlsx")
+        workbook.save(f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        paths[logistic_group] = path
+        logger.debug(f"Wrote {len(rows)} rows for '{logistic_group}' to {path}")
+
+    return paths
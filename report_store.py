@@ -0,0 +1,288 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import Counter
+from datetime import date, datetime
+
+from openpyxl import load_workbook
+
+from config import DOWNLOAD_DIR, REPORT_STORE
+from report_split import header_labels
+
+logger = logging.getLogger(__name__)
+
+# Report column label -> store column
+COLUMN_FIELDS = {
+    'מספר רכב': 'vehicle',
+    'מוצר': 'product',
+    'כמות ליטר': 'liters',
+    'סכום ברוטו ש"ח': 'gross_amount',
+    'תאריך': 'fuel_date',
+    'קבוצה לוגיסטית': 'logistic_group',
+}
+STORE_FIELDS = ('logistic_group', 'vehicle', 'product', 'liters', 'gross_amount', 'fuel_date')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fuel_rows (
+    row_hash TEXT PRIMARY KEY,
+    logistic_group TEXT,
+    vehicle TEXT,
+    product TEXT,
+    liters REAL,
+    gross_amount REAL,
+    fuel_date TEXT,
+    source_file TEXT
+);
+CREATE INDEX IF NOT EXISTS fuel_rows_group_date ON fuel_rows (logistic_group, fuel_date);
+CREATE TABLE IF NOT EXISTS ingested_files (
+    file_hash TEXT PRIMARY KEY,
+    file_name TEXT,
+    logistic_group TEXT,
+    row_count INTEGER,
+    ingested_at REAL
+);
+"""
+
+
+def is_enabled():
+    return bool(REPORT_STORE)
+
+
+def connect(store_path=REPORT_STORE):
+    """
+    Opens the report store, creating the schema on first use.
+    """
+    directory = os.path.dirname(os.path.abspath(store_path))
+    os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(store_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _to_float(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(',', '').strip())
+    except ValueError:
+        return None
+
+
+def _to_iso_date(value):
+    """
+    Normalizes a report date (datetime or D/M/YYYY text) to YYYY-MM-DD; other values are kept as text.
+    """
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if value is None:
+        return None
+    text = str(value).strip()
+    for date_format in ("%d/%m/%Y", "%d.%m.%Y", "%Y-%m-%d", "%d/%m/%y"):
+        try:
+            return datetime.strptime(text.split(" ")[0], date_format).date().isoformat()
+        except ValueError:
+            continue
+    return text
+
+
+def iter_report_rows(path, logistic_group=None):
+    """
+    Streams the rows of a downloaded report (openpyxl read-only mode) as dicts with the STORE_FIELDS keys.
+    The group comes from the report's own logistic group column when present, else from `logistic_group`.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        header = None
+        for values in workbook.active.iter_rows(values_only=True):
+            if header is None:
+                labels = header_labels(values)
+                if labels:
+                    header = {COLUMN_FIELDS[label]: index for index, label in enumerate(labels)
+                              if label in COLUMN_FIELDS}
+                continue
+            if not any(value is not None for value in values):
+                continue
+
+            def field(name):
+                index = header.get(name)
+                return values[index] if index is not None and index < len(values) else None
+
+            yield {
+                'logistic_group': str(field('logistic_group') or logistic_group or '') or None,
+                'vehicle': str(field('vehicle')).strip() if field('vehicle') is not None else None,
+                'product': str(field('product')).strip() if field('product') is not None else None,
+                'liters': _to_float(field('liters')),
+                'gross_amount': _to_float(field('gross_amount')),
+                'fuel_date': _to_iso_date(field('fuel_date')),
+            }
+    finally:
+        workbook.close()
+
+
+def _row_hashes(rows):
+    """
+    Hashes each row's content plus its occurrence number among identical rows of the same report,
+    so overlapping reports dedupe while genuine repeated fills within one report are kept.
+    """
+    occurrences = Counter()
+    for row in rows:
+        content = "\x1f".join("" if row[name] is None else str(row[name]) for name in STORE_FIELDS)
+        occurrences[content] += 1
+        yield hashlib.sha1(f"{content}\x1e{occurrences[content]}".encode("utf-8")).hexdigest(), row
+
+
+def ingest_report(path, logistic_group=None, store_path=REPORT_STORE, connection=None):
+    """
+    Appends a report's rows to the store, skipping files and rows that are already there.
+    Returns the number of new rows.
+    """
+    own_connection = connection is None
+    connection = connection or connect(store_path)
+    try:
+        digest = file_hash(path)
+        if connection.execute("SELECT 1 FROM ingested_files WHERE file_hash = ?", (digest,)).fetchone():
+            logger.debug(f"Report already ingested: {path}")
+            return 0
+
+        source_file = os.path.basename(path)
+        records = [
+            (row_hash, *(row[name] for name in STORE_FIELDS), source_file)
+            for row_hash, row in _row_hashes(iter_report_rows(path, logistic_group))
+        ]
+        with connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO fuel_rows (row_hash, logistic_group, vehicle, product, liters, "
+                "gross_amount, fuel_date, source_file) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                records
+            )
+            new_rows = connection.total_changes - before
+            connection.execute(
+                "INSERT OR REPLACE INTO ingested_files VALUES (?, ?, ?, ?, ?)",
+                (digest, source_file, logistic_group, len(records), time.time())
+            )
+        logger.info(f"Ingested {new_rows} new of {len(records)} rows from {source_file}")
+        return new_rows
+    finally:
+        if own_connection:
+            connection.close()
+
+
+def record_report(report_path, logistic_group):
+    """
+    Ingests a freshly retrieved report into the store. Failures are logged, never raised:
+    the store must not get in the way of delivering the report.
+    """
+    if not is_enabled():
+        return 0
+    try:
+        return ingest_report(report_path, logistic_group, REPORT_STORE)
+    except Exception:
+        logger.exception(f"Failed to add {report_path} to the report store")
+        return 0
+
+
+def _sidecar_groups(directory, names):
+    """
+    Returns {report file name: logistic group} from the report cache metadata files in a directory.
+    """
+    groups = {}
+    for entry in names:
+        if not entry.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, entry), encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(metadata, dict) and metadata.get("file") and metadata.get("logistic_group"):
+            groups[metadata["file"]] = metadata["logistic_group"]
+    return groups
+
+
+def ingest_archive(directory=DOWNLOAD_DIR, store_path=REPORT_STORE):
+    """
+    Ingests every .xlsx report under `directory` (recursively) in one connection.
+    Reports from the report cache get their logistic group from the cache metadata, and are ingested
+    before the other reports: a raw download identical to a cached copy is then skipped instead of
+    storing its rows without a group.
+    Returns (files ingested, new rows).
+    """
+    reports = []
+    for root, _, names in os.walk(directory):
+        groups = _sidecar_groups(root, names)
+        for name in sorted(names):
+            if name.lower().endswith('.xlsx') and not name.startswith('~$'):
+                reports.append((os.path.join(root, name), groups.get(name)))
+    reports.sort(key=lambda report: report[1] is None)
+
+    connection = connect(store_path)
+    files = 0
+    new_rows = 0
+    try:
+        for report_path, logistic_group in reports:
+            try:
+                new_rows += ingest_report(report_path, logistic_group, connection=connection)
+                files += 1
+            except Exception:
+                logger.exception(f"Failed to ingest {report_path}")
+    finally:
+        connection.close()
+    return files, new_rows
+
+
+def ingested_file_count(store_path=REPORT_STORE):
+    """
+    Returns how many report files the store holds, a cheap way to tell whether it changed.
+    """
+    connection = connect(store_path)
+    try:
+        return connection.execute("SELECT COUNT(*) FROM ingested_files").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def load_columns(store_path=REPORT_STORE, logistic_groups=None):
+    """
+    Returns the stored rows as a dict of column lists (STORE_FIELDS keys), optionally limited to some groups.
+    """
+    connection = connect(store_path)
+    try:
+        query = f"SELECT {', '.join(STORE_FIELDS)} FROM fuel_rows"
+        parameters = []
+        if logistic_groups:
+            query += f" WHERE logistic_group IN ({', '.join('?' for _ in logistic_groups)})"
+            parameters = list(logistic_groups)
+        rows = connection.execute(query, parameters).fetchall()
+    finally:
+        connection.close()
+    return {name: [row[index] for row in rows] for index, name in enumerate(STORE_FIELDS)}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Ingest downloaded fuel reports into the report store.")
+    parser.add_argument("directory", nargs="?", default=DOWNLOAD_DIR)
+    parser.add_argument("--store", default=REPORT_STORE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ingested_files, ingested_rows = ingest_archive(args.directory, args.store)
+    print(f"Ingested {ingested_files} files ({ingested_rows} new rows) in {time.perf_counter() - start:.2f}s")
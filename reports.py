@@ -1,5 +1,6 @@
 import logging
 import os
+import re
 import time
 from datetime import datetime, timedelta
 
@@ -8,31 +9,71 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
-from automation import click_element, fill_form_field
-from config import DOWNLOAD_DIR
+from capture import CaptureError, ReportCapture
+from config import ALL_GROUPS_OPTION, CAPTURE_DOWNLOADS, DOWNLOAD_DIR, EXPORT_API_URL, REPORT_COLUMNS
+from downloads import DownloadWatcher
+from http_export import engine_for_driver, write_report
+from pages import ReportsPage
+from report_cache import get_cached_report, store_report
+from report_split import split_report
+from report_store import record_report
+from tracing import span, current_span, traced
 from constants import (
-    SELECTOR_REPORTS_MENU,
     SELECTOR_REPORT_DROPDOWN,
-    XPATH_OPTION_TEMPLATE,
     REPORT_TYPE_TEXT,
     SELECTOR_DATE_INPUT,
     DATE_PICKER_OVERLAY_BACKDROP,
-    DATE_PICKER_OVERLAY_ID,
     SELECTOR_LOGISTIC_GROUP_SELECT,
-    SELECTOR_SHOW_REPORT_BUTTON,
-    SELECTOR_EXPORT_EXCEL_BUTTON,
-    SELECTOR_GENERATE_REPORT_BUTTON,
     CHECKBOX_SELECTOR,
-    CHECKBOX_LABEL_XPATH
+    GROUP_COLUMN_LABEL
 )
 
 logger = logging.getLogger(__name__)
 
-def get_previous_friday():
+# Toggles the column checkboxes so that exactly the wanted labels are checked.
+# Arguments: checkbox selector, list of wanted labels. Returns {changes: [{label, checked}], labels: [...]}.
+SELECT_COLUMNS_SCRIPT = """
+const [checkboxSelector, wanted] = arguments;
+const wantedLabels = new Set(wanted);
+const changes = [];
+const labels = [];
+for (const checkbox of document.querySelectorAll(checkboxSelector)) {
+    const label = checkbox.closest('label');
+    const span = label ? label.querySelector(':scope > span') : null;
+    const text = span ? span.textContent.trim() : '';
+    labels.push(text);
+    const checked = checkbox.getAttribute('aria-checked') === 'true';
+    const want = wantedLabels.has(text);
+    if (want !== checked) {
+        checkbox.parentElement.click();
+        changes.push({label: text, checked: want});
+    }
+}
+return {changes: changes, labels: labels};
+"""
+
+# Reads the report form state in one round trip.
+# Arguments: report dropdown, date input, logistic group select and date-picker backdrop selectors.
+REPORT_FORM_STATE_SCRIPT = """
+const [dropdownSelector, dateSelector, groupSelector, backdropSelector] = arguments;
+const dropdown = document.querySelector(dropdownSelector);
+const dateInput = document.querySelector(dateSelector);
+const groupSelect = document.querySelector(groupSelector);
+return {
+    dropdown: !!dropdown,
+    reportType: dropdown ? dropdown.textContent : null,
+    dateValue: dateInput ? dateInput.value : null,
+    groupSelect: !!groupSelect && groupSelect.offsetParent !== null,
+    backdrop: !!document.querySelector(backdropSelector)
+};
+"""
+
+def get_previous_friday(today=None):
     """
-    Returns the date of the previous Friday in DD/MM/YYYY format.
+    Returns the date of the previous Friday (relative to `today`, the current date by default)
+    in DD/MM/YYYY format.
     """
-    today = datetime.today()
+    today = today or datetime.today()
     days_behind = today.weekday() - 4  # Monday=0,...,Sunday=6; Friday=4
     if days_behind < 0:
         days_behind += 7
@@ -42,36 +83,39 @@ def get_previous_friday():
     previous_friday = today - timedelta(days=days_behind)
     return f"{previous_friday.day}/{previous_friday.month}/{previous_friday.year}"
 
-def select_options(driver):
+@traced()
+def select_options(driver, columns=None):
     """
-    Selects certain checkboxes on the report page.
+    Selects exactly the requested report columns (REPORT_COLUMNS by default) on the export page.
+    All labels and states are read and toggled in a single script call.
+    Returns a dict with the 'selected' and 'deselected' labels and any requested 'missing' columns.
     """
-    options_to_select = ['מספר רכב', 'מוצר', 'כמות ליטר', 'סכום ברוטו ש"ח', 'תאריך']
+    columns = list(columns or REPORT_COLUMNS)
 
     try:
         wait = WebDriverWait(driver, 10)
-        checkboxes = wait.until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, CHECKBOX_SELECTOR))
-        )
-
-        for checkbox in checkboxes:
-            label = checkbox.find_element(By.XPATH, CHECKBOX_LABEL_XPATH).text
-            checked = checkbox.get_attribute('aria-checked')
-            if label in options_to_select and checked == 'false':
-                checkbox.find_element(By.XPATH, "./parent::div").click()
-                logger.debug(f"Selected checkbox: {label}")
-            elif label not in options_to_select and checked == 'true':
-                checkbox.find_element(By.XPATH, "./parent::div").click()
-                logger.debug(f"Deselected checkbox: {label}")
+        wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, CHECKBOX_SELECTOR)))
+
+        result = driver.execute_script(SELECT_COLUMNS_SCRIPT, CHECKBOX_SELECTOR, columns)
+        diff = {
+            "selected": [change["label"] for change in result["changes"] if change["checked"]],
+            "deselected": [change["label"] for change in result["changes"] if not change["checked"]],
+            "missing": [column for column in columns if column not in result["labels"]],
+        }
     except Exception:
         logger.exception("Error selecting checkbox options.")
         raise
 
-def get_latest_downloaded_file():
+    logger.debug(f"Selected checkboxes: {diff['selected']}, deselected: {diff['deselected']}")
+    if diff["missing"]:
+        logger.warning(f"Report columns not found on the page: {diff['missing']}")
+    return diff
+
+def get_latest_downloaded_file(download_dir=None):
     """
-    Retrieves the most recently downloaded file from the DOWNLOAD_DIR.
+    Retrieves the most recently downloaded file from `download_dir` (DOWNLOAD_DIR by default).
     """
-    directory = os.path.join(os.getcwd(), DOWNLOAD_DIR)
+    directory = os.path.join(os.getcwd(), download_dir or DOWNLOAD_DIR)
     os.makedirs(directory, exist_ok=True)
 
     files = os.listdir(directory)
@@ -85,16 +129,25 @@ def get_latest_downloaded_file():
     logger.debug(f"Latest downloaded file: {latest_file_path}")
     return latest_file_path, latest_file, latest_file_ctime
 
-def get_latest_report(start_time=time.time(), timeout=120):
+@traced()
+def get_latest_report(start_time=None, timeout=120, download_dir=None, watcher=None):
     """
     Retrieves the most recent .xlsx report, with a timeout.
+    With a started DownloadWatcher the report is returned as soon as it is finalized;
+    without one, falls back to polling the download directory.
     """
-    prev_report_path, prev_report_name, prev_file_ctime = get_latest_downloaded_file()
+    if watcher is not None:
+        return watcher.wait_for_file(timeout)
+
+    if start_time is None:
+        start_time = time.time()
+
+    prev_report_path, prev_report_name, prev_file_ctime = get_latest_downloaded_file(download_dir)
     if prev_file_ctime is None:
         prev_file_ctime = 0
 
     while True:
-        latest_report_path, latest_report_name, latest_file_ctime = get_latest_downloaded_file()
+        latest_report_path, latest_report_name, latest_file_ctime = get_latest_downloaded_file(download_dir)
         if latest_file_ctime != prev_file_ctime and latest_report_path and latest_report_path.endswith('.xlsx'):
             logger.debug(f"Found new XLSX report: {latest_report_path}")
             return latest_report_path, latest_report_name
@@ -105,51 +158,274 @@ def get_latest_report(start_time=time.time(), timeout=120):
 
         time.sleep(1)
 
-def get_information_reports(driver, logistic_group):
+def parse_date_parts(value):
+    """
+    Returns the (day, month, year) integers of a D/M/YYYY-style date string, ignoring zero padding
+    and separators, or None if it cannot be parsed.
+    """
+    parts = re.findall(r'\d+', value or '')
+    if len(parts) != 3:
+        return None
+    return tuple(int(part) for part in parts)
+
+
+def get_report_form_state(driver, end_date):
+    """
+    Checks in a single script call whether the report form is still set up for `end_date`.
+    Returns 'ready', 'absent' (not on the report form) or 'invalid' (form present but in the wrong state).
+    """
+    state = driver.execute_script(
+        REPORT_FORM_STATE_SCRIPT,
+        SELECTOR_REPORT_DROPDOWN,
+        SELECTOR_DATE_INPUT,
+        SELECTOR_LOGISTIC_GROUP_SELECT,
+        DATE_PICKER_OVERLAY_BACKDROP
+    )
+    if not state or not state.get('dropdown'):
+        return 'absent'
+    if (REPORT_TYPE_TEXT not in (state.get('reportType') or '')
+            or not state.get('groupSelect')
+            or state.get('backdrop')
+            or parse_date_parts(state.get('dateValue')) != parse_date_parts(end_date)):
+        return 'invalid'
+    return 'ready'
+
+
+@traced()
+def prepare_report_form(driver, end_date):
+    """
+    Opens the reports page, selects the fuel detail report type and enters the period end date.
+    """
+    page = ReportsPage.for_driver(driver)
+    page.open_report_form()
+    page.set_end_date(end_date)
+    logger.debug(f"End date set to: {end_date}")
+
+
+@traced()
+def export_group_report(driver, logistic_group, download_dir=None, columns=None, end_date=None):
+    """
+    On a prepared report form: selects the logistic group, exports the report (with `columns`,
+    REPORT_COLUMNS by default) and waits for the download. With CAPTURE_DOWNLOADS, the xlsx is read
+    from the browser's network traffic and saved under the group's name and `end_date` instead.
+    Navigates back to the form afterwards (without refreshing) and checks that it survived the navigation;
+    if not, the cached page elements are dropped so the next group sets the form up again.
+    Returns the report file path.
+    """
+    end_date = end_date or get_previous_friday()
+    page = ReportsPage.for_driver(driver)
+    page.select_logistic_group(logistic_group)
+    page.open_export()
+
+    select_options(driver, columns)
+
+    # Start watching before the click so a fast download cannot be missed
+    with DownloadWatcher(download_dir) as watcher:
+        if CAPTURE_DOWNLOADS:
+            report_file_path = _capture_report(driver, page, watcher, logistic_group, end_date, download_dir)
+        else:
+            page.generate_report()
+            report_file_path, report_file_name = get_latest_report(watcher=watcher)
+
+    driver.back()
+    driver.back()
+    form_state = get_report_form_state(driver, end_date)
+    current_span().set("form_after_back", form_state)
+    if form_state != 'ready':
+        logger.info(f"Report form is '{form_state}' after leaving the export view, it will be set up again.")
+        page.forget()
+
+    logger.info(f"Generated report for '{logistic_group}', saved to: {report_file_path}")
+    return report_file_path
+
+
+def _capture_report(driver, page, watcher, logistic_group, end_date, download_dir):
     """
-    Retrieves information reports for the specified logistic group.
+    Triggers the export and captures the xlsx over CDP (see capture.py). Falls back to the download
+    folder when the performance log or the response body is unavailable, or when no xlsx response
+    shows up (Chrome handled the export as a plain download).
     """
+    generated = False
     try:
-        click_element(driver, SELECTOR_REPORTS_MENU)
-        click_element(driver, SELECTOR_REPORT_DROPDOWN)
+        with ReportCapture(driver) as capture:
+            page.generate_report()
+            generated = True
+            with span("capture_report", logistic_group=logistic_group):
+                data = capture.wait_for_report()
+    except (CaptureError, TimeoutException) as e:
+        if isinstance(e, TimeoutException) and not generated:
+            # The export button itself could not be clicked
+            raise
+        logger.warning(f"Could not capture the report of '{logistic_group}', using the download folder: {e}")
+        if not generated:
+            page.generate_report()
+        report_file_path, report_file_name = get_latest_report(watcher=watcher)
+        return report_file_path
 
-        xpath_selector = XPATH_OPTION_TEMPLATE.format(option_text=REPORT_TYPE_TEXT)
-        click_element(driver, xpath_selector, 'xpath')
+    return write_report(data, logistic_group, end_date, download_dir)
 
-        click_element(driver, SELECTOR_DATE_INPUT)
-        fill_form_field(driver, SELECTOR_DATE_INPUT, get_previous_friday())
-        logger.debug(f"End date set to previous Friday: {get_previous_friday()}")
 
-        # Remove date picker overlay if present
-        while True:
-            try:
-                driver.execute_script(f"document.getElementById('{DATE_PICKER_OVERLAY_ID}').style.display = 'none';")
-                break
-            except Exception:
-                logger.debug('Calendar overlay not found, retrying...')
-                time.sleep(1)
+def _export_over_http(driver, logistic_group, end_date, download_dir, columns):
+    """
+    Fetches the report through the HTTP export engine. Returns the file path, or None on failure.
+    """
+    try:
+        with span("http_export", logistic_group=logistic_group):
+            return engine_for_driver(driver).save_report(logistic_group, end_date, download_dir, columns)
+    except Exception as e:
+        logger.warning(f"HTTP export failed for '{logistic_group}', falling back to the browser: {e}")
+        return None
 
-        click_element(driver, DATE_PICKER_OVERLAY_BACKDROP)
 
-        click_element(driver, SELECTOR_LOGISTIC_GROUP_SELECT)
-        xpath_selector = XPATH_OPTION_TEMPLATE.format(option_text=logistic_group)
-        click_element(driver, xpath_selector, 'xpath')
+def _retrieve_report(driver, logistic_group, download_dir, browser_flow, columns=None, end_date=None):
+    """
+    Shared retrieval path for the period ending on `end_date` (the previous Friday by default):
+    cached report, then the HTTP export engine (if configured), then `browser_flow(end_date)`.
+    Fresh reports are stored in the cache.
+    """
+    columns = list(columns or REPORT_COLUMNS)
+    current_span().set("logistic_group", logistic_group)
+    end_date = end_date or get_previous_friday()
+    current_span().set("end_date", end_date)
 
-        click_element(driver, SELECTOR_SHOW_REPORT_BUTTON)
-        click_element(driver, SELECTOR_EXPORT_EXCEL_BUTTON)
+    cached_report_path = get_cached_report(logistic_group, end_date, columns)
+    if cached_report_path:
+        current_span().set("cache_hit", True)
+        return cached_report_path
 
-        select_options(driver)
+    report_file_path = None
+    if EXPORT_API_URL:
+        report_file_path = _export_over_http(driver, logistic_group, end_date, download_dir, columns)
 
-        click_element(driver, SELECTOR_GENERATE_REPORT_BUTTON)
+    if not report_file_path:
+        try:
+            report_file_path = browser_flow(end_date)
+        except Exception:
+            logger.exception(f"Failed to get information report for logistic group '{logistic_group}'.")
+            raise
 
-        report_file_path, report_file_name = get_latest_report()
+    store_report(logistic_group, end_date, columns, report_file_path)
+    record_report(report_file_path, logistic_group)
+    return report_file_path
 
-        driver.back()
-        driver.back()
-        driver.refresh()
 
-        logger.info(f"Generated report for '{logistic_group}', saved to: {report_file_path}")
+@traced()
+def get_information_reports(driver, logistic_group, download_dir=None, columns=None, end_date=None):
+    """
+    Retrieves information reports for the specified logistic group (with `columns`, REPORT_COLUMNS by default)
+    for the period ending on `end_date` (the previous Friday by default).
+    `download_dir` must match the directory the driver was configured to download into.
+    Cached reports are returned immediately; when EXPORT_API_URL is set, the report is fetched over HTTP
+    and the UI flow is only a fallback.
+    """
+    def browser_flow(end_date):
+        prepare_report_form(driver, end_date)
+        report_file_path = export_group_report(driver, logistic_group, download_dir, columns, end_date)
+        driver.refresh()
         return report_file_path
+
+    return _retrieve_report(driver, logistic_group, download_dir, browser_flow, columns, end_date)
+
+
+@traced()
+def get_group_report(driver, logistic_group, download_dir=None, end_date=None):
+    """
+    Multi-group step: retrieves a logistic group's report (for the period ending on `end_date`, the previous
+    Friday by default), reusing the report type and date already set on the page by the previous group.
+    The form is set up from scratch only when it is missing, and the page is refreshed first only when
+    its state is invalid (e.g. set to another period).
+    """
+    def browser_flow(end_date):
+        form_state = get_report_form_state(driver, end_date)
+        current_span().set("form_state", form_state)
+        if form_state == 'invalid':
+            logger.info("Report form is in an unexpected state, resetting the page.")
+            driver.refresh()
+        if form_state != 'ready':
+            prepare_report_form(driver, end_date)
+        else:
+            logger.debug(f"Reusing the prepared report form for '{logistic_group}'.")
+
+        return export_group_report(driver, logistic_group, download_dir, end_date=end_date)
+
+    return _retrieve_report(driver, logistic_group, download_dir, browser_flow, end_date=end_date)
+
+
+def split_cached_reports(logistic_groups):
+    """
+    Returns ({logistic_group: cached report path}, [groups without a fresh cached report])
+    for the current period, so callers can skip the browser entirely when nothing is missing.
+    """
+    end_date = get_previous_friday()
+    cached = {}
+    pending = []
+    for logistic_group in logistic_groups:
+        report_file_path = get_cached_report(logistic_group, end_date, REPORT_COLUMNS)
+        if report_file_path:
+            cached[logistic_group] = report_file_path
+        else:
+            pending.append(logistic_group)
+    return cached, pending
+
+
+def _notify(on_result, logistic_group, report_file_path):
+    """
+    Calls `on_result` for a ready report; a failing callback is logged and does not affect the other groups.
+    """
+    if not on_result:
+        return
+    try:
+        on_result(logistic_group, report_file_path)
     except Exception:
-        logger.exception(f"Failed to get information report for logistic group '{logistic_group}'.")
-        raise
+        logger.exception(f"Result callback failed for '{logistic_group}'.")
+
+
+def get_reports_for_groups(driver, logistic_groups, download_dir=None, on_result=None):
+    """
+    Retrieves the reports of several logistic groups on one driver, setting the report type and date once.
+    A failed group does not stop the others. Returns a (results, failures) tuple of dicts keyed by
+    logistic group; `on_result(logistic_group, report_file_path)` is called as each report is ready.
+    """
+    results = {}
+    failures = {}
+    for logistic_group in logistic_groups:
+        try:
+            report_file_path = get_group_report(driver, logistic_group, download_dir)
+        except Exception as e:
+            failures[logistic_group] = e
+            continue
+        results[logistic_group] = report_file_path
+        _notify(on_result, logistic_group, report_file_path)
+    return results, failures
+
+
+@traced()
+def get_split_reports(driver, logistic_groups, download_dir=None, on_result=None):
+    """
+    All-groups mode (ALL_GROUPS_OPTION): generates one report covering every logistic group, with the
+    logistic group column added, and splits it locally into per-group files that are stored in the cache.
+    Returns a (results, failures) tuple like get_reports_for_groups; if the report cannot be generated
+    or split, every group fails with that error.
+    """
+    end_date = get_previous_friday()
+    columns = REPORT_COLUMNS + [GROUP_COLUMN_LABEL] if GROUP_COLUMN_LABEL not in REPORT_COLUMNS else REPORT_COLUMNS
+    try:
+        report_file_path = get_information_reports(driver, ALL_GROUPS_OPTION, download_dir, columns)
+        with span("split_report", groups=len(logistic_groups)):
+            paths = split_report(
+                report_file_path,
+                logistic_groups,
+                os.path.join(os.getcwd(), download_dir or DOWNLOAD_DIR, "split"),
+                file_suffix=f" {end_date.replace('/', '-')}",
+                keep_group_column=GROUP_COLUMN_LABEL in REPORT_COLUMNS
+            )
+    except Exception as e:
+        logger.exception("Failed to get the all-groups report.")
+        return {}, {logistic_group: e for logistic_group in logistic_groups}
+
+    results = {}
+    for logistic_group, path in paths.items():
+        results[logistic_group] = store_report(logistic_group, end_date, REPORT_COLUMNS, path)
+        _notify(on_result, logistic_group, results[logistic_group])
+    logger.info(f"Split the all-groups report into {len(results)} group reports.")
+    return results, {}
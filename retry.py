@@ -0,0 +1,168 @@
+import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.common import (
+    InvalidArgumentException,
+    InvalidSelectorException,
+    InvalidSessionIdException,
+    NoSuchWindowException,
+    TimeoutException,
+)
+
+from config import (
+    RETRY_MAX_ATTEMPTS,
+    RETRY_ATTEMPT_TIMEOUT,
+    RETRY_SELECTOR_BUDGET,
+    RETRY_POLL_INTERVAL,
+    RUN_DEADLINE
+)
+
+logger = logging.getLogger(__name__)
+
+# Errors that no amount of waiting will fix: fail at once instead of retrying
+PERMANENT_ERRORS = (
+    InvalidSelectorException,
+    InvalidArgumentException,
+    InvalidSessionIdException,
+    NoSuchWindowException,
+    ValueError,
+)
+
+
+class DeadlineExceeded(TimeoutException):
+    """
+    Raised when the run deadline has passed.
+    """
+
+
+class Deadline:
+    """
+    A point in time shared by every retrying step of a run.
+    """
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+# The deadline of the run executing on each thread, so runs in one process (daemon jobs, backfills)
+# never reset or inherit each other's deadline
+_local = threading.local()
+
+
+@contextmanager
+def run_deadline(deadline):
+    """
+    Makes `deadline` (a Deadline, or None for no deadline) the run deadline of the calling thread
+    for the duration of the block, then restores the previous one.
+    """
+    previous = get_run_deadline()
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = previous
+
+
+def start_run_deadline(seconds=RUN_DEADLINE):
+    """
+    Returns a run_deadline block for a new run, expiring `seconds` from now (no deadline if 0).
+    """
+    return run_deadline(Deadline(seconds) if seconds else None)
+
+
+def get_run_deadline():
+    return getattr(_local, "deadline", None)
+
+
+def with_run_deadline(function):
+    """
+    Wraps `function` to run under the calling thread's run deadline; used for the worker threads a run starts.
+    """
+    deadline = get_run_deadline()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with run_deadline(deadline):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+class RetryPolicy:
+    """
+    Retries an operation with exponential backoff and jitter, within a per-selector time budget
+    and the run deadline (`deadline`, or that of the run on the current thread). Errors in `permanent_errors` are raised immediately.
+    """
+
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, attempt_timeout=RETRY_ATTEMPT_TIMEOUT,
+                 selector_budget=RETRY_SELECTOR_BUDGET, poll_interval=RETRY_POLL_INTERVAL,
+                 base_delay=0.5, max_delay=8.0, permanent_errors=PERMANENT_ERRORS, deadline=None):
+        self.max_attempts = max_attempts
+        self.attempt_timeout = attempt_timeout
+        self.selector_budget = selector_budget
+        self.poll_interval = poll_interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.permanent_errors = permanent_errors
+        self.deadline = deadline
+
+    def backoff(self, attempt):
+        """
+        Returns the delay after the given (1-based) failed attempt: exponential, capped, with "equal jitter".
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _remaining(self, budget):
+        deadline = self.deadline or get_run_deadline()
+        remaining = budget.remaining()
+        if deadline is not None:
+            remaining = min(remaining, deadline.remaining())
+        return remaining
+
+    def execute(self, operation, description, on_retry=None):
+        """
+        Calls `operation(timeout)` until it returns, passing the time the attempt may wait for.
+        Raises the permanent error as-is, DeadlineExceeded when the run deadline has passed,
+        or TimeoutException once attempts or the per-selector budget are used up.
+        """
+        budget = Deadline(self.selector_budget)
+        attempt = 0
+        while True:
+            remaining = self._remaining(budget)
+            deadline = self.deadline or get_run_deadline()
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(f"Run deadline exceeded before: {description}")
+            if remaining <= 0:
+                raise TimeoutException(f"Retry budget of {self.selector_budget}s used up for: {description}")
+
+            attempt += 1
+            try:
+                return operation(min(self.attempt_timeout, remaining))
+            except self.permanent_errors:
+                logger.error(f"Permanent error for '{description}', not retrying.")
+                raise
+            except Exception as e:
+                if attempt >= self.max_attempts:
+                    raise TimeoutException(
+                        f"Gave up on '{description}' after {attempt} attempts: {e}"
+                    ) from e
+
+                delay = min(self.backoff(attempt), self._remaining(budget))
+                logger.warning(f"Attempt {attempt}/{self.max_attempts} failed for '{description}': {e}. "
+                               f"Retrying in {delay:.2f}s.")
+                if on_retry:
+                    on_retry()
+                time.sleep(delay)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
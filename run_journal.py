@@ -0,0 +1,91 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from config import RUN_JOURNAL
+from mailer import split_recipients
+
+logger = logging.getLogger(__name__)
+
+GENERATED = "generated"
+REPORT_FAILED = "report_failed"
+EMAILED = "emailed"
+EMAIL_FAILED = "email_failed"
+
+
+class RunJournal:
+    """
+    Append-only JSON-lines record of what each run did for every logistic group of a report period:
+    reports generated (with their path) or failed, and emails sent (with their recipients) or failed.
+    Lines are flushed as they are written, so a crashed run can be resumed (`main.py --resume`).
+    With an empty `path` nothing is recorded.
+    """
+
+    def __init__(self, period, path=RUN_JOURNAL):
+        self.period = period
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, logistic_group, event, **details):
+        if not self.path:
+            return
+        entry = {"period": self.period, "group": logistic_group, "event": event, "at": time.time(), **details}
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError:
+                logger.exception(f"Failed to write to the run journal {self.path}")
+
+    def events(self):
+        """
+        Returns the journal entries of this report period, oldest first. Unreadable lines are skipped.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and entry.get("period") == self.period:
+                    entries.append(entry)
+        return entries
+
+    def generated_reports(self):
+        """
+        Returns {logistic_group: report path} for reports generated this period that are still on disk.
+        """
+        reports = {}
+        for entry in self.events():
+            if entry["event"] == GENERATED and os.path.exists(entry.get("path", "")):
+                reports[entry["group"]] = entry["path"]
+        return reports
+
+    def remaining_recipients(self, group_recipients):
+        """
+        Returns {logistic_group: ';'-separated recipients} still owed this period's report,
+        leaving out the groups every recipient already got.
+        """
+        delivered = {}
+        for entry in self.events():
+            if entry["event"] == EMAILED:
+                delivered.setdefault(entry["group"], set()).update(
+                    recipient.lower() for recipient in entry.get("recipients", [])
+                )
+
+        remaining = {}
+        for logistic_group, recipient_emails in group_recipients.items():
+            owed = [recipient for recipient in split_recipients(recipient_emails)
+                    if recipient.lower() not in delivered.get(logistic_group, set())]
+            if owed:
+                remaining[logistic_group] = ";".join(owed)
+        return remaining
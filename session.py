@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from selenium.common import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from config import SESSION_FILE
+from constants import SELECTOR_REPORTS_MENU
+
+logger = logging.getLogger(__name__)
+
+SIGNED_IN_TIMEOUT = 30
+RESTORED_SESSION_TIMEOUT = 10
+
+READ_LOCAL_STORAGE_SCRIPT = "return Object.assign({}, window.localStorage);"
+WRITE_LOCAL_STORAGE_SCRIPT = """
+const items = arguments[0];
+for (const key of Object.keys(items)) {
+    window.localStorage.setItem(key, items[key]);
+}
+"""
+
+
+def is_signed_in(driver, timeout=SIGNED_IN_TIMEOUT):
+    """
+    Returns True once the reports menu (only shown to signed-in users) is present, False after `timeout`.
+    """
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, SELECTOR_REPORTS_MENU))
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def save_session(driver, session_file=SESSION_FILE):
+    """
+    Saves the cookies and local storage of a signed-in driver to `session_file`.
+    """
+    if not is_signed_in(driver):
+        logger.warning("Not saving session: sign-in did not reach the reports page.")
+        return
+
+    # Pool workers may save the same session file at once, so each writer gets its own temp file
+    temp_file = f"{session_file}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        state = {
+            "saved_at": time.time(),
+            "cookies": driver.get_cookies(),
+            "local_storage": driver.execute_script(READ_LOCAL_STORAGE_SCRIPT),
+        }
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp_file, session_file)
+        logger.info(f"Saved session to {session_file}")
+    except (OSError, WebDriverException):
+        logger.exception(f"Failed to save session to {session_file}")
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+
+
+def restore_session(driver, session_file=SESSION_FILE):
+    """
+    Restores a saved session into a driver that is already on the site.
+    Returns True if the restored session is still valid, False if it is missing or expired.
+    """
+    try:
+        with open(session_file, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        logger.debug(f"No saved session at {session_file}")
+        return False
+    except (OSError, ValueError):
+        logger.warning(f"Saved session at {session_file} is unreadable, ignoring it.")
+        return False
+
+    now = time.time()
+    try:
+        for cookie in state.get("cookies", []):
+            if cookie.get("expiry") and cookie["expiry"] < now:
+                continue
+            if cookie.get("sameSite") not in (None, "Strict", "Lax", "None"):
+                cookie.pop("sameSite")
+            driver.add_cookie(cookie)
+        driver.execute_script(WRITE_LOCAL_STORAGE_SCRIPT, state.get("local_storage", {}))
+        driver.refresh()
+    except WebDriverException:
+        logger.exception("Failed to restore saved session.")
+        return False
+
+    return is_signed_in(driver, RESTORED_SESSION_TIMEOUT)
@@ -0,0 +1,148 @@
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from anomalies import detect_anomalies, group_findings, findings_for_report, RunAnomalies
+from report_store import STORE_FIELDS, connect
+
+
+def _columns(rows):
+    return {name: [row[index] for row in rows] for index, name in enumerate(STORE_FIELDS)}
+
+
+def _history(vehicle="12-345-67", group="אילת", weeks=6):
+    """
+    One 40 L diesel fill at 7.00 per liter every Monday and Thursday.
+    """
+    first_monday = date(2023, 8, 7)
+    rows = []
+    for week in range(weeks):
+        for day in (0, 3):
+            fuel_date = first_monday + timedelta(days=week * 7 + day)
+            rows.append((group, vehicle, "סולר", 40.0, 280.0, fuel_date.isoformat()))
+    return rows
+
+
+def test_duplicate_fills():
+    rows = _history() + [("אילת", "12-345-67", "סולר", 40.0, 280.0, "2023-08-07")]
+
+    flags = detect_anomalies(_columns(rows))
+
+    assert flags["duplicate"].sum() == 2
+    assert not flags["liters"].any()
+    assert not flags["price"].any()
+
+
+def test_liters_above_vehicle_median():
+    rows = _history() + [("אילת", "12-345-67", "סולר", 90.0, 630.0, "2023-09-13")]
+
+    flags = detect_anomalies(_columns(rows))
+
+    assert np.flatnonzero(flags["liters"]).tolist() == [len(rows) - 1]
+
+
+def test_price_per_liter_outlier():
+    rows = _history() + _history(vehicle="55-555-55") + [("אילת", "55-555-55", "סולר", 40.0, 480.0, "2023-09-14")]
+
+    flags = detect_anomalies(_columns(rows))
+
+    assert np.flatnonzero(flags["price"]).tolist() == [len(rows) - 1]
+
+
+def test_fill_frequency_spike():
+    spike = [("אילת", "12-345-67", "סולר", 40.0, 280.0, f"2023-09-{day:02d}") for day in (12, 13, 15)]
+    rows = _history() + spike
+
+    flags = detect_anomalies(_columns(rows))
+
+    # The spike week holds its two regular fills plus the three extra ones
+    assert flags["frequency"].sum() == 5
+    assert not flags["frequency"][:len(_history()) - 2].any()
+
+
+def test_missing_values_and_empty_input():
+    rows = _history() + [("אילת", None, None, None, None, None), ("אילת", "1", "סולר", None, 7.0, "2023-02-30")]
+    flags = detect_anomalies(_columns(rows))
+    assert not any(flags[check][-2:].any() for check in flags)
+
+    empty = detect_anomalies(_columns([]))
+    assert all(len(mask) == 0 for mask in empty.values())
+
+
+def test_group_findings_filters_group_and_period():
+    rows = (_history() + _history(group="נתניה", vehicle="77-777-77")
+            + [("נתניה", "77-777-77", "סולר", 95.0, 665.0, "2023-09-01"),
+               ("אילת", "12-345-67", "סולר", 95.0, 665.0, "2023-09-13")])
+    columns = _columns(rows)
+    flags = detect_anomalies(columns)
+
+    findings = group_findings(columns, flags, "אילת", "2023-09-09", "2023-09-15")
+
+    assert findings == ["Unusually large fill: vehicle 12-345-67, 2023-09-13, 95.0 L"]
+
+
+def test_findings_for_report_reads_store(tmp_path):
+    store = str(tmp_path / "store.sqlite")
+    rows = _history() + [("אילת", "12-345-67", "סולר", 95.0, 665.0, "2023-09-13")]
+    connection = connect(store)
+    with connection:
+        connection.executemany(
+            "INSERT INTO fuel_rows VALUES (?, ?, ?, ?, ?, ?, ?, 'x.xlsx')",
+            [(str(index), *row) for index, row in enumerate(rows)]
+        )
+    connection.close()
+
+    assert findings_for_report("אילת", "15/9/2023", store) == [
+        "Unusually large fill: vehicle 12-345-67, 2023-09-13, 95.0 L"
+    ]
+    assert findings_for_report("אילת", "15/9/2023", "") == []
+
+
+def test_run_anomalies_analyses_once_per_store_change(tmp_path):
+    store = str(tmp_path / "store.sqlite")
+    rows = _history() + [("אילת", "12-345-67", "סולר", 95.0, 665.0, "2023-09-13")]
+    connection = connect(store)
+    with connection:
+        connection.executemany(
+            "INSERT INTO fuel_rows VALUES (?, ?, ?, ?, ?, ?, ?, 'x.xlsx')",
+            [(str(index), *row) for index, row in enumerate(rows)]
+        )
+    run = RunAnomalies("15/9/2023", store)
+
+    with patch("anomalies.detect_anomalies", wraps=detect_anomalies) as mock_detect:
+        assert len(run.findings("אילת")) == 1
+        assert run.findings("נתניה") == []
+        assert mock_detect.call_count == 1
+
+        # A report ingested during the run makes the next group's findings reload the store
+        with connection:
+            connection.execute("INSERT INTO ingested_files VALUES ('h', 'y.xlsx', 'נתניה', 0, 0)")
+        run.findings("נתניה")
+        assert mock_detect.call_count == 2
+    connection.close()
+
+
+def test_large_batch_is_fast():
+    rng = np.random.default_rng(0)
+    size = 200_000
+    liters = rng.integers(20, 60, size).astype(float)
+    columns = {
+        "logistic_group": rng.choice(["אילת", "נתניה", "אייל"], size).tolist(),
+        "vehicle": rng.integers(0, 3000, size).astype(str).tolist(),
+        "product": rng.choice(["סולר", "בנזין 95"], size).tolist(),
+        "liters": liters.tolist(),
+        "gross_amount": (liters * 7.1).tolist(),
+        "fuel_date": (np.datetime64("2022-01-01") + rng.integers(0, 730, size)).astype(str).tolist(),
+    }
+
+    start = time.perf_counter()
+    flags = detect_anomalies(columns)
+
+    assert time.perf_counter() - start < 2
+    assert all(len(mask) == size for mask in flags.values())
@@ -7,7 +7,13 @@ from selenium.common import TimeoutException
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from automation import initialize_webdriver_and_navigate, sign_in, click_element, fill_form_field
+from automation import (
+    initialize_webdriver_and_navigate,
+    sign_in,
+    click_element,
+    fill_form_field,
+    wait_for_loading_to_disappear
+)
 from config import BUSINESS_PARTNER_NUMBER, USER_ID, PASSWORD
 
 @pytest.mark.parametrize("url", [
@@ -27,34 +33,33 @@ def test_initialize_webdriver_and_navigate(mock_chrome, url):
     driver_instance.get.assert_called_once_with(url)  # ensure driver.get(url) was called
     assert driver is driver_instance  # returned the same mock
 
-@patch("automation.click_element")
-@patch("automation.fill_form_field")
+@patch("pages.LoginPage.click")
+@patch("pages.LoginPage.fill")
 def test_sign_in(mock_fill_form, mock_click):
     """
-    Checks that sign_in calls fill_form_field for each credential and calls click_element to submit.
+    Checks that sign_in fills each credential on the login page and clicks to submit.
     """
     driver = MagicMock()
 
     sign_in(driver)
 
-    # fill_form_field calls
-    # We expect 3 calls total
+    # We expect 3 fills total
     assert mock_fill_form.call_count == 3
 
     # Check each call's positional args
     calls = mock_fill_form.call_args_list
-    
+
     from config import BUSINESS_PARTNER_NUMBER, USER_ID, PASSWORD
     expected_texts = [BUSINESS_PARTNER_NUMBER, USER_ID, PASSWORD]
 
     for i in range(3):
         args, kwargs = calls[i]
-        # args[0] should be driver, args[1] is the css_selector, args[2] is the text
-        assert len(args) == 3
+        # args[0] is the css_selector, args[1] is the text
+        assert len(args) == 2
         # Just verify text matches the expected one
-        assert args[2] == expected_texts[i], f"Unexpected text for fill_form_field call {i}"
+        assert args[1] == expected_texts[i], f"Unexpected text for fill call {i}"
 
-    # click_element call
+    # Submit click
     mock_click.assert_called_once()
 
 
@@ -95,3 +100,102 @@ def test_fill_form_field(mock_wait, mock_wait_loading):
 
     fill_form_field(driver, "input[name='some_field']", "HELLO")
     form_elem.send_keys.assert_called_once_with("HELLO")
+
+
+def test_wait_for_loading_to_disappear_single_round_trip():
+    """
+    The loading wait runs in the page, so it makes exactly one async script call and returns the elapsed time.
+    """
+    driver = MagicMock()
+    driver.execute_async_script.return_value = True
+
+    elapsed = wait_for_loading_to_disappear(driver, timeout=5)
+
+    driver.execute_async_script.assert_called_once()
+    args = driver.execute_async_script.call_args.args
+    assert args[2] == 5000
+    driver.find_elements.assert_not_called()
+    assert elapsed >= 0
+
+
+def test_wait_for_loading_to_disappear_timeout():
+    """
+    If the in-page waiter reports that the shade is still displayed, a TimeoutException is raised.
+    """
+    driver = MagicMock()
+    driver.execute_async_script.return_value = False
+
+    with pytest.raises(TimeoutException):
+        wait_for_loading_to_disappear(driver, timeout=1)
+
+
+@patch("automation.save_session")
+@patch("automation.sign_in")
+@patch("automation.restore_session")
+@patch("automation.SESSION_FILE", "session.json")
+def test_ensure_signed_in_reuses_session(mock_restore, mock_sign_in, mock_save):
+    """
+    A valid saved session skips sign_in entirely.
+    """
+    from automation import ensure_signed_in
+    mock_restore.return_value = True
+
+    ensure_signed_in(MagicMock())
+
+    mock_sign_in.assert_not_called()
+    mock_save.assert_not_called()
+
+
+@patch("automation.save_session")
+@patch("automation.sign_in")
+@patch("automation.restore_session")
+@patch("automation.SESSION_FILE", "session.json")
+def test_ensure_signed_in_falls_back_to_sign_in(mock_restore, mock_sign_in, mock_save):
+    """
+    An expired session falls back to sign_in and saves the new session.
+    """
+    from automation import ensure_signed_in
+    mock_restore.return_value = False
+    driver = MagicMock()
+
+    ensure_signed_in(driver)
+
+    mock_sign_in.assert_called_once_with(driver, None)
+    mock_save.assert_called_once_with(driver, "session.json")
+
+
+@patch("automation.webdriver.Chrome")
+@patch("automation.BROWSER_PROFILE", "fast")
+def test_initialize_webdriver_fast_profile(mock_chrome, tmp_path, monkeypatch):
+    """
+    The fast profile runs headless with eager page load, a per-profile user data dir and resource blocking.
+    """
+    monkeypatch.chdir(tmp_path)
+    driver_instance = MagicMock()
+    mock_chrome.return_value = driver_instance
+
+    initialize_webdriver_and_navigate("https://example.com", profile_name="worker-1")
+
+    options = mock_chrome.call_args.kwargs["options"]
+    assert "--headless=new" in options.arguments
+    assert any(arg.startswith("--user-data-dir=") and arg.endswith("worker-1") for arg in options.arguments)
+    assert options.page_load_strategy == "eager"
+    assert options.experimental_options["prefs"]["profile.managed_default_content_settings.images"] == 2
+
+    cdp_commands = [call.args[0] for call in driver_instance.execute_cdp_cmd.call_args_list]
+    assert "Network.setBlockedURLs" in cdp_commands
+
+
+@patch("automation.WebDriverWait")
+def test_click_element_uses_policy_poll_interval(mock_wait):
+    """
+    click_element waits with the policy's per-attempt timeout and short poll interval.
+    """
+    from retry import RetryPolicy
+    driver = MagicMock()
+
+    click_element(driver, "some_selector", "css", policy=RetryPolicy(attempt_timeout=3, poll_interval=0.05))
+
+    args, kwargs = mock_wait.call_args
+    assert args[1] <= 3
+    assert kwargs["poll_frequency"] == 0.05
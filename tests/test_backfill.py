@@ -0,0 +1,62 @@
+import os
+import sys
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backfill import weekly_end_dates, plan_backfill, archive_path, run_backfill
+
+
+def test_weekly_end_dates():
+    # 2023-08-01 is a Tuesday; 2023-09-01 is a Friday
+    assert weekly_end_dates(date(2023, 8, 1), date(2023, 9, 1)) == ["4/8/2023", "11/8/2023", "18/8/2023",
+                                                                      "25/8/2023", "1/9/2023"]
+    assert weekly_end_dates(date(2023, 8, 5), date(2023, 8, 10)) == []
+
+
+def test_plan_backfill_skips_archived_pairs(tmp_path):
+    archived = archive_path("אילת", "11/8/2023", str(tmp_path))
+    with open(archived, "wb") as f:
+        f.write(b"PK")
+
+    jobs, existing = plan_backfill(["אילת", "נתניה"], date(2023, 8, 1), date(2023, 8, 11), str(tmp_path))
+
+    assert jobs == [("אילת", "4/8/2023"), ("נתניה", "4/8/2023"), ("נתניה", "11/8/2023")]
+    assert existing == {("אילת", "11/8/2023"): archived}
+
+    jobs, existing = plan_backfill(["אילת"], date(2023, 8, 1), date(2023, 8, 11), str(tmp_path), force=True)
+    assert len(jobs) == 2 and existing == {}
+
+
+@patch("workers.ensure_signed_in")
+@patch("workers.initialize_webdriver_and_navigate")
+@patch("backfill.get_group_report")
+def test_run_backfill_archives_each_week(mock_group_report, mock_init, mock_sign_in, tmp_path):
+    mock_init.side_effect = lambda url, download_dir=None, profile_name=None: MagicMock()
+
+    def group_report(driver, logistic_group, download_dir=None, end_date=None):
+        if end_date == "11/8/2023" and logistic_group == "B":
+            raise RuntimeError("boom")
+        path = tmp_path / f"download-{logistic_group}-{end_date.replace('/', '-')}.xlsx"
+        path.write_bytes(f"{logistic_group} {end_date}".encode())
+        return str(path)
+
+    mock_group_report.side_effect = group_report
+    backfill_dir = str(tmp_path / "backfill")
+
+    results, failures = run_backfill(["A", "B"], date(2023, 8, 1), date(2023, 8, 11), pool_size=2,
+                                     backfill_dir=backfill_dir, url="http://localhost")
+
+    assert set(results) == {("A", "4/8/2023"), ("B", "4/8/2023"), ("A", "11/8/2023")}
+    assert set(failures) == {("B", "11/8/2023")}
+    with open(results[("A", "11/8/2023")], "rb") as f:
+        assert f.read() == b"A 11/8/2023"
+
+    # A second run only retries the missing pair
+    mock_group_report.reset_mock()
+    mock_group_report.side_effect = group_report
+    results, failures = run_backfill(["A"], date(2023, 8, 1), date(2023, 8, 11), pool_size=2,
+                                     backfill_dir=backfill_dir, url="http://localhost")
+    mock_group_report.assert_not_called()
+    assert len(results) == 2 and failures == {}
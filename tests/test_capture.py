@@ -0,0 +1,129 @@
+import base64
+import json
+import os
+import sys
+
+import pytest
+from unittest.mock import MagicMock, patch
+from selenium.common import TimeoutException, WebDriverException
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from capture import CaptureError, ReportCapture, is_report_response
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+REPORT_BYTES = b"PK\x03\x04 fake xlsx"
+
+
+def log_entry(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}}), "level": "INFO"}
+
+
+def export_events(request_id="7.1", mime_type=XLSX_MIME, finished=True):
+    events = [
+        log_entry("Network.responseReceived", requestId="7.0",
+                  response={"url": "http://portal/app.js", "mimeType": "text/javascript", "headers": {}}),
+        log_entry("Network.responseReceived", requestId=request_id,
+                  response={"url": "http://portal/download", "mimeType": mime_type,
+                            "headers": {"Content-Disposition": 'attachment; filename="report.xlsx"'}}),
+    ]
+    if finished:
+        events.append(log_entry("Network.loadingFinished", requestId=request_id))
+    else:
+        events.append(log_entry("Network.loadingFailed", requestId=request_id, errorText="net::ERR_ABORTED"))
+    return events
+
+
+def test_is_report_response():
+    assert is_report_response({"mimeType": XLSX_MIME, "headers": {}})
+    assert is_report_response({"mimeType": "application/octet-stream",
+                               "headers": {"content-disposition": "attachment; filename=r.xlsx"}})
+    assert not is_report_response({"mimeType": "application/octet-stream", "headers": {}})
+    assert not is_report_response({"mimeType": "text/html", "headers": {}})
+
+
+@patch("capture.POLL_INTERVAL", 0)
+def test_wait_for_report_reads_the_export_body():
+    driver = MagicMock()
+    # Events logged before entering the capture are discarded
+    driver.get_log.side_effect = [export_events("old"), [], export_events()]
+    driver.execute_cdp_cmd.return_value = {"body": base64.b64encode(REPORT_BYTES).decode(), "base64Encoded": True}
+
+    with ReportCapture(driver) as capture:
+        data = capture.wait_for_report(timeout=5)
+
+    assert data == REPORT_BYTES
+    driver.execute_cdp_cmd.assert_called_once_with("Network.getResponseBody", {"requestId": "7.1"})
+
+
+@patch("capture.POLL_INTERVAL", 0)
+def test_wait_for_report_raises_capture_error_when_body_is_gone():
+    driver = MagicMock()
+    driver.get_log.side_effect = [[], export_events()]
+    driver.execute_cdp_cmd.side_effect = WebDriverException("No resource with given identifier found")
+
+    with ReportCapture(driver) as capture, pytest.raises(CaptureError):
+        capture.wait_for_report(timeout=5)
+
+
+@patch("capture.POLL_INTERVAL", 0)
+def test_wait_for_report_failed_load_and_timeout():
+    driver = MagicMock()
+    driver.get_log.side_effect = [[], export_events(finished=False)]
+    with ReportCapture(driver) as capture, pytest.raises(CaptureError):
+        capture.wait_for_report(timeout=5)
+
+    driver.get_log.side_effect = None
+    driver.get_log.return_value = []
+    with ReportCapture(driver) as capture, pytest.raises(TimeoutException):
+        capture.wait_for_report(timeout=0.05)
+
+
+@patch("reports.CAPTURE_DOWNLOADS", True)
+@patch("reports.DownloadWatcher")
+@patch("reports.ReportsPage")
+@patch("reports.select_options")
+@patch("reports.get_latest_report")
+@patch("reports.ReportCapture")
+def test_export_group_report_captures_in_memory(mock_capture, mock_latest, mock_select, mock_page, mock_watcher,
+                                                tmp_path):
+    from reports import export_group_report
+    mock_capture.return_value.__enter__.return_value.wait_for_report.return_value = REPORT_BYTES
+
+    path = export_group_report(MagicMock(), "אילת", str(tmp_path), end_date="1/9/2023")
+
+    assert os.path.basename(path) == "אילת 1-9-2023.xlsx"
+    with open(path, "rb") as f:
+        assert f.read() == REPORT_BYTES
+    mock_latest.assert_not_called()
+
+    # Without the body, the download folder is used
+    mock_capture.return_value.__enter__.return_value.wait_for_report.side_effect = CaptureError("gone")
+    mock_latest.return_value = ("report list/report.xlsx", "report.xlsx")
+    assert export_group_report(MagicMock(), "אילת", str(tmp_path), end_date="1/9/2023") == "report list/report.xlsx"
+
+
+@patch("reports.CAPTURE_DOWNLOADS", True)
+@patch("reports.DownloadWatcher")
+@patch("reports.ReportsPage")
+@patch("reports.select_options")
+@patch("reports.get_latest_report", return_value=("report list/report.xlsx", "report.xlsx"))
+@patch("reports.ReportCapture")
+def test_export_group_report_falls_back_when_capture_is_unavailable(mock_capture, mock_latest, mock_select,
+                                                                    mock_page, mock_watcher):
+    """
+    No performance log, or no xlsx response at all (a plain download): the download folder is used.
+    """
+    from reports import export_group_report
+    page = mock_page.for_driver.return_value
+
+    mock_capture.return_value.__enter__.side_effect = CaptureError("performance log not enabled")
+    assert export_group_report(MagicMock(), "אילת", end_date="1/9/2023") == "report list/report.xlsx"
+    page.generate_report.assert_called_once()
+
+    page.generate_report.reset_mock()
+    mock_capture.return_value.__enter__.side_effect = None
+    mock_capture.return_value.__enter__.return_value.wait_for_report.side_effect = TimeoutException("no response")
+    assert export_group_report(MagicMock(), "אילת", end_date="1/9/2023") == "report list/report.xlsx"
+    page.generate_report.assert_called_once()
+    assert mock_latest.call_count == 2
@@ -0,0 +1,131 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from unittest.mock import MagicMock, patch
+from selenium.common import InvalidSessionIdException
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from daemon import parse_schedule, next_run_time, WarmDriver, ReportDaemon, send_command
+
+
+def test_parse_schedule():
+    assert parse_schedule("fri 08:00") == ({4}, 8, 0)
+    assert parse_schedule("Mon,Thursday 6:30") == ({0, 3}, 6, 30)
+    assert parse_schedule("daily 07:15") == (set(range(7)), 7, 15)
+    with pytest.raises(ValueError):
+        parse_schedule("someday 25:00")
+
+
+def test_next_run_time():
+    wednesday = datetime(2023, 9, 6, 12, 0)
+    assert next_run_time("fri 08:00", wednesday) == datetime(2023, 9, 8, 8, 0)
+    friday_later = datetime(2023, 9, 8, 9, 0)
+    assert next_run_time("fri 08:00", friday_later) == datetime(2023, 9, 15, 8, 0)
+    assert next_run_time("daily 07:00", friday_later) == datetime(2023, 9, 9, 7, 0)
+
+
+@patch("daemon.ensure_signed_in")
+@patch("daemon.initialize_webdriver_and_navigate")
+@patch("daemon.is_signed_in", return_value=True)
+def test_warm_driver_is_reused_while_healthy(mock_signed_in, mock_init, mock_ensure):
+    driver = MagicMock()
+    driver.execute_script.return_value = 50 * 1024 * 1024
+    mock_init.return_value = driver
+
+    warm = WarmDriver(url="http://localhost", max_heap_mb=512)
+    assert warm.get() is driver
+    assert warm.get() is driver
+
+    mock_init.assert_called_once()
+    assert warm.last_health["heap_mb"] == 50.0
+    assert warm.recycles == 0
+
+
+@patch("daemon.ensure_signed_in")
+@patch("daemon.initialize_webdriver_and_navigate")
+@patch("daemon.is_signed_in", return_value=True)
+def test_warm_driver_recycles_on_heap_growth_and_dead_session(mock_signed_in, mock_init, mock_ensure):
+    bloated = MagicMock()
+    bloated.execute_script.return_value = 900 * 1024 * 1024
+    dead = MagicMock()
+    dead.execute_script.side_effect = InvalidSessionIdException("gone")
+    fresh = MagicMock()
+    fresh.execute_script.return_value = 10 * 1024 * 1024
+    mock_init.side_effect = [bloated, dead, fresh]
+
+    warm = WarmDriver(url="http://localhost", max_heap_mb=512)
+    warm.start()
+    assert warm.get() is dead
+    assert warm.get() is fresh
+
+    bloated.quit.assert_called_once()
+    dead.quit.assert_called_once()
+    assert warm.recycles == 2
+
+
+@patch("daemon.ensure_signed_in")
+@patch("daemon.is_signed_in", side_effect=[False, True])
+def test_warm_driver_renews_expired_sign_in(mock_signed_in, mock_ensure):
+    warm = WarmDriver(url="http://localhost")
+    warm.driver = MagicMock()
+    warm.driver.execute_script.return_value = None
+
+    health = warm.check_health()
+
+    assert health["signed_in"] is True
+    assert health["reason"] is None
+    warm.driver.get.assert_called_once_with("http://localhost")
+    mock_ensure.assert_called_once()
+
+
+def test_daemon_runs_jobs_on_demand_over_the_socket():
+    warm = MagicMock()
+    warm.last_health = {"alive": True}
+    warm.recycles = 0
+    run_report = MagicMock()
+    daemon = ReportDaemon(schedule="daily 00:00", port=0, health_interval=3600,
+                          warm_driver=warm, run_report=run_report)
+
+    with patch("daemon.next_run_time", return_value=datetime(2999, 1, 1)):
+        thread = threading.Thread(target=daemon.serve_forever)
+        thread.start()
+        for _ in range(100):
+            if daemon._server is not None:
+                break
+            time.sleep(0.01)
+
+        assert send_command("run --force", daemon.port) == {"ok": True, "queued": "run"}
+        assert send_command("bogus", daemon.port)["ok"] is False
+        for _ in range(100):
+            if run_report.called:
+                break
+            time.sleep(0.01)
+        status = send_command("status", daemon.port)
+        send_command("stop", daemon.port)
+        thread.join(5)
+
+    assert not thread.is_alive()
+    run_report.assert_called_once_with(force=True, driver=warm.get.return_value)
+    assert status["next_run"].startswith("2999")
+    warm.quit.assert_called_once()
+
+
+def test_run_job_is_not_ok_when_groups_failed():
+    warm = MagicMock()
+    run_report = MagicMock(return_value={"אילת": "report failed: timeout"})
+    daemon = ReportDaemon(schedule="daily 00:00", port=0, warm_driver=warm, run_report=run_report)
+
+    daemon.run_job()
+    assert daemon.last_run["ok"] is False
+    assert daemon.last_run["errors"] == 1
+    assert daemon.last_run["failed"] == {"אילת": "report failed: timeout"}
+
+    run_report.return_value = {}
+    daemon.run_job(force=True)
+    assert daemon.last_run["ok"] is True
+    assert daemon.last_run["errors"] == 0
@@ -0,0 +1,96 @@
+import os
+import sys
+import zipfile
+
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from delivery import plan_deliveries, zip_name, DeliveryPlan, ReportDispatcher
+
+GROUPS = {
+    'אילת': 'eilat@budget.co.il;boss@budget.co.il',
+    'ירושלים': 'jerusalem@budget.co.il;Boss@budget.co.il',
+    'נתניה': 'natanya@budget.co.il',
+    'אייל': 'ashdod@budget.co.il;natanya@budget.co.il',
+}
+
+
+def test_plan_deliveries_groups_recipients_by_group_set():
+    deliveries = plan_deliveries(GROUPS)
+
+    assert deliveries == [
+        {"groups": ['אילת'], "recipients": ['eilat@budget.co.il']},
+        {"groups": ['אילת', 'ירושלים'], "recipients": ['boss@budget.co.il']},
+        {"groups": ['ירושלים'], "recipients": ['jerusalem@budget.co.il']},
+        {"groups": ['נתניה', 'אייל'], "recipients": ['natanya@budget.co.il']},
+        {"groups": ['אייל'], "recipients": ['ashdod@budget.co.il']},
+    ]
+
+
+def test_plan_deliveries_per_group():
+    deliveries = plan_deliveries(GROUPS, by_recipient=False)
+
+    assert [delivery["groups"] for delivery in deliveries] == [[group] for group in GROUPS]
+
+
+def test_delivery_plan_waits_for_every_report():
+    plan = DeliveryPlan(GROUPS)
+
+    ready = plan.report_ready('ירושלים', 'j.xlsx')
+    assert [delivery["groups"] for delivery in ready] == [['ירושלים']]
+
+    ready = plan.report_ready('אילת', 'e.xlsx')
+    assert [delivery["groups"] for delivery in ready] == [['אילת'], ['אילת', 'ירושלים']]
+    assert ready[1]["reports"] == {'אילת': 'e.xlsx', 'ירושלים': 'j.xlsx'}
+
+    # נתניה failed: its shared delivery still goes out with the report of אייל
+    plan.report_ready('אייל', 'a.xlsx')
+    remaining = plan.flush()
+    assert [delivery["reports"] for delivery in remaining] == [{'אייל': 'a.xlsx'}]
+    assert plan.flush() == []
+
+
+def _stopped_sender(sent=True):
+    sender = MagicMock()
+    submitted = []
+    sender.submit.side_effect = lambda key, **kwargs: submitted.append((key, kwargs))
+    sender.stop.side_effect = lambda: {
+        key: {"recipients": kwargs["recipient_emails"].split(";"), "attachment_path": kwargs["attachment_path"],
+              "sent": sent, "error": None if sent else "smtp error"}
+        for key, kwargs in submitted
+    }
+    return sender, submitted
+
+
+def test_dispatcher_sends_one_message_per_recipient_set(tmp_path):
+    sender, submitted = _stopped_sender()
+    dispatcher = ReportDispatcher(sender, GROUPS, lambda group: f"Report for {group}", "Weekly")
+
+    for group in GROUPS:
+        dispatcher.report_ready(group, f"{group}.xlsx")
+    statuses = dispatcher.finish()
+
+    assert len(submitted) == 5
+    key, message = submitted[1]
+    assert message["attachment_path"] == ['אילת.xlsx', 'ירושלים.xlsx']
+    assert message["body"]() == "Report for אילת\n\nReport for ירושלים"
+    assert statuses['אילת']["sent"] is True
+    assert sorted(statuses['אילת']["recipients"]) == ['boss@budget.co.il', 'eilat@budget.co.il']
+
+
+def test_dispatcher_zips_several_reports(tmp_path):
+    for group in ('נתניה', 'אייל'):
+        (tmp_path / f"{group}.xlsx").write_bytes(group.encode())
+    sender, submitted = _stopped_sender()
+    dispatcher = ReportDispatcher(sender, {'נתניה': 'n@x.com', 'אייל': 'n@x.com'}, str, "Weekly",
+                                  zip_dir=str(tmp_path / "outbox"))
+
+    for group in ('נתניה', 'אייל'):
+        dispatcher.report_ready(group, str(tmp_path / f"{group}.xlsx"))
+
+    attachment = submitted[0][1]["attachment_path"]
+    assert os.path.basename(attachment) == zip_name(submitted[0][0])
+    assert len(zip_name(" + ".join(["קבוצה לוגיסטית ארוכה"] * 50))) < 64
+    with zipfile.ZipFile(attachment) as archive:
+        assert sorted(archive.namelist()) == ['אייל.xlsx', 'נתניה.xlsx']
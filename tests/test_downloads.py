@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+from unittest.mock import patch
+from selenium.common import TimeoutException
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from downloads import DownloadWatcher, PollingBackend, is_completed_download
+
+
+def _finish_download_later(directory, name, delay=0.05):
+    """
+    Mimics Chrome: writes a .crdownload partial, then renames it to the final name.
+    """
+    def run():
+        time.sleep(delay)
+        partial_path = os.path.join(directory, name + ".crdownload")
+        with open(partial_path, "wb") as partial:
+            partial.write(b"fake xlsx data")
+        os.rename(partial_path, os.path.join(directory, name))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+@pytest.mark.parametrize("file_name, expected", [
+    ("report.xlsx", True),
+    ("REPORT.XLSX", True),
+    ("report.xlsx.crdownload", False),
+    ("~$report.xlsx", False),
+    ("report.pdf", False),
+])
+def test_is_completed_download(file_name, expected):
+    assert is_completed_download(file_name) is expected
+
+
+def test_download_watcher_detects_renamed_file(tmp_path):
+    """
+    The watcher ignores the partial file and returns the finalized xlsx.
+    """
+    (tmp_path / "old report.xlsx").write_bytes(b"old")
+
+    with DownloadWatcher(str(tmp_path)) as watcher:
+        thread = _finish_download_later(str(tmp_path), "new report.xlsx")
+        path, name = watcher.wait_for_file(timeout=5)
+        thread.join()
+
+    assert name == "new report.xlsx"
+    assert path == os.path.join(str(tmp_path), "new report.xlsx")
+
+
+def test_download_watcher_polling_fallback(tmp_path):
+    """
+    The polling backend is used when inotify is unavailable and still finds only the new file.
+    """
+    (tmp_path / "old report.xlsx").write_bytes(b"old")
+
+    with patch("downloads.InotifyBackend", side_effect=OSError("no inotify")):
+        with DownloadWatcher(str(tmp_path)) as watcher:
+            assert isinstance(watcher._backend, PollingBackend)
+            thread = _finish_download_later(str(tmp_path), "new report.xlsx")
+            path, name = watcher.wait_for_file(timeout=5)
+            thread.join()
+
+    assert name == "new report.xlsx"
+
+
+def test_download_watcher_timeout(tmp_path):
+    with DownloadWatcher(str(tmp_path)) as watcher:
+        with pytest.raises(TimeoutException):
+            watcher.wait_for_file(timeout=0.2)
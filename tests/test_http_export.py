@@ -0,0 +1,121 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from http_export import HttpExportEngine, ExportError, SessionExpired
+
+FAKE_XLSX = b"PK\x03\x04fake xlsx body"
+
+
+class _StubExportHandler(BaseHTTPRequestHandler):
+    """
+    Stands in for the portal's export endpoint: requires the session cookie and returns xlsx bytes.
+    """
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        payload = json.loads(self.rfile.read(length))
+        self.server.requests.append((self.headers.get("Cookie"), payload))
+
+        if "session=expired" in (self.headers.get("Cookie") or ""):
+            self.send_response(302)
+            self.send_header("Location", "/Login")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if "session=abc" not in (self.headers.get("Cookie") or ""):
+            self.send_response(401)
+            self.end_headers()
+            return
+
+        body = FAKE_XLSX if payload["logisticGroup"] != "HTML" else b"<html>login</html>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        body = b"<html>login</html>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def export_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubExportHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    server.url = f"http://{host}:{port}/api/reports/export"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_report_uses_session_cookies(export_stub):
+    engine = HttpExportEngine([{"name": "session", "value": "abc"}], export_url=export_stub.url)
+
+    data = engine.fetch_report("אילת", "1/9/2023")
+
+    assert data == FAKE_XLSX
+    cookie, payload = export_stub.requests[0]
+    assert payload["logisticGroup"] == "אילת"
+    assert payload["endDate"] == "1/9/2023"
+
+
+def test_fetch_report_rejects_non_xlsx(export_stub):
+    engine = HttpExportEngine([{"name": "session", "value": "abc"}], export_url=export_stub.url)
+    with pytest.raises(ExportError):
+        engine.fetch_report("HTML", "1/9/2023")
+
+
+def test_fetch_report_unauthenticated(export_stub):
+    engine = HttpExportEngine([], export_url=export_stub.url)
+    with pytest.raises(ExportError):
+        engine.fetch_report("אילת", "1/9/2023")
+
+
+def test_save_report_and_from_driver(export_stub, tmp_path):
+    driver = MagicMock()
+    driver.get_cookies.return_value = [{"name": "session", "value": "abc"}]
+    engine = HttpExportEngine.from_driver(driver, export_url=export_stub.url)
+
+    path = engine.save_report("ירושלים", "1/9/2023", download_dir=str(tmp_path))
+
+    assert path == os.path.join(str(tmp_path), "ירושלים 1-9-2023.xlsx")
+    with open(path, "rb") as f:
+        assert f.read() == FAKE_XLSX
+
+
+@pytest.mark.parametrize("stale_session", ["old", "expired"])
+def test_fetch_report_refreshes_rotated_cookies(export_stub, stale_session):
+    """
+    On HTTP 401 or a redirect to the login page, the driver's current cookies are copied and the export retried.
+    """
+    driver = MagicMock()
+    driver.get_cookies.side_effect = [[{"name": "session", "value": stale_session}],
+                                      [{"name": "session", "value": "abc"}]]
+    engine = HttpExportEngine.from_driver(driver, export_url=export_stub.url)
+
+    assert engine.fetch_report("אילת", "1/9/2023") == FAKE_XLSX
+    assert [cookie for cookie, _ in export_stub.requests] == [f"session={stale_session}", "session=abc"]
+
+
+def test_fetch_report_without_driver_does_not_retry(export_stub):
+    engine = HttpExportEngine([{"name": "session", "value": "expired"}], export_url=export_stub.url)
+    with pytest.raises(SessionExpired):
+        engine.fetch_report("אילת", "1/9/2023")
+    assert len(export_stub.requests) == 1
@@ -0,0 +1,178 @@
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from selenium.common import WebDriverException
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from job_queue import Account, JobQueue, TokenBucket, load_job_config, run_job_queue
+
+YAML_CONFIG = """
+accounts:
+  - name: budget
+    business_partner_number: 12345
+    user_id: "0123456789"
+    password_env: TEST_BUDGET_PASSWORD
+    max_sessions: 1
+    groups:
+      אילת: eilat@budget.co.il;anabely@budget.co.il
+      נתניה: natanya@budget.co.il
+  - name: north
+    business_partner_number: "999"
+    user_id: "111"
+    password: secret
+    groups:
+      חיפה: haifa@budget.co.il
+"""
+
+CSV_CONFIG = """account,business_partner_number,user_id,password,max_sessions,logistic_group,recipients
+budget,12345,0123456789,pw,1,אילת,eilat@budget.co.il
+budget,12345,0123456789,pw,1,נתניה,natanya@budget.co.il
+north,999,111,secret,,חיפה,haifa@budget.co.il
+"""
+
+
+def test_load_yaml_job_config(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEST_BUDGET_PASSWORD", "from-env")
+    path = tmp_path / "jobs.yaml"
+    path.write_text(YAML_CONFIG, encoding="utf-8")
+
+    job_config = load_job_config(str(path))
+
+    assert job_config.accounts["budget"].credentials == ("12345", "0123456789", "from-env")
+    assert job_config.accounts["budget"].max_sessions == 1
+    assert job_config.group_recipients["אילת"] == "eilat@budget.co.il;anabely@budget.co.il"
+    assert job_config.jobs() == [("budget", "אילת"), ("budget", "נתניה"), ("north", "חיפה")]
+    assert job_config.jobs(["חיפה"]) == [("north", "חיפה")]
+
+
+def test_load_csv_job_config(tmp_path):
+    path = tmp_path / "jobs.csv"
+    path.write_text(CSV_CONFIG, encoding="utf-8-sig")
+
+    job_config = load_job_config(str(path))
+
+    assert set(job_config.accounts) == {"budget", "north"}
+    assert job_config.accounts["north"].credentials == ("999", "111", "secret")
+    assert job_config.group_accounts == {"אילת": "budget", "נתניה": "budget", "חיפה": "north"}
+
+
+def test_load_job_config_rejects_invalid_files(tmp_path):
+    duplicate = tmp_path / "jobs.csv"
+    duplicate.write_text(CSV_CONFIG + "north,999,111,secret,,אילת,x@budget.co.il\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="under account 'budget' too"):
+        load_job_config(str(duplicate))
+
+    mismatched = tmp_path / "mismatched.csv"
+    mismatched.write_text(CSV_CONFIG + "budget,12345,0123456789,other,1,חדרה,h@budget.co.il\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=r"mismatched.csv:5: account 'budget' is configured again"):
+        load_job_config(str(mismatched))
+
+    no_password = tmp_path / "nopw.yaml"
+    no_password.write_text("accounts:\n  - business_partner_number: 1\n    user_id: 2\n    groups: {A: a@b}\n")
+    with pytest.raises(ValueError, match="no password"):
+        load_job_config(str(no_password))
+
+    with pytest.raises(ValueError, match="Unsupported"):
+        load_job_config(str(tmp_path / "jobs.json"))
+
+
+@patch("job_queue.SESSION_FILE", "session.json")
+def test_account_session_file():
+    assert Account("north", "1", "2", "3").session_file() == "session-north.json"
+
+
+def test_job_queue_respects_account_session_limit():
+    accounts = {"a": Account("a", "1", "1", "x", max_sessions=1), "b": Account("b", "2", "2", "x", max_sessions=2)}
+    job_queue = JobQueue([("a", "A1"), ("a", "A2"), ("b", "B1")], accounts)
+
+    first = job_queue.take()
+    second = job_queue.take()
+    assert {first[0], second[0]} == {"a", "b"}
+
+    # Account a is at its limit and b has nothing left: a third worker waits until a worker leaves b
+    taken = []
+    waiting = threading.Thread(target=lambda: taken.append(job_queue.take()))
+    waiting.start()
+    time.sleep(0.1)
+    assert taken == []
+
+    # The worker on a keeps its account; the worker on b finds no work and frees its slot
+    assert job_queue.take("a") == ("a", "A2")
+    assert job_queue.take("b") is None
+    assert job_queue.take("a") is None
+    waiting.join(timeout=2)
+    assert taken == [None]
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate_per_minute=1200)  # one token per 50 ms
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.14
+
+    unlimited = TokenBucket(rate_per_minute=0)
+    start = time.monotonic()
+    for _ in range(100):
+        unlimited.acquire()
+    assert time.monotonic() - start < 0.1
+
+
+@patch("job_queue.ensure_signed_in")
+@patch("job_queue.initialize_webdriver_and_navigate")
+@patch("job_queue.get_group_report")
+def test_run_job_queue_signs_in_per_account(mock_group_report, mock_init, mock_sign_in, tmp_path):
+    path = tmp_path / "jobs.csv"
+    path.write_text(CSV_CONFIG, encoding="utf-8")
+    job_config = load_job_config(str(path))
+    mock_init.side_effect = lambda url, download_dir=None, profile_name=None: MagicMock()
+    mock_group_report.side_effect = lambda driver, logistic_group, download_dir=None: f"{logistic_group}.xlsx"
+
+    def sign_in(driver, credentials, session_file):
+        if credentials[0] == "999":
+            raise RuntimeError("wrong password")
+
+    mock_sign_in.side_effect = sign_in
+    ready = []
+
+    results, failures = run_job_queue(job_config, pool_size=3, rate_per_minute=0, url="http://localhost",
+                                      on_result=lambda group, report: ready.append(group))
+
+    assert results == {"אילת": "אילת.xlsx", "נתניה": "נתניה.xlsx"}
+    assert set(failures) == {"חיפה"}
+    assert sorted(ready) == sorted(results)
+    # budget allows one session, so both of its groups were retrieved on the same driver
+    budget_logins = [call for call in mock_sign_in.call_args_list if call.args[1][0] == "12345"]
+    assert len(budget_logins) == 1
+
+
+@patch("job_queue.ensure_signed_in")
+@patch("job_queue.initialize_webdriver_and_navigate")
+@patch("job_queue.get_group_report")
+def test_queue_worker_replaces_its_driver_after_a_webdriver_error(mock_group_report, mock_init, mock_sign_in,
+                                                                   tmp_path):
+    path = tmp_path / "jobs.csv"
+    path.write_text(CSV_CONFIG, encoding="utf-8")
+    job_config = load_job_config(str(path))
+    drivers = []
+    mock_init.side_effect = lambda url, download_dir=None, profile_name=None: drivers.append(MagicMock()) or drivers[-1]
+
+    def group_report(driver, logistic_group, download_dir=None):
+        if driver is drivers[0]:
+            raise WebDriverException("invalid session id")
+        return f"{logistic_group}.xlsx"
+
+    mock_group_report.side_effect = group_report
+
+    results, failures = run_job_queue(job_config, ["אילת", "נתניה"], pool_size=1, rate_per_minute=0,
+                                      url="http://localhost")
+
+    assert set(failures) == {"אילת"}
+    assert results == {"נתניה": "נתניה.xlsx"}
+    drivers[0].quit.assert_called_once()
+    assert mock_sign_in.call_count == 2
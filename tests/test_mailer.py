@@ -1,10 +1,15 @@
+import email
 import os
 import sys
+
+import pytest
 from unittest.mock import MagicMock, patch, mock_open
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "bench")))
 
-from mailer import send_email
+from mailer import send_email, MailerSession, BackgroundSender
+from smtp_sink import start_smtp_sink
 
 @patch("mailer.os.path.basename")
 @patch("mailer.open")
@@ -44,3 +49,133 @@ def test_send_email_smtp_fail(mock_smtp):
     with patch.object(logger, "exception") as mock_logger_ex:
         send_email("test", "body", "/path/report.xlsx", "someone@domain.com")
         mock_logger_ex.assert_called_once()
+
+
+@pytest.fixture
+def smtp_stub():
+    server = start_smtp_sink(keep_messages=True)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _write_reports(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"report{i}.xlsx"
+        path.write_bytes(b"fake xlsx %d" % i)
+        paths.append(str(path))
+    return paths
+
+
+def test_mailer_session_reuses_one_connection(smtp_stub, tmp_path):
+    """
+    All queued messages go over a single SMTP connection.
+    """
+    host, port = smtp_stub.server_address
+    with MailerSession(smtp_server=f"{host}:{port}") as session:
+        for path in _write_reports(tmp_path, 3):
+            session.add("Subject", "Body", path, "one@domain.com;two@domain.com")
+        statuses = session.send_all()
+
+    assert [status["sent"] for status in statuses] == [True, True, True]
+    assert len(smtp_stub.messages) == 3
+    assert smtp_stub.connections == 1
+
+
+def test_mailer_session_reconnects_once(smtp_stub, tmp_path):
+    """
+    If the server drops the connection, the session reconnects and keeps sending.
+    """
+    smtp_stub.drop_after_messages = 1
+    host, port = smtp_stub.server_address
+    with MailerSession(smtp_server=f"{host}:{port}") as session:
+        for path in _write_reports(tmp_path, 2):
+            session.add("Subject", "Body", path, "one@domain.com")
+        statuses = session.send_all()
+
+    assert [status["sent"] for status in statuses] == [True, True]
+    assert len(smtp_stub.messages) == 2
+    assert smtp_stub.connections == 2
+
+
+def test_mailer_session_reports_attachment_failures(smtp_stub, tmp_path):
+    host, port = smtp_stub.server_address
+    with MailerSession(smtp_server=f"{host}:{port}") as session:
+        session.add("Subject", "Body", str(tmp_path / "missing.xlsx"), "one@domain.com")
+        session.add("Subject", "Body", _write_reports(tmp_path, 1)[0], "one@domain.com")
+        statuses = session.send_all()
+
+    assert statuses[0]["sent"] is False
+    assert "attachment" in statuses[0]["error"]
+    assert statuses[1]["sent"] is True
+
+
+def test_mailer_session_streams_large_attachment(smtp_stub, tmp_path):
+    """
+    Attachments above the streaming threshold are sent chunk by chunk and arrive intact.
+    """
+    payload = os.urandom(3 * 57 * 1024 + 11)
+    path = tmp_path / "דוח גדול.xlsx"
+    path.write_bytes(payload)
+
+    host, port = smtp_stub.server_address
+    with patch("mailer.smtplib.SMTP.sendmail") as mock_sendmail:
+        with MailerSession(smtp_server=f"{host}:{port}", streaming_threshold=1024) as session:
+            session.add("Subject", ".line starting with a dot\n.another", str(path), "one@domain.com")
+            statuses = session.send_all()
+        mock_sendmail.assert_not_called()
+
+    assert statuses[0]["sent"] is True
+    received = email.message_from_bytes(smtp_stub.messages[0].replace(b"\r\n..", b"\r\n.").replace(b"\r\n", b"\n"))
+    body_part, attachment_part = received.get_payload()
+    assert body_part.get_payload() == ".line starting with a dot\n.another"
+    assert attachment_part.get_payload(decode=True) == payload
+
+
+@pytest.mark.parametrize("threshold", [1024 * 1024, 100])
+def test_mailer_session_sends_several_attachments(smtp_stub, tmp_path, threshold):
+    """
+    A list of paths becomes one message with every attachment, whether or not it is streamed.
+    """
+    paths = _write_reports(tmp_path, 2)
+    zip_path = tmp_path / "reports.zip"
+    zip_path.write_bytes(os.urandom(300))
+    paths.append(str(zip_path))
+
+    host, port = smtp_stub.server_address
+    with MailerSession(smtp_server=f"{host}:{port}", streaming_threshold=threshold) as session:
+        session.add("Subject", "Body", paths, "one@domain.com")
+        statuses = session.send_all()
+
+    assert statuses[0]["sent"] is True
+    received = email.message_from_bytes(smtp_stub.messages[0].replace(b"\r\n..", b"\r\n.").replace(b"\r\n", b"\n"))
+    body_part, *attachment_parts = received.get_payload()
+    assert body_part.get_payload() == "Body"
+    assert [part.get_payload(decode=True) for part in attachment_parts] == [
+        open(path, "rb").read() for path in paths
+    ]
+    assert attachment_parts[2].get_content_type() == "application/zip"
+
+
+def test_background_sender_delivers_and_summarizes(smtp_stub, tmp_path):
+    """
+    Emails submitted to the background sender are delivered over one connection,
+    and stop() returns a status per key after the queue drains.
+    """
+    host, port = smtp_stub.server_address
+    paths = _write_reports(tmp_path, 2)
+
+    sender = BackgroundSender(MailerSession(smtp_server=f"{host}:{port}"))
+    sender.start()
+    sender.submit("group A", "Subject", "Body", paths[0], "a@domain.com")
+    sender.submit("group B", "Subject", "Body", str(tmp_path / "missing.xlsx"), "b@domain.com")
+    sender.submit("group C", "Subject", lambda: "Built later", paths[1], "c@domain.com")
+    summary = sender.stop()
+
+    assert summary["group A"]["sent"] is True
+    assert summary["group B"]["sent"] is False
+    assert summary["group C"]["sent"] is True
+    assert len(smtp_stub.messages) == 2
+    assert b"Built later" in smtp_stub.messages[1]
+    assert smtp_stub.connections == 1
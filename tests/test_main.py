@@ -0,0 +1,44 @@
+import os
+import sys
+
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from main import plan_run
+from run_journal import RunJournal, GENERATED, EMAILED
+
+GROUPS = {
+    'אילת': 'eilat@budget.co.il',
+    'נתניה': 'natanya@budget.co.il',
+    'אייל': 'ashdod@budget.co.il',
+}
+
+
+@patch("main.LOGISTIC_GROUPS", GROUPS)
+@patch("main.BATCH_BY_RECIPIENT", False)
+@patch("main.build_report_body", side_effect=lambda group, anomalies=None: group)
+@patch("main.split_cached_reports", side_effect=lambda groups: ({}, list(groups)))
+@patch("main.BackgroundSender")
+def test_resume_only_processes_pending_groups(mock_sender_class, mock_split, mock_body, tmp_path):
+    report = tmp_path / "natanya.xlsx"
+    report.write_bytes(b"report")
+    journal = RunJournal("1/9/2023", str(tmp_path / "journal.jsonl"))
+    journal.record('אילת', GENERATED, path=str(report))
+    journal.record('אילת', EMAILED, recipients=['eilat@budget.co.il'])
+    journal.record('נתניה', GENERATED, path=str(report))
+
+    sender, dispatcher, on_result, pending = plan_run(journal, resume=True)
+
+    # נתניה's report is reused from the journal, only אייל has to be generated
+    assert pending == ['אייל']
+    assert [call.args[0] for call in sender.submit.call_args_list] == ['נתניה']
+
+    on_result('אייל', str(report))
+    assert [call.args[0] for call in sender.submit.call_args_list] == ['נתניה', 'אייל']
+    assert journal.events()[-1]["event"] == GENERATED
+
+    # Delivery outcomes reported by the sender thread end up in the journal
+    on_status = mock_sender_class.call_args.kwargs["on_status"]
+    on_status('אייל', {"sent": True, "recipients": ['ashdod@budget.co.il'], "error": None})
+    assert journal.remaining_recipients(GROUPS) == {'נתניה': 'natanya@budget.co.il'}
@@ -0,0 +1,93 @@
+import os
+import sys
+
+import pytest
+from unittest.mock import MagicMock, patch
+from selenium.common import StaleElementReferenceException
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pages import BasePage, LoginPage, ReportsPage, lookup_counts, reset_lookup_counts
+from retry import RetryPolicy
+
+
+@pytest.fixture(autouse=True)
+def fresh_counts():
+    reset_lookup_counts()
+
+
+@patch("pages.WebDriverWait")
+def test_click_reuses_cached_element(mock_wait):
+    element = MagicMock()
+    mock_wait.return_value.until.return_value = element
+    page = BasePage(MagicMock())
+
+    page.click("#show")
+    page.click("#show")
+
+    assert element.click.call_count == 2
+    mock_wait.return_value.until.assert_called_once()
+    assert lookup_counts() == {"lookups": 1, "cache_hits": 1, "stale": 0}
+
+
+@patch("pages.WebDriverWait")
+def test_stale_element_is_located_again(mock_wait):
+    stale, fresh = MagicMock(), MagicMock()
+    stale.click.side_effect = [None, StaleElementReferenceException("detached")]
+    mock_wait.return_value.until.side_effect = [stale, fresh]
+    page = BasePage(MagicMock())
+
+    page.click("#show")
+    page.click("#show")
+    page.click("#show")
+
+    assert fresh.click.call_count == 2
+    assert lookup_counts() == {"lookups": 2, "cache_hits": 2, "stale": 1}
+
+
+@patch("pages.WebDriverWait")
+def test_failed_action_drops_cached_element(mock_wait):
+    """
+    An error other than staleness is left to the retry policy, which then waits for the element from scratch.
+    """
+    cached, fresh = MagicMock(), MagicMock()
+    cached.click.side_effect = [None, Exception("click intercepted")]
+    mock_wait.return_value.until.side_effect = [cached, fresh]
+    page = BasePage(MagicMock(), RetryPolicy(base_delay=0, max_delay=0))
+
+    page.click("#show")
+    page.click("#show")
+
+    fresh.click.assert_called_once()
+    assert lookup_counts()["lookups"] == 2
+
+
+@patch("pages.wait_for_loading_to_disappear")
+@patch("pages.WebDriverWait")
+def test_login_page_sign_in(mock_wait, mock_loading):
+    field = MagicMock()
+    mock_wait.return_value.until.return_value = field
+
+    LoginPage(MagicMock()).sign_in("123", "456", "secret")
+
+    assert [c.args[0] for c in field.send_keys.call_args_list] == ["123", "456", "secret"]
+    field.click.assert_called_once()
+
+
+@patch("pages.WebDriverWait")
+def test_dropdown_options_are_not_cached(mock_wait):
+    mock_wait.return_value.until.return_value = MagicMock()
+    page = ReportsPage(MagicMock())
+
+    page.select_logistic_group("A")
+    page.select_logistic_group("A")
+
+    # The group select is cached; the option is looked up every time
+    assert lookup_counts() == {"lookups": 3, "cache_hits": 1, "stale": 0}
+
+
+def test_for_driver_returns_one_page_per_driver():
+    driver = MagicMock()
+    assert ReportsPage.for_driver(driver) is ReportsPage.for_driver(driver)
+    assert ReportsPage.for_driver(driver) is not ReportsPage.for_driver(MagicMock())
+    assert isinstance(LoginPage.for_driver(driver), LoginPage)
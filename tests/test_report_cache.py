@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import report_cache
+from report_cache import cache_key, get_cached_report, store_report, evict_expired, set_force_refresh
+
+COLUMNS = ["מספר רכב", "תאריך"]
+
+
+@pytest.fixture(autouse=True)
+def cache_in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("report_cache.REPORT_CACHE_TTL_DAYS", 7)
+    set_force_refresh(False)
+    yield tmp_path
+    set_force_refresh(False)
+
+
+def _downloaded_report(tmp_path, name="download.xlsx"):
+    path = tmp_path / name
+    path.write_bytes(b"PK fake report")
+    return str(path)
+
+
+def test_cache_key_ignores_column_order():
+    assert cache_key("אילת", "1/9/2023", ["a", "b"]) == cache_key("אילת", "1/9/2023", ["b", "a"])
+    assert cache_key("אילת", "1/9/2023", ["a"]) != cache_key("אילת", "8/9/2023", ["a"])
+    assert cache_key("אילת", "1/9/2023", ["a"]) != cache_key("אילת", "1/9/2023", ["a", "b"])
+
+
+def test_store_then_hit(cache_in_tmp):
+    assert get_cached_report("אילת", "1/9/2023", COLUMNS) is None
+
+    cached_path = store_report("אילת", "1/9/2023", COLUMNS, _downloaded_report(cache_in_tmp))
+
+    assert get_cached_report("אילת", "1/9/2023", COLUMNS) == cached_path
+    with open(cached_path, "rb") as f:
+        assert f.read() == b"PK fake report"
+    assert get_cached_report("אילת", "1/9/2023", ["מספר רכב"]) is None
+
+
+def test_force_refresh_bypasses_cache(cache_in_tmp):
+    store_report("אילת", "1/9/2023", COLUMNS, _downloaded_report(cache_in_tmp))
+
+    set_force_refresh(True)
+    assert get_cached_report("אילת", "1/9/2023", COLUMNS) is None
+
+
+def test_expired_entries_miss_and_are_evicted(cache_in_tmp):
+    cached_path = store_report("אילת", "1/9/2023", COLUMNS, _downloaded_report(cache_in_tmp))
+    metadata_path = os.path.join(report_cache.cache_dir(), cache_key("אילת", "1/9/2023", COLUMNS) + ".json")
+    with open(metadata_path, encoding="utf-8") as f:
+        metadata = json.load(f)
+    metadata["created_at"] = time.time() - 8 * 24 * 3600
+    with open(metadata_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+
+    assert get_cached_report("אילת", "1/9/2023", COLUMNS) is None
+    assert evict_expired() == 1
+    assert not os.path.exists(cached_path)
+    assert not os.path.exists(metadata_path)
+
+
+@patch("reports.get_previous_friday", return_value="1/9/2023")
+@patch("reports.prepare_report_form")
+@patch("reports.export_group_report")
+def test_get_information_reports_uses_cache(mock_export, mock_prepare, mock_friday, cache_in_tmp):
+    """
+    The first call downloads and stores the report; the second returns the cached file without the browser.
+    """
+    from reports import get_information_reports, REPORT_COLUMNS
+    mock_export.return_value = _downloaded_report(cache_in_tmp)
+    driver = MagicMock()
+
+    get_information_reports(driver, "אילת")
+    cached_path = get_information_reports(driver, "אילת")
+
+    mock_export.assert_called_once()
+    assert cached_path == get_cached_report("אילת", "1/9/2023", REPORT_COLUMNS)
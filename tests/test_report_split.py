@@ -0,0 +1,68 @@
+import os
+import sys
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from report_split import header_labels, split_report
+
+HEADER = ['מספר רכב', 'כמות ליטר', 'קבוצה לוגיסטית']
+
+
+def _all_groups_report(path, rows, header=HEADER):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["דוח תדלוקים מפורט"])
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+def _rows(path):
+    workbook = load_workbook(path, read_only=True)
+    rows = [list(values) for values in workbook.active.iter_rows(values_only=True)]
+    workbook.close()
+    return rows
+
+
+def test_split_report_by_group(tmp_path):
+    report = _all_groups_report(tmp_path / "all.xlsx", [
+        ["11-111-11", 40, "אילת"],
+        ["22-222-22", 35, "נתניה"],
+        ["33-333-33", 50, "אילת"],
+        ["44-444-44", 20, "חיפה"],
+    ])
+
+    paths = split_report(report, ["אילת", "נתניה", "אייל"], str(tmp_path / "split"), file_suffix=" 1-9-2023")
+
+    assert paths["אילת"] == str(tmp_path / "split" / "אילת 1-9-2023.xlsx")
+    assert _rows(paths["אילת"]) == [
+        ["דוח תדלוקים מפורט"], ['מספר רכב', 'כמות ליטר'], ["11-111-11", 40], ["33-333-33", 50]
+    ]
+    assert _rows(paths["נתניה"])[2:] == [["22-222-22", 35]]
+    # A group without fills still gets a report with the header
+    assert _rows(paths["אייל"]) == [["דוח תדלוקים מפורט"], ['מספר רכב', 'כמות ליטר']]
+
+
+def test_split_report_can_keep_group_column(tmp_path):
+    report = _all_groups_report(tmp_path / "all.xlsx", [["11-111-11", 40, "אילת"]])
+
+    paths = split_report(report, ["אילת"], str(tmp_path), keep_group_column=True)
+
+    assert _rows(paths["אילת"])[1:] == [HEADER, ["11-111-11", 40, "אילת"]]
+
+
+def test_split_report_needs_group_column(tmp_path):
+    report = _all_groups_report(tmp_path / "all.xlsx", [["11-111-11", 40]], header=HEADER[:2])
+
+    with pytest.raises(ValueError):
+        split_report(report, ["אילת"], str(tmp_path))
+
+
+def test_header_labels():
+    assert header_labels(("דוח תדלוקים", None)) is None
+    assert header_labels((" מספר רכב ", None, "כמות ליטר")) == ["מספר רכב", "", "כמות ליטר"]
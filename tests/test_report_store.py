@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+import pytest
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from report_store import ingest_report, ingest_archive, load_columns, record_report
+
+HEADER = ['מספר רכב', 'מוצר', 'כמות ליטר', 'סכום ברוטו ש"ח', 'תאריך']
+ROWS = [
+    ["12-345-67", "סולר", 40, 284.0, "1/9/2023"],
+    ["12-345-67", "סולר", 40, 284.0, "1/9/2023"],
+    ["98-765-43", "בנזין 95", "35.5", 250.1, datetime(2023, 8, 31)],
+]
+
+
+def _write_report(path, rows, header=HEADER, title_rows=1):
+    workbook = Workbook()
+    sheet = workbook.active
+    for _ in range(title_rows):
+        sheet.append(["דוח מידע"])
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / "store.sqlite")
+
+
+def test_ingest_report_normalizes_rows(tmp_path, store):
+    report = _write_report(tmp_path / "eilat.xlsx", ROWS)
+
+    assert ingest_report(report, "אילת", store) == 3
+
+    columns = load_columns(store)
+    assert sorted(columns["fuel_date"]) == ["2023-08-31", "2023-09-01", "2023-09-01"]
+    assert sorted(columns["liters"]) == [35.5, 40.0, 40.0]
+    assert set(columns["logistic_group"]) == {"אילת"}
+
+
+def test_reingesting_is_incremental(tmp_path, store):
+    report = _write_report(tmp_path / "week1.xlsx", ROWS[:2])
+    assert ingest_report(report, "אילת", store) == 2
+    assert ingest_report(report, "אילת", store) == 0
+
+    # An overlapping report only adds the rows that are new
+    overlapping = _write_report(tmp_path / "week1-again.xlsx", ROWS, title_rows=2)
+    assert ingest_report(overlapping, "אילת", store) == 1
+    assert len(load_columns(store)["vehicle"]) == 3
+
+
+def test_group_column_in_report_wins(tmp_path, store):
+    report = _write_report(
+        tmp_path / "all.xlsx",
+        [row + [group] for row, group in zip(ROWS, ["אילת", "אילת", "נתניה"])],
+        header=HEADER + ['קבוצה לוגיסטית'],
+    )
+
+    ingest_report(report, None, store)
+
+    assert len(load_columns(store, ["נתניה"])["vehicle"]) == 1
+
+
+def test_ingest_archive_uses_cache_metadata(tmp_path, store):
+    cache = tmp_path / "reports" / "cache"
+    cache.mkdir(parents=True)
+    _write_report(cache / "eilat.xlsx", ROWS)
+    (cache / "key.json").write_text(json.dumps({"file": "eilat.xlsx", "logistic_group": "אילת"}), encoding="utf-8")
+    (tmp_path / "reports" / "broken.xlsx").write_bytes(b"not a workbook")
+
+    assert ingest_archive(str(tmp_path / "reports"), store) == (1, 3)
+    assert set(load_columns(store)["logistic_group"]) == {"אילת"}
+
+
+def test_ingest_archive_prefers_the_cached_copy_of_a_download(tmp_path, store):
+    """
+    A raw download sorts before the cache folder, but its cached copy (with the group) is ingested first.
+    """
+    reports = tmp_path / "reports"
+    cache = reports / "cache"
+    cache.mkdir(parents=True)
+    _write_report(reports / "report-1.xlsx", ROWS)
+    shutil.copyfile(reports / "report-1.xlsx", cache / "אילת 1-9-2023 abcd1234.xlsx")
+    (cache / "abcd1234.json").write_text(
+        json.dumps({"file": "אילת 1-9-2023 abcd1234.xlsx", "logistic_group": "אילת"}), encoding="utf-8"
+    )
+
+    ingest_archive(str(reports), store)
+
+    assert set(load_columns(store)["logistic_group"]) == {"אילת"}
+
+
+def test_record_report_never_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr("report_store.REPORT_STORE", str(tmp_path / "store.sqlite"))
+    broken = tmp_path / "broken.xlsx"
+    broken.write_bytes(b"not a workbook")
+
+    assert record_report(str(broken), "אילת") == 0
+
+    monkeypatch.setattr("report_store.REPORT_STORE", "")
+    assert record_report(_write_report(tmp_path / "ok.xlsx", ROWS), "אילת") == 0
@@ -1,15 +1,28 @@
 import os
 import sys
+
+import pytest
 from unittest.mock import MagicMock, patch
+from selenium.common import TimeoutException
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from constants import GROUP_COLUMN_LABEL
 from reports import (
     get_previous_friday,
     select_options
 )
 
 
+@pytest.fixture(autouse=True)
+def no_report_cache(monkeypatch):
+    """
+    Keeps the report cache and store out of these tests (they have their own tests).
+    """
+    monkeypatch.setattr("report_cache.REPORT_CACHE_TTL_DAYS", 0)
+    monkeypatch.setattr("report_store.REPORT_STORE", "")
+
+
 @patch("reports.datetime")
 def test_get_previous_friday(mock_datetime):
     """
@@ -29,27 +42,32 @@ def test_get_previous_friday(mock_datetime):
 @patch("reports.WebDriverWait")
 def test_select_options(mock_wait):
     """
-    Test that select_options tries to select or deselect checkboxes based on label.
+    Test that select_options applies the column set in one script call and returns the diff.
     """
     driver = MagicMock()
-    # Simulate existing checkboxes
-    mock_checkbox_1 = MagicMock()
-    mock_checkbox_2 = MagicMock()
-    # Labels
-    mock_checkbox_1.find_element.return_value.text = "מספר רכב"
-    mock_checkbox_1.get_attribute.return_value = 'false'
-    mock_checkbox_2.find_element.return_value.text = "SomeOtherOption"
-    mock_checkbox_2.get_attribute.return_value = 'true'
+    driver.execute_script.return_value = {
+        "changes": [{"label": "מספר רכב", "checked": True}, {"label": "SomeOtherOption", "checked": False}],
+        "labels": ["מספר רכב", "SomeOtherOption", "מוצר"],
+    }
 
-    mock_wait.return_value.until.return_value = [mock_checkbox_1, mock_checkbox_2]
+    diff = select_options(driver, columns=["מספר רכב", "מוצר", "תאריך"])
+
+    driver.execute_script.assert_called_once()
+    assert driver.execute_script.call_args.args[2] == ["מספר רכב", "מוצר", "תאריך"]
+    driver.find_element.assert_not_called()
+    assert diff == {"selected": ["מספר רכב"], "deselected": ["SomeOtherOption"], "missing": ["תאריך"]}
+
+
+@patch("reports.WebDriverWait")
+def test_select_options_uses_configured_columns(mock_wait):
+    from config import REPORT_COLUMNS
+    driver = MagicMock()
+    driver.execute_script.return_value = {"changes": [], "labels": list(REPORT_COLUMNS)}
 
-    select_options(driver)
-    # We expect 2 calls for each checkbox (one to get label, one to click).
-    assert mock_checkbox_1.find_element.call_count == 2
-    mock_checkbox_1.find_element.return_value.click.assert_called_once()
+    diff = select_options(driver)
 
-    assert mock_checkbox_2.find_element.call_count == 2
-    mock_checkbox_2.find_element.return_value.click.assert_called_once()
+    assert driver.execute_script.call_args.args[2] == REPORT_COLUMNS
+    assert diff == {"selected": [], "deselected": [], "missing": []}
 
 
 @patch("reports.os")
@@ -95,10 +113,11 @@ def test_get_latest_report(mock_get_latest):
     assert name == "file2.xlsx"
 
 
-@patch("reports.click_element")
-@patch("reports.fill_form_field")
+@patch("reports.DownloadWatcher")
+@patch("pages.BasePage.click")
+@patch("pages.BasePage.fill")
 @patch("reports.get_latest_report")
-def test_get_information_reports(mock_latest, mock_fill, mock_click):
+def test_get_information_reports(mock_latest, mock_fill, mock_click, mock_watcher):
     """
     Ensures we call the right sequence for retrieving an info report.
     """
@@ -112,3 +131,193 @@ def test_get_information_reports(mock_latest, mock_fill, mock_click):
     assert mock_click.call_count > 1  # multiple clicks
     assert mock_fill.call_count >= 1  # we fill in date
     assert path == "somepath/report.xlsx"
+    # The watcher is started before the download is triggered and passed to get_latest_report
+    watcher = mock_watcher.return_value.__enter__.return_value
+    mock_latest.assert_called_once_with(watcher=watcher)
+
+
+@patch("reports.EXPORT_API_URL", "http://localhost/export")
+@patch("reports.engine_for_driver")
+@patch("pages.BasePage.click")
+def test_get_information_reports_http_export(mock_click, mock_engine_for_driver):
+    """
+    With an export endpoint configured, the report is fetched over HTTP without touching the UI.
+    """
+    mock_engine_for_driver.return_value.save_report.return_value = "report list/group.xlsx"
+
+    from reports import get_information_reports
+    path = get_information_reports(MagicMock(), "SOME_LOGISTIC_GROUP")
+
+    assert path == "report list/group.xlsx"
+    mock_click.assert_not_called()
+
+
+@patch("reports.EXPORT_API_URL", "http://localhost/export")
+@patch("reports.engine_for_driver")
+@patch("reports.DownloadWatcher")
+@patch("pages.BasePage.click")
+@patch("pages.BasePage.fill")
+@patch("reports.get_latest_report")
+def test_get_information_reports_http_fallback(mock_latest, mock_fill, mock_click, mock_watcher,
+                                               mock_engine_for_driver):
+    """
+    If the HTTP export fails, the Selenium flow is used instead.
+    """
+    mock_engine_for_driver.return_value.save_report.side_effect = Exception("HTTP 500")
+    mock_latest.return_value = ("somepath/report.xlsx", "report.xlsx")
+
+    from reports import get_information_reports
+    path = get_information_reports(MagicMock(), "SOME_LOGISTIC_GROUP")
+
+    assert path == "somepath/report.xlsx"
+    assert mock_click.call_count > 1
+
+
+def test_get_report_form_state():
+    """
+    The form is 'ready' only with the right report type, date (ignoring zero padding) and a visible group select.
+    """
+    from reports import get_report_form_state, REPORT_TYPE_TEXT
+    driver = MagicMock()
+
+    driver.execute_script.return_value = {"dropdown": False}
+    assert get_report_form_state(driver, "1/9/2023") == "absent"
+
+    driver.execute_script.return_value = {"dropdown": True, "reportType": REPORT_TYPE_TEXT,
+                                          "dateValue": "01/09/2023", "groupSelect": True, "backdrop": False}
+    assert get_report_form_state(driver, "1/9/2023") == "ready"
+
+    driver.execute_script.return_value["dateValue"] = "25/8/2023"
+    assert get_report_form_state(driver, "1/9/2023") == "invalid"
+
+
+@patch("reports.DownloadWatcher")
+@patch("reports.ReportsPage")
+@patch("reports.select_options")
+@patch("reports.get_latest_report", return_value=("report list/a.xlsx", "a.xlsx"))
+@patch("reports.get_report_form_state")
+def test_export_group_report_checks_the_form_after_going_back(mock_state, mock_latest, mock_select, mock_page,
+                                                              mock_watcher):
+    """
+    The form is checked after navigating back from the export view; cached elements are dropped if it is gone.
+    """
+    from reports import export_group_report
+    driver = MagicMock()
+    page = mock_page.for_driver.return_value
+
+    mock_state.return_value = "ready"
+    assert export_group_report(driver, "A", end_date="1/9/2023") == "report list/a.xlsx"
+    assert driver.back.call_count == 2
+    mock_state.assert_called_once_with(driver, "1/9/2023")
+    page.forget.assert_not_called()
+
+    mock_state.return_value = "absent"
+    export_group_report(driver, "A", end_date="1/9/2023")
+    page.forget.assert_called_once_with()
+
+
+@patch("reports.export_group_report", return_value="report list/a.xlsx")
+@patch("reports.prepare_report_form")
+@patch("reports.get_report_form_state")
+def test_get_group_report_reuses_ready_form(mock_state, mock_prepare, mock_export):
+    from reports import get_group_report
+    driver = MagicMock()
+    mock_state.return_value = "ready"
+
+    assert get_group_report(driver, "A") == "report list/a.xlsx"
+    mock_prepare.assert_not_called()
+    driver.refresh.assert_not_called()
+
+
+@patch("reports.export_group_report", return_value="report list/a.xlsx")
+@patch("reports.prepare_report_form")
+@patch("reports.get_report_form_state")
+def test_get_group_report_resets_invalid_form(mock_state, mock_prepare, mock_export):
+    from reports import get_group_report
+    driver = MagicMock()
+    mock_state.return_value = "invalid"
+
+    get_group_report(driver, "A")
+    driver.refresh.assert_called_once()
+    mock_prepare.assert_called_once()
+
+
+@patch("reports.get_group_report")
+def test_get_reports_for_groups_isolates_failures(mock_group_report):
+    from reports import get_reports_for_groups
+
+    def group_report_side_effect(driver, logistic_group, download_dir=None):
+        if logistic_group == "B":
+            raise RuntimeError("boom")
+        return f"{logistic_group.lower()}.xlsx"
+
+    mock_group_report.side_effect = group_report_side_effect
+    ready = []
+
+    results, failures = get_reports_for_groups(MagicMock(), ["A", "B", "C"],
+                                               on_result=lambda group, path: ready.append(group))
+
+    assert results == {"A": "a.xlsx", "C": "c.xlsx"}
+    assert set(failures) == {"B"}
+    assert ready == ["A", "C"]
+
+
+@patch("reports.get_group_report", side_effect=lambda driver, logistic_group, download_dir=None: f"{logistic_group}.xlsx")
+def test_get_reports_for_groups_survives_a_failing_callback(mock_group_report):
+    """
+    A callback error is logged; the group keeps its report and the remaining groups are still retrieved.
+    """
+    from reports import get_reports_for_groups
+    ready = []
+
+    def on_result(logistic_group, path):
+        if logistic_group == "A":
+            raise RuntimeError("dispatcher failed")
+        ready.append(logistic_group)
+
+    results, failures = get_reports_for_groups(MagicMock(), ["A", "B", "C"], on_result=on_result)
+
+    assert results == {"A": "A.xlsx", "B": "B.xlsx", "C": "C.xlsx"}
+    assert failures == {}
+    assert ready == ["B", "C"]
+
+
+@patch("reports.split_report")
+@patch("reports.get_information_reports", return_value="report list/all.xlsx")
+def test_get_split_reports_downloads_once(mock_reports, mock_split):
+    from reports import get_split_reports
+    mock_split.return_value = {"A": "split/A.xlsx", "B": "split/B.xlsx"}
+    ready = []
+
+    results, failures = get_split_reports(MagicMock(), ["A", "B"],
+                                          on_result=lambda group, path: ready.append(group))
+
+    mock_reports.assert_called_once()
+    assert GROUP_COLUMN_LABEL in mock_reports.call_args.args[3]
+    assert results == {"A": "split/A.xlsx", "B": "split/B.xlsx"}
+    assert failures == {}
+    assert ready == ["A", "B"]
+
+
+@patch("reports.get_information_reports", side_effect=TimeoutException("no download"))
+def test_get_split_reports_fails_every_group(mock_reports):
+    from reports import get_split_reports
+
+    results, failures = get_split_reports(MagicMock(), ["A", "B"])
+
+    assert results == {}
+    assert set(failures) == {"A", "B"}
+
+
+@patch("reports.export_group_report", return_value="report list/a.xlsx")
+@patch("reports.prepare_report_form")
+@patch("reports.get_report_form_state", return_value="invalid")
+def test_get_group_report_for_past_period(mock_state, mock_prepare, mock_export):
+    from reports import get_group_report
+    driver = MagicMock()
+
+    get_group_report(driver, "A", end_date="4/8/2023")
+
+    mock_state.assert_called_once_with(driver, "4/8/2023")
+    mock_prepare.assert_called_once_with(driver, "4/8/2023")
+    assert mock_export.call_args.kwargs["end_date"] == "4/8/2023"
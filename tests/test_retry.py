@@ -0,0 +1,108 @@
+import os
+import sys
+import threading
+
+import pytest
+from unittest.mock import MagicMock, patch
+from selenium.common import InvalidSelectorException, TimeoutException, WebDriverException
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from retry import RetryPolicy, Deadline, DeadlineExceeded, get_run_deadline, start_run_deadline, with_run_deadline
+
+
+@patch("retry.time.sleep")
+def test_retry_policy_succeeds_after_failures(mock_sleep):
+    operation = MagicMock(side_effect=[WebDriverException("stale"), WebDriverException("stale"), "clicked"])
+    retries = []
+
+    policy = RetryPolicy(max_attempts=5, attempt_timeout=2, selector_budget=60)
+    result = policy.execute(operation, "button.go", on_retry=lambda: retries.append(1))
+
+    assert result == "clicked"
+    assert operation.call_count == 3
+    assert len(retries) == 2
+    # Each attempt may wait at most the per-attempt timeout
+    assert all(call.args[0] <= 2 for call in operation.call_args_list)
+
+
+def test_backoff_grows_exponentially_with_jitter():
+    policy = RetryPolicy(base_delay=0.5, max_delay=4)
+    for attempt, full_delay in [(1, 0.5), (2, 1.0), (3, 2.0), (4, 4.0), (6, 4.0)]:
+        delay = policy.backoff(attempt)
+        assert full_delay / 2 <= delay <= full_delay
+
+
+@patch("retry.time.sleep")
+def test_retry_policy_fast_fails_permanent_errors(mock_sleep):
+    operation = MagicMock(side_effect=InvalidSelectorException("bad xpath"))
+
+    with pytest.raises(InvalidSelectorException):
+        RetryPolicy().execute(operation, "//bad[")
+
+    operation.assert_called_once()
+    mock_sleep.assert_not_called()
+
+
+@patch("retry.time.sleep")
+def test_retry_policy_gives_up_after_max_attempts(mock_sleep):
+    operation = MagicMock(side_effect=TimeoutException("not clickable"))
+
+    with pytest.raises(TimeoutException):
+        RetryPolicy(max_attempts=3).execute(operation, "button.go")
+
+    assert operation.call_count == 3
+
+
+def test_retry_policy_respects_selector_budget():
+    operation = MagicMock(side_effect=TimeoutException("not clickable"))
+
+    with pytest.raises(TimeoutException):
+        RetryPolicy(max_attempts=100, selector_budget=0.3, base_delay=0.05, max_delay=0.05).execute(
+            operation, "button.go"
+        )
+
+    assert 1 <= operation.call_count < 100
+
+
+def test_retry_policy_respects_shared_deadline():
+    operation = MagicMock(return_value="never called")
+
+    with pytest.raises(DeadlineExceeded):
+        RetryPolicy(deadline=Deadline(0)).execute(operation, "button.go")
+
+    operation.assert_not_called()
+
+
+@patch("retry.time.sleep")
+def test_attempt_timeout_is_capped_by_deadline(mock_sleep):
+    operation = MagicMock(return_value="ok")
+
+    RetryPolicy(attempt_timeout=50, deadline=Deadline(5)).execute(operation, "button.go")
+
+    assert operation.call_args.args[0] <= 5
+
+
+def test_run_deadline_belongs_to_its_run():
+    """
+    A run's deadline is seen by its own thread and the workers it starts, and is gone once the run ends;
+    a run on another thread is not affected.
+    """
+    seen = {}
+
+    def other_run():
+        seen["other"] = get_run_deadline()
+
+    with start_run_deadline(60) as deadline:
+        worker = threading.Thread(target=with_run_deadline(lambda: seen.setdefault("worker", get_run_deadline())))
+        other = threading.Thread(target=other_run)
+        for thread in (worker, other):
+            thread.start()
+            thread.join()
+        assert get_run_deadline() is deadline
+
+    assert seen == {"worker": deadline, "other": None}
+    assert get_run_deadline() is None
+
+    with start_run_deadline(0) as no_deadline:
+        assert no_deadline is None
@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+
+BENCH_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "bench"))
+
+# Runs in a fresh interpreter: config reads the environment once, and this test process has already imported it
+BENCHMARK_SETUP = """
+import json, sys, tempfile
+sys.path.insert(0, {bench_dir!r})
+import run_benchmark
+from smtp_sink import start_smtp_sink
+from standin_site import start_standin_site
+
+site = start_standin_site(shade_ms=0, export_ms=0)
+sink = start_smtp_sink()
+fuel_main = run_benchmark.load_project(site, sink, tempfile.mkdtemp())
+import config, mailer
+print(json.dumps({{"site": site.base_url, "sink": sink.address, "login_url": config.PAZOMAT_LOGIN_URL,
+                   "main_login_url": fuel_main.PAZOMAT_LOGIN_URL, "smtp_server": mailer.SMTP_SERVER,
+                   "site_groups": site.logistic_groups, "groups": list(config.LOGISTIC_GROUPS)}}))
+"""
+
+
+def test_benchmark_points_config_at_the_stand_in():
+    env = {name: value for name, value in os.environ.items()
+           if name not in ("PAZOMAT_LOGIN_URL", "SMTP_SERVER", "DOWNLOAD_DIR")}
+    completed = subprocess.run([sys.executable, "-c", BENCHMARK_SETUP.format(bench_dir=BENCH_DIR)],
+                               capture_output=True, text=True, env=env, timeout=60, check=True)
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    assert result["login_url"] == f"{result['site']}/Login"
+    assert result["main_login_url"] == result["login_url"]
+    assert result["smtp_server"] == result["sink"]
+    assert result["site_groups"] == result["groups"]
@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from run_journal import RunJournal, GENERATED, EMAILED, EMAIL_FAILED, REPORT_FAILED
+
+GROUPS = {
+    'אילת': 'eilat@budget.co.il;boss@budget.co.il',
+    'נתניה': 'natanya@budget.co.il',
+    'אייל': 'ashdod@budget.co.il',
+}
+
+
+def test_journal_tracks_generated_and_emailed_groups(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    report = tmp_path / "eilat.xlsx"
+    report.write_bytes(b"report")
+    journal = RunJournal("1/9/2023", path)
+
+    journal.record('אילת', GENERATED, path=str(report))
+    journal.record('אילת', EMAILED, recipients=['eilat@budget.co.il'])
+    journal.record('אילת', EMAIL_FAILED, error="smtp error")
+    journal.record('נתניה', GENERATED, path=str(tmp_path / "deleted.xlsx"))
+    journal.record('נתניה', EMAILED, recipients=['Natanya@budget.co.il'])
+    journal.record('אייל', REPORT_FAILED, error="timeout")
+
+    # A fresh journal object (a new process) sees the same state
+    resumed = RunJournal("1/9/2023", path)
+    assert resumed.remaining_recipients(GROUPS) == {'אילת': 'boss@budget.co.il', 'אייל': 'ashdod@budget.co.il'}
+    assert resumed.generated_reports() == {'אילת': str(report)}
+
+
+def test_journal_is_per_period_and_skips_bad_lines(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    RunJournal("25/8/2023", str(path)).record('נתניה', EMAILED, recipients=['natanya@budget.co.il'])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"period": "1/9/2023", "group": "נת\n')
+
+    journal = RunJournal("1/9/2023", str(path))
+
+    assert journal.events() == []
+    assert journal.remaining_recipients(GROUPS) == GROUPS
+    assert json.loads(path.read_text(encoding="utf-8").splitlines()[0])["period"] == "25/8/2023"
+
+
+def test_disabled_journal_records_nothing(tmp_path):
+    journal = RunJournal("1/9/2023", "")
+    journal.record('אילת', GENERATED, path="x.xlsx")
+
+    assert journal.events() == []
+    assert journal.remaining_recipients(GROUPS) == GROUPS
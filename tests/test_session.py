@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from session import save_session, restore_session
+
+
+@patch("session.is_signed_in", return_value=True)
+def test_save_session_writes_cookies_and_local_storage(mock_signed_in, tmp_path):
+    driver = MagicMock()
+    driver.get_cookies.return_value = [{"name": "auth", "value": "token"}]
+    driver.execute_script.return_value = {"user": "42"}
+    session_file = tmp_path / "session.json"
+
+    save_session(driver, str(session_file))
+
+    state = json.loads(session_file.read_text(encoding="utf-8"))
+    assert state["cookies"] == [{"name": "auth", "value": "token"}]
+    assert state["local_storage"] == {"user": "42"}
+    assert os.listdir(tmp_path) == ["session.json"]
+
+
+@patch("session.is_signed_in", return_value=True)
+def test_restore_session_skips_expired_cookies(mock_signed_in, tmp_path):
+    session_file = tmp_path / "session.json"
+    session_file.write_text(json.dumps({
+        "cookies": [
+            {"name": "fresh", "value": "1", "expiry": time.time() + 3600},
+            {"name": "stale", "value": "2", "expiry": time.time() - 3600},
+        ],
+        "local_storage": {"token": "abc"},
+    }), encoding="utf-8")
+    driver = MagicMock()
+
+    assert restore_session(driver, str(session_file)) is True
+
+    driver.add_cookie.assert_called_once()
+    assert driver.add_cookie.call_args.args[0]["name"] == "fresh"
+    driver.refresh.assert_called_once()
+
+
+def test_restore_session_missing_file(tmp_path):
+    driver = MagicMock()
+    assert restore_session(driver, str(tmp_path / "missing.json")) is False
+    driver.add_cookie.assert_not_called()
+
+
+@patch("session.is_signed_in", return_value=False)
+def test_restore_session_expired(mock_signed_in, tmp_path):
+    session_file = tmp_path / "session.json"
+    session_file.write_text(json.dumps({"cookies": [], "local_storage": {}}), encoding="utf-8")
+
+    assert restore_session(MagicMock(), str(session_file)) is False
+
+
+@patch("session.is_signed_in", return_value=True)
+def test_save_session_from_several_threads(mock_signed_in, tmp_path):
+    """
+    Pool workers saving the same session file at once each write their own temp file.
+    """
+    session_file = str(tmp_path / "session.json")
+    drivers = []
+    for index in range(8):
+        driver = MagicMock()
+        driver.get_cookies.return_value = [{"name": "auth", "value": f"token-{index}"}]
+        driver.execute_script.return_value = {}
+        drivers.append(driver)
+
+    threads = [threading.Thread(target=save_session, args=(driver, session_file)) for driver in drivers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert json.loads(open(session_file, encoding="utf-8").read())["cookies"][0]["value"].startswith("token-")
+    assert os.listdir(tmp_path) == ["session.json"]
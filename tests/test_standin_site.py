@@ -0,0 +1,72 @@
+import io
+import os
+import sys
+import urllib.request
+import zipfile
+from urllib.error import HTTPError
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "bench")))
+
+import constants
+from standin_site import start_standin_site, build_xlsx, aria_label
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+@pytest.fixture(scope="module")
+def site():
+    server = start_standin_site(shade_ms=10, export_ms=0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get(url, cookie=None):
+    opener = urllib.request.build_opener(_NoRedirect)
+    request = urllib.request.Request(url, headers={"Cookie": cookie} if cookie else {})
+    try:
+        with opener.open(request) as response:
+            return response.status, response.read()
+    except HTTPError as e:
+        return e.code, b""
+
+
+def test_login_page_uses_constants_selectors(site):
+    status, body = _get(f"{site.base_url}/Login")
+    page = body.decode("utf-8")
+
+    assert status == 200
+    for selector in (constants.SELECTOR_BUSINESS_PARTNER_INPUT, constants.SELECTOR_ID_INPUT,
+                     constants.SELECTOR_PASSWORD_INPUT, constants.SELECTOR_LOGIN_BUTTON):
+        assert f'aria-label="{aria_label(selector)}"' in page
+
+
+def test_reports_require_session(site):
+    status, _ = _get(f"{site.base_url}/Reports")
+    assert status == 302
+
+    status, body = _get(f"{site.base_url}/Reports", cookie="standin_session=ok")
+    assert status == 200
+    assert constants.DATE_PICKER_OVERLAY_ID in body.decode("utf-8")
+
+
+def test_download_is_a_valid_xlsx(site):
+    status, body = _get(f"{site.base_url}/download?group=%D7%90&date=1/9/2023&columns=[]",
+                        cookie="standin_session=ok")
+    assert status == 200
+    with zipfile.ZipFile(io.BytesIO(body)) as archive:
+        assert "xl/worksheets/sheet1.xml" in archive.namelist()
+
+
+def test_build_xlsx_contains_rows():
+    data = build_xlsx(["מספר רכב", "כמות ליטר"], [["12-345-67", 40]])
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        sheet = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    assert "12-345-67" in sheet
+    assert "<v>40</v>" in sheet
@@ -0,0 +1,89 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import tracing
+from tracing import span, traced, current_span
+
+
+@pytest.fixture
+def tracing_enabled(tmp_path):
+    tracing.reset()
+    tracing.enable(str(tmp_path))
+    yield tmp_path
+    tracing.disable()
+    tracing.reset()
+
+
+def test_nested_spans_and_counters(tracing_enabled):
+    @traced("inner_step")
+    def inner():
+        current_span().set("selector", "button.go")
+        current_span().incr("retries")
+        current_span().incr("retries")
+
+    with span("outer", logistic_group="אילת"):
+        inner()
+
+    path = tracing.write_trace()
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+
+    outer = trace["spans"][0]
+    assert outer["name"] == "outer"
+    assert outer["attributes"]["logistic_group"] == "אילת"
+    child = outer["children"][0]
+    assert child["name"] == "inner_step"
+    assert child["attributes"] == {"selector": "button.go", "retries": 2}
+    assert child["duration_s"] >= 0
+
+
+def test_span_records_errors(tracing_enabled):
+    with pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("bad selector")
+
+    rows = {row["name"]: row for row in tracing.summarize()}
+    assert rows["failing"]["errors"] == 1
+
+
+def test_summary_aggregates_by_name(tracing_enabled):
+    for _ in range(3):
+        with span("click_element") as step:
+            step.incr("retries")
+
+    rows = {row["name"]: row for row in tracing.summarize()}
+    assert rows["click_element"]["count"] == 3
+    assert rows["click_element"]["retries"] == 3
+    assert "click_element" in tracing.format_summary(tracing.summarize())
+
+
+def test_disabled_tracing_records_nothing():
+    tracing.disable()
+    tracing.reset()
+
+    with span("ignored") as step:
+        step.incr("retries")
+    traced()(lambda: None)()
+
+    assert tracing.summarize() == []
+    assert tracing.finish_run() is None
+
+
+def test_finish_run_starts_a_fresh_trace(tracing_enabled):
+    paths = []
+    for run_name in ("first_run", "second_run"):
+        with span(run_name):
+            pass
+        paths.append(tracing.finish_run())
+
+    # Both runs finish within the same second and still get a trace file each
+    assert len(set(paths)) == 2
+    for path, run_name in zip(paths, ("first_run", "second_run")):
+        with open(path, encoding="utf-8") as f:
+            assert [root["name"] for root in json.load(f)["spans"]] == [run_name]
+    assert tracing.summarize() == []
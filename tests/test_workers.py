@@ -0,0 +1,111 @@
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+from selenium.common import WebDriverException
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from workers import run_report_pool
+
+
+@patch("workers.ensure_signed_in")
+@patch("workers.initialize_webdriver_and_navigate")
+@patch("workers.get_group_report")
+def test_run_report_pool_collects_results_and_failures(mock_get_reports, mock_init, mock_sign_in):
+    """
+    Each group ends up in either results or failures, and every worker gets its own driver and directory.
+    """
+    mock_init.side_effect = lambda url, download_dir=None, profile_name=None: MagicMock()
+
+    def get_reports_side_effect(driver, logistic_group, download_dir=None):
+        if logistic_group == "BAD":
+            raise RuntimeError("boom")
+        return f"{download_dir}/{logistic_group}.xlsx"
+
+    mock_get_reports.side_effect = get_reports_side_effect
+
+    results, failures = run_report_pool(["A", "B", "BAD"], pool_size=2, url="http://localhost")
+
+    assert set(results) == {"A", "B"}
+    assert set(failures) == {"BAD"}
+    assert mock_init.call_count == 2
+    assert mock_sign_in.call_count == 2
+
+    download_dirs = {call.kwargs["download_dir"] for call in mock_init.call_args_list}
+    assert len(download_dirs) == 2
+
+
+@patch("workers.ensure_signed_in")
+@patch("workers.initialize_webdriver_and_navigate", side_effect=Exception("Chrome failed"))
+@patch("workers.get_group_report")
+def test_run_report_pool_no_sessions(mock_get_reports, mock_init, mock_sign_in):
+    """
+    If no worker can start a session, every group is reported as failed.
+    """
+    results, failures = run_report_pool(["A", "B"], pool_size=2, url="http://localhost")
+
+    assert results == {}
+    assert set(failures) == {"A", "B"}
+    mock_get_reports.assert_not_called()
+
+
+@patch("workers.ensure_signed_in")
+@patch("workers.initialize_webdriver_and_navigate")
+@patch("workers.get_group_report")
+def test_run_report_pool_on_result_callback(mock_get_reports, mock_init, mock_sign_in):
+    """
+    on_result is called once per successful report, as soon as it is ready.
+    """
+    mock_get_reports.side_effect = lambda driver, logistic_group, download_dir=None: f"{logistic_group}.xlsx"
+    ready = []
+
+    run_report_pool(["A", "B"], pool_size=1, url="http://localhost",
+                    on_result=lambda logistic_group, path: ready.append((logistic_group, path)))
+
+    assert sorted(ready) == [("A", "A.xlsx"), ("B", "B.xlsx")]
+
+
+@patch("workers.ensure_signed_in")
+@patch("workers.initialize_webdriver_and_navigate")
+@patch("workers.get_group_report")
+def test_run_report_pool_callback_failure_keeps_the_result(mock_get_reports, mock_init, mock_sign_in):
+    """
+    A failing on_result does not turn a retrieved report into a failure.
+    """
+    mock_get_reports.side_effect = lambda driver, logistic_group, download_dir=None: f"{logistic_group}.xlsx"
+
+    def on_result(logistic_group, path):
+        if logistic_group == "A":
+            raise RuntimeError("dispatcher failed")
+
+    results, failures = run_report_pool(["A", "B"], pool_size=1, url="http://localhost", on_result=on_result)
+
+    assert results == {"A": "A.xlsx", "B": "B.xlsx"}
+    assert failures == {}
+
+
+@patch("workers.ensure_signed_in")
+@patch("workers.initialize_webdriver_and_navigate")
+@patch("workers.get_group_report")
+def test_worker_replaces_its_driver_after_a_webdriver_error(mock_get_reports, mock_init, mock_sign_in):
+    """
+    After a WebDriver error the worker quits its driver and signs in on a new one for the next job.
+    """
+    drivers = []
+    mock_init.side_effect = lambda url, download_dir=None, profile_name=None: drivers.append(MagicMock()) or drivers[-1]
+
+    def get_reports_side_effect(driver, logistic_group, download_dir=None):
+        if driver is drivers[0]:
+            raise WebDriverException("invalid session id")
+        return f"{logistic_group}.xlsx"
+
+    mock_get_reports.side_effect = get_reports_side_effect
+
+    results, failures = run_report_pool(["A", "B", "C"], pool_size=1, url="http://localhost")
+
+    assert set(failures) == {"A"}
+    assert results == {"B": "B.xlsx", "C": "C.xlsx"}
+    assert len(drivers) == 2
+    drivers[0].quit.assert_called_once()
+    assert mock_sign_in.call_count == 2
@@ -0,0 +1,244 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from config import TRACE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """
+    A timed step. Attributes (selector, logistic group, ...) and counters (retries, ...) are recorded with it.
+    """
+
+    __slots__ = ("name", "attributes", "children", "start", "duration", "error", "thread")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.children = []
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def incr(self, key, amount=1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self, origin):
+        return {
+            "name": self.name,
+            "thread": self.thread,
+            "start_s": round(self.start - origin, 6),
+            "duration_s": round(self.duration, 6) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+
+class _NullSpan:
+    """
+    Returned when tracing is disabled; every operation is a no-op.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set(self, key, value):
+        pass
+
+    def incr(self, key, amount=1):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _ActiveSpan:
+    def __init__(self, name, attributes):
+        self._name = name
+        self._attributes = attributes
+        self._span = None
+
+    def __enter__(self):
+        self._span = Span(self._name, self._attributes)
+        stack = _stack()
+        if stack:
+            stack[-1].children.append(self._span)
+        else:
+            with _lock:
+                _roots.append(self._span)
+        stack.append(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._span.duration = time.perf_counter() - self._span.start
+        if exc_type is not None:
+            self._span.error = f"{exc_type.__name__}: {exc_value}"
+        _stack().pop()
+        return False
+
+
+_enabled = bool(TRACE_DIR)
+_trace_dir = TRACE_DIR
+_origin = time.perf_counter()
+_roots = []
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def enable(trace_dir=None):
+    """
+    Turns tracing on (TRACE_DIR in config enables it at import time).
+    """
+    global _enabled, _trace_dir
+    _enabled = True
+    if trace_dir:
+        _trace_dir = trace_dir
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """
+    Drops every recorded span and restarts the trace clock.
+    """
+    global _origin
+    with _lock:
+        _roots.clear()
+    _origin = time.perf_counter()
+
+
+def span(name, **attributes):
+    """
+    Context manager recording a (possibly nested) span. Yields the span so callers can
+    `set` attributes or `incr` counters such as retries.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _ActiveSpan(name, attributes)
+
+
+def current_span():
+    """
+    Returns the innermost open span on this thread (a no-op span when there is none or tracing is off).
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    stack = _stack()
+    return stack[-1] if stack else _NULL_SPAN
+
+
+def traced(name=None):
+    """
+    Decorator recording a span around every call of the decorated function.
+    """
+    def decorator(function):
+        span_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _ActiveSpan(span_name, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _iter_spans(spans):
+    for item in spans:
+        yield item
+        yield from _iter_spans(item.children)
+
+
+def summarize():
+    """
+    Aggregates recorded spans by name: count, total/max duration, errors and summed counters.
+    Returns a list of dicts ordered by total duration.
+    """
+    with _lock:
+        roots = list(_roots)
+
+    rows = {}
+    for item in _iter_spans(roots):
+        if item.duration is None:
+            continue
+        row = rows.setdefault(item.name, {"name": item.name, "count": 0, "total_s": 0.0, "max_s": 0.0,
+                                          "errors": 0, "retries": 0})
+        row["count"] += 1
+        row["total_s"] += item.duration
+        row["max_s"] = max(row["max_s"], item.duration)
+        row["errors"] += 1 if item.error else 0
+        row["retries"] += item.attributes.get("retries", 0)
+    return sorted(rows.values(), key=lambda row: -row["total_s"])
+
+
+def format_summary(rows):
+    lines = [f"{'step':<32}{'count':>7}{'total s':>10}{'max s':>9}{'retries':>9}{'errors':>8}"]
+    for row in rows:
+        lines.append(f"{row['name']:<32}{row['count']:>7}{row['total_s']:>10.3f}{row['max_s']:>9.3f}"
+                     f"{row['retries']:>9}{row['errors']:>8}")
+    return "\n".join(lines)
+
+
+def write_trace(trace_dir=None):
+    """
+    Writes all recorded spans to a timestamped JSON file in the trace directory. Returns the file path.
+    """
+    directory = trace_dir or _trace_dir
+    os.makedirs(directory, exist_ok=True)
+    with _lock:
+        spans = [root.to_dict(_origin) for root in _roots]
+
+    # Runs finishing in the same second (daemon, backfill, another process) must not overwrite each other
+    path = os.path.join(directory, f"trace-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"spans": spans, "summary": summarize()}, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def finish_run():
+    """
+    At the end of a run: writes the trace file, logs the per-step summary table and drops the recorded
+    spans so the next run (e.g. from the daemon) starts a fresh trace. No-op when disabled.
+    """
+    if not _enabled:
+        return None
+    try:
+        path = write_trace()
+    except OSError:
+        logger.exception("Failed to write trace file.")
+        path = None
+    logger.info("Trace summary:\n" + format_summary(summarize()))
+    if path:
+        logger.info(f"Trace written to {path}")
+    reset()
+    return path
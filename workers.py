@@ -0,0 +1,137 @@
+import logging
+import os
+import queue
+import threading
+
+from selenium.common import WebDriverException
+
+from automation import initialize_webdriver_and_navigate, ensure_signed_in
+from config import DOWNLOAD_DIR, PAZOMAT_LOGIN_URL, WORKER_POOL_SIZE
+from reports import get_group_report
+from retry import with_run_deadline
+
+logger = logging.getLogger(__name__)
+
+
+def _start_session(worker_index, url, download_dir):
+    """
+    Opens a worker's WebDriver (with its own profile and download directory) and signs in.
+    Returns the driver, or None if it could not be started.
+    """
+    driver = None
+    try:
+        driver = initialize_webdriver_and_navigate(
+            url, download_dir=download_dir, profile_name=f"worker-{worker_index}"
+        )
+        ensure_signed_in(driver)
+        return driver
+    except Exception:
+        logger.exception(f"Worker {worker_index} failed to start a signed-in session.")
+        _quit(driver, worker_index)
+        return None
+
+
+def _quit(driver, worker_index):
+    if driver is None:
+        return
+    try:
+        driver.quit()
+        logger.debug(f"Worker {worker_index} closed its WebDriver.")
+    except Exception:
+        logger.warning(f"Worker {worker_index} failed to close WebDriver gracefully.")
+
+
+def _worker_loop(worker_index, jobs, url, results, failures, lock, on_result, retrieve):
+    """
+    Runs a single worker: opens its own signed-in driver and download directory,
+    then calls `retrieve(driver, job, download_dir)` for jobs taken from the `jobs` queue until it is empty,
+    keeping the report form set up between jobs. After a WebDriver error the driver is replaced
+    (like daemon.WarmDriver.recycle), so a dead session does not fail every remaining job.
+    """
+    download_dir = os.path.join(DOWNLOAD_DIR, f"worker-{worker_index}")
+    driver = _start_session(worker_index, url, download_dir)
+    if driver is None:
+        return
+
+    try:
+        while True:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                report_file_path = retrieve(driver, job, download_dir)
+            except Exception as e:
+                logger.error(f"Worker {worker_index} failed on {job!r}: {e}")
+                with lock:
+                    failures[job] = e
+                if isinstance(e, WebDriverException):
+                    logger.warning(f"Worker {worker_index} is replacing its WebDriver after: {type(e).__name__}")
+                    _quit(driver, worker_index)
+                    driver = _start_session(worker_index, url, download_dir)
+                    if driver is None:
+                        # The remaining jobs go to the other workers, or fail when the pool finishes
+                        break
+                continue
+
+            with lock:
+                results[job] = report_file_path
+            if on_result:
+                try:
+                    on_result(job, report_file_path)
+                except Exception:
+                    logger.exception(f"Worker {worker_index}: result callback failed for {job!r}.")
+    finally:
+        _quit(driver, worker_index)
+
+
+def run_report_pool(logistic_groups, pool_size=WORKER_POOL_SIZE, url=PAZOMAT_LOGIN_URL, on_result=None):
+    """
+    Retrieves reports for several logistic groups at once, using a pool of signed-in WebDriver sessions.
+    Returns a (results, failures) tuple of dicts keyed by logistic group:
+    results maps to the report file path, failures to the exception raised.
+    If given, `on_result(logistic_group, report_file_path)` is called from the worker thread as soon as
+    each report is ready.
+    """
+    def retrieve(driver, logistic_group, download_dir):
+        return get_group_report(driver, logistic_group, download_dir=download_dir)
+
+    return run_job_pool(logistic_groups, retrieve, pool_size, url, on_result)
+
+
+def run_job_pool(jobs_to_run, retrieve, pool_size=WORKER_POOL_SIZE, url=PAZOMAT_LOGIN_URL, on_result=None):
+    """
+    Generic form of run_report_pool: runs `retrieve(driver, job, download_dir)` for every (hashable) job
+    on a pool of signed-in WebDriver sessions. Returns (results, failures) keyed by job.
+    """
+    jobs = queue.Queue()
+    for job in jobs_to_run:
+        jobs.put(job)
+
+    results = {}
+    failures = {}
+    lock = threading.Lock()
+
+    pool_size = max(1, min(pool_size, jobs.qsize()))
+    logger.info(f"Retrieving {jobs.qsize()} reports with {pool_size} parallel workers.")
+
+    threads = [
+        threading.Thread(
+            target=with_run_deadline(_worker_loop),
+            args=(index, jobs, url, results, failures, lock, on_result, retrieve),
+            name=f"report-worker-{index}",
+        )
+        for index in range(pool_size)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Jobs left in the queue were never picked up because every worker failed to start or restart its session
+    while not jobs.empty():
+        failures[jobs.get_nowait()] = RuntimeError("No worker session was available.")
+
+    logger.info(f"Report pool finished: {len(results)} succeeded, {len(failures)} failed.")
+    return results, failures